@@ -92,6 +92,19 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Holds the per-month class calendars (core.schedule). The local-memory cache
+# is per process; with several workers use a shared backend such as Redis so
+# schedule changes invalidate every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -123,6 +136,16 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Class materials and submissions are only served through the access-checked
+# download views (dashboard.downloads); these MEDIA_ROOT folders are never
+# served at MEDIA_URL.
+PROTECTED_MEDIA_DIRS = ['blobs', 'uploads', 'class_materials', 'assignment_submissions']
+# '' streams protected files from Django. 'nginx' hands them to nginx with
+# X-Accel-Redirect to PROTECTED_MEDIA_URL, an `internal` location aliased to
+# MEDIA_ROOT; 'sendfile' sets X-Sendfile (Apache mod_xsendfile, lighttpd).
+PROTECTED_MEDIA_SERVER = os.environ.get('PROTECTED_MEDIA_SERVER', '')
+PROTECTED_MEDIA_URL = '/protected-media/'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
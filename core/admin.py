@@ -5,6 +5,8 @@ from .models import (
     Student,
     ClassType,
     Clazz,
+    ClassRecommendation,
+    ClassSession,
     Enrollment,
     Attendance,
     AttendanceSession,
@@ -14,7 +16,9 @@ from .models import (
     Announcement,
     Assignment,
     AssignmentSubmission,
-    ContentReadStatus
+    ContentReadStatus,
+    StoredBlob,
+    UploadSession
 )
 
 
@@ -54,6 +58,28 @@ class ClazzAdmin(admin.ModelAdmin):
     search_fields = ('class_name',)
 
 
+class ClassSessionAdmin(admin.ModelAdmin):
+    list_display = ('session_id', 'clazz', 'date', 'start_time', 'is_extra')
+    list_filter = ('is_extra',)
+    date_hierarchy = 'date'
+
+
+class ClassRecommendationAdmin(admin.ModelAdmin):
+    list_display = ('clazz', 'similar', 'score')
+    search_fields = ('clazz__class_name',)
+
+
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at')
+    search_fields = ('digest', 'name')
+    readonly_fields = ('digest', 'name', 'size', 'ref_count')
+
+
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'purpose', 'received', 'size', 'status', 'updated_at')
+    list_filter = ('purpose', 'status')
+
+
 class MessageAdmin(admin.ModelAdmin):
     list_display = ('sender', 'recipient', 'subject', 'created_at', 'is_read')
     list_filter = ('is_read',)
@@ -65,6 +91,8 @@ admin.site.register(Teacher, TeacherAdmin)
 admin.site.register(Student, StudentAdmin)
 admin.site.register(ClassType)
 admin.site.register(Clazz, ClazzAdmin)
+admin.site.register(ClassSession, ClassSessionAdmin)
+admin.site.register(ClassRecommendation, ClassRecommendationAdmin)
 admin.site.register(Enrollment, EnrollmentAdmin)
 admin.site.register(Attendance)
 admin.site.register(AttendanceSession)
@@ -75,3 +103,5 @@ admin.site.register(Announcement)
 admin.site.register(Assignment)
 admin.site.register(AssignmentSubmission)
 admin.site.register(ContentReadStatus)
+admin.site.register(StoredBlob, StoredBlobAdmin)
+admin.site.register(UploadSession, UploadSessionAdmin)
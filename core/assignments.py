@@ -0,0 +1,59 @@
+"""
+Submission progress for a teacher's assignments.
+
+`assignment_progress()` annotates submitted / graded / late / missing counts
+on every assignment of a teacher in one grouped query and caches the list
+per teacher. Signal handlers in core.signals drop a teacher's entry when a
+submission, assignment, class or enrollment changes under them; code that
+writes submissions with `bulk_update` calls `invalidate_assignment_progress()`
+itself.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Assignment, AssignmentSubmission, Clazz, Enrollment
+
+ASSIGNMENT_PROGRESS_TIMEOUT = 60 * 60
+
+
+def _progress_key(teacher_id):
+    return f"assignment-progress:{teacher_id}"
+
+
+def invalidate_assignment_progress(*teacher_ids):
+    """Drops the cached progress of the given teachers."""
+    cache.delete_many([_progress_key(pk) for pk in teacher_ids if pk is not None])
+
+
+def teachers_of_classes(class_ids):
+    return set(Clazz.objects.filter(pk__in=class_ids)
+               .exclude(teacher=None).values_list('teacher_id', flat=True))
+
+
+def with_progress(assignments):
+    """Annotates `submitted_count`, `graded_count`, `late_count` and
+    `missing_count` (approved students without a submission)."""
+    missing = (Enrollment.objects
+               .filter(clazz=OuterRef('clazz_id'), status='approved')
+               .filter(~Exists(AssignmentSubmission.objects.filter(
+                   assignment=OuterRef(OuterRef('pk')), student=OuterRef('student_id'))))
+               .order_by().values('clazz').annotate(n=Count('pk')).values('n'))
+    return assignments.annotate(
+        submitted_count=Count('submissions'),
+        graded_count=Count('submissions', filter=Q(submissions__grade__isnull=False)),
+        late_count=Count('submissions', filter=Q(submissions__submitted_at__gt=F('due_date'))),
+        missing_count=Coalesce(Subquery(missing, output_field=IntegerField()), 0),
+    )
+
+
+def assignment_progress(teacher):
+    """The teacher's assignments, newest due date first, with progress counts."""
+    key = _progress_key(teacher.pk)
+    assignments = cache.get(key)
+    if assignments is None:
+        assignments = list(with_progress(
+            Assignment.objects.filter(clazz__teacher=teacher)
+            .select_related('clazz').order_by('-due_date')))
+        cache.set(key, assignments, ASSIGNMENT_PROGRESS_TIMEOUT)
+    return assignments
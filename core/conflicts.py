@@ -0,0 +1,162 @@
+"""
+Room and teacher double-booking detection.
+
+Class meetings are indexed per (room, weekday) and per (teacher, weekday).
+Each bucket is kept sorted by start time together with a running maximum of
+end times, so an overlap query bisects to the meetings that start before the
+new one ends and walks back only while an earlier meeting could still be
+running. Times are half-open, so back-to-back classes do not clash.
+"""
+import bisect
+from collections import namedtuple
+
+from django.db.models import F, Q
+
+from .schedule import WEEKDAY_NAMES, parse_weekdays, weekdays_from_mask
+
+SLOT_FIELDS = ('class_id', 'class_name', 'room', 'teacher_id', 'weekday_mask',
+               'start_date', 'end_date', 'start_time', 'end_time')
+
+ClassSlot = namedtuple('ClassSlot', ['pk', 'class_name', 'room', 'teacher_id', 'weekday_mask',
+                                     'start_date', 'end_date', 'start_time', 'end_time'])
+
+
+class Conflict(namedtuple('Conflict', ['kind', 'slot', 'other', 'weekday_mask'])):
+    """`slot` and `other` share a room (kind 'room') or a teacher (kind
+    'teacher') on the weekdays in `weekday_mask`."""
+
+    @property
+    def weekdays(self):
+        return ', '.join(WEEKDAY_NAMES[day] for day in weekdays_from_mask(self.weekday_mask))
+
+    @property
+    def message(self):
+        what = f"Room {self.other.room}" if self.kind == 'room' else "The teacher"
+        return (f"{what} is already booked for {self.other.class_name} on "
+                f"{self.weekdays} {self.other.start_time:%H:%M}-{self.other.end_time:%H:%M}.")
+
+
+def slot_for(clazz):
+    return ClassSlot(clazz.pk, clazz.class_name, clazz.room, clazz.teacher_id,
+                     parse_weekdays(clazz.day_of_week), clazz.start_date, clazz.end_date,
+                     clazz.start_time, clazz.end_time)
+
+
+def _is_schedulable(slot):
+    return bool(slot.weekday_mask and slot.start_time and slot.end_time
+                and slot.end_time > slot.start_time
+                and slot.start_date and slot.end_date)
+
+
+def _room_key(room):
+    return (room or '').strip().casefold()
+
+
+def _bucket_keys(slot):
+    room = _room_key(slot.room)
+    for weekday in weekdays_from_mask(slot.weekday_mask):
+        if room:
+            yield 'room', (room, weekday)
+        if slot.teacher_id:
+            yield 'teacher', (slot.teacher_id, weekday)
+
+
+def _dates_overlap(a, b):
+    return a.start_date <= b.end_date and b.start_date <= a.end_date
+
+
+class ConflictIndex:
+    """Interval index of class meetings for overlap queries."""
+
+    def __init__(self, slots=()):
+        self._buckets = {}
+        self._sorted = {}
+        for slot in slots:
+            self.add(slot)
+
+    def add(self, slot):
+        if not _is_schedulable(slot):
+            return
+        for kind, key in _bucket_keys(slot):
+            self._buckets.setdefault((kind, key), []).append(slot)
+            self._sorted.pop((kind, key), None)
+
+    def _bucket(self, bucket_key):
+        built = self._sorted.get(bucket_key)
+        if built is None:
+            slots = sorted(self._buckets.get(bucket_key, ()), key=lambda s: s.start_time)
+            max_ends = []
+            for slot in slots:
+                max_ends.append(max(max_ends[-1], slot.end_time) if max_ends else slot.end_time)
+            built = ([s.start_time for s in slots], max_ends, slots)
+            self._sorted[bucket_key] = built
+        return built
+
+    def conflicts_for(self, slot):
+        """Conflicts between `slot` and the indexed meetings (other than
+        itself), one per (kind, other class)."""
+        if not _is_schedulable(slot):
+            return []
+        found = {}
+        for kind, key in _bucket_keys(slot):
+            starts, max_ends, slots = self._bucket((kind, key))
+            i = bisect.bisect_left(starts, slot.end_time)
+            while i > 0 and max_ends[i - 1] > slot.start_time:
+                i -= 1
+                other = slots[i]
+                if (other.pk != slot.pk and other.end_time > slot.start_time
+                        and _dates_overlap(slot, other)):
+                    weekday = key[1]
+                    previous = found.get((kind, other.pk))
+                    mask = (previous.weekday_mask if previous else 0) | (1 << weekday)
+                    found[(kind, other.pk)] = Conflict(kind, slot, other, mask)
+        return list(found.values())
+
+    def all_conflicts(self):
+        """Every clashing pair of indexed meetings, once per (kind, pair)."""
+        found = {}
+        for (kind, key) in list(self._buckets):
+            _, _, slots = self._bucket((kind, key))
+            for i, slot in enumerate(slots):
+                for j in range(i + 1, len(slots)):
+                    other = slots[j]
+                    if other.start_time >= slot.end_time:
+                        break
+                    if other.pk == slot.pk or not _dates_overlap(slot, other):
+                        continue
+                    first, second = sorted((slot, other), key=lambda s: s.pk)
+                    previous = found.get((kind, first.pk, second.pk))
+                    mask = (previous.weekday_mask if previous else 0) | (1 << key[1])
+                    found[(kind, first.pk, second.pk)] = Conflict(kind, first, second, mask)
+        return sorted(found.values(), key=lambda c: (c.slot.class_name, c.other.class_name, c.kind))
+
+
+def find_conflicts(slot):
+    """Conflicts of a (possibly unsaved) class schedule with the classes in
+    the database. Only classes sharing its room or teacher, dates and a
+    weekday are loaded."""
+    from .models import Clazz
+
+    if not _is_schedulable(slot):
+        return []
+    sharing = Q(room__iexact=(slot.room or '').strip())
+    if slot.teacher_id:
+        sharing |= Q(teacher_id=slot.teacher_id)
+    candidates = Clazz.objects.filter(
+        sharing, start_date__lte=slot.end_date, end_date__gte=slot.start_date,
+        start_time__lt=slot.end_time, end_time__gt=slot.start_time,
+    ).alias(shared_days=F('weekday_mask').bitand(slot.weekday_mask)).filter(
+        shared_days__gt=0)
+    if slot.pk:
+        candidates = candidates.exclude(pk=slot.pk)
+    index = ConflictIndex(ClassSlot(*row) for row in candidates.values_list(*SLOT_FIELDS))
+    return index.conflicts_for(slot)
+
+
+def term_conflicts(start_date, end_date):
+    """All room and teacher clashes among classes running in the term."""
+    from .models import Clazz
+
+    classes = Clazz.objects.filter(start_date__lte=end_date, end_date__gte=start_date)
+    index = ConflictIndex(ClassSlot(*row) for row in classes.values_list(*SLOT_FIELDS).iterator())
+    return index.all_conflicts()
@@ -0,0 +1,95 @@
+"""
+iCalendar (RFC 5545) feeds of class schedules.
+
+Each class becomes a single weekly recurring VEVENT (RRULE with BYDAY and
+UNTIL) rather than one event per meeting. Times are floating local times,
+matching how `Clazz.start_time` / `end_time` are stored.
+"""
+import datetime
+
+from .schedule import iter_class_dates, weekdays_from_mask
+
+ICAL_DAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+_MAX_LINE_OCTETS = 75
+
+
+def _escape(text):
+    return (str(text or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Splits a content line into 75-octet pieces without breaking UTF-8
+    sequences; continuation lines start with a space."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= _MAX_LINE_OCTETS:
+        return line
+    pieces = []
+    current = ''
+    limit = _MAX_LINE_OCTETS
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            pieces.append(current)
+            current = ''
+            limit = _MAX_LINE_OCTETS - 1  # room for the leading space
+        current += char
+    pieces.append(current)
+    return '\r\n '.join(pieces)
+
+
+def _utc_stamp(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def class_event_lines(clazz, domain):
+    """Content lines of the VEVENT for `clazz`, or [] if it has no meeting
+    days in its date range."""
+    # The RRULE counts DTSTART as the first meeting, so it must fall on one.
+    first_meeting = min(iter_class_dates(
+        clazz, clazz.start_date, clazz.start_date + datetime.timedelta(days=6)), default=None)
+    if first_meeting is None:
+        return []
+
+    byday = ','.join(ICAL_DAYS[day] for day in weekdays_from_mask(clazz.weekday_mask))
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:class-{clazz.pk}@{domain}',
+        f'DTSTAMP:{_utc_stamp(clazz.updated_at)}',
+        f'LAST-MODIFIED:{_utc_stamp(clazz.updated_at)}',
+    ]
+    if clazz.start_time:
+        start = datetime.datetime.combine(first_meeting, clazz.start_time)
+        lines.append(f"DTSTART:{start:%Y%m%dT%H%M%S}")
+        if clazz.end_time and clazz.end_time > clazz.start_time:
+            end = datetime.datetime.combine(first_meeting, clazz.end_time)
+            lines.append(f"DTEND:{end:%Y%m%dT%H%M%S}")
+        until = f"{clazz.end_date:%Y%m%d}T235959"
+    else:
+        # No time set yet: show the meetings as all-day events.
+        lines.append(f"DTSTART;VALUE=DATE:{first_meeting:%Y%m%d}")
+        until = f"{clazz.end_date:%Y%m%d}"
+    lines += [
+        f'RRULE:FREQ=WEEKLY;BYDAY={byday};UNTIL={until}',
+        f'SUMMARY:{_escape(clazz.class_name)}',
+        f'LOCATION:{_escape(clazz.room)}',
+    ]
+    if clazz.teacher_id:
+        lines.append(f'DESCRIPTION:{_escape("Teacher: " + clazz.teacher.full_name)}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def build_calendar(classes, name, domain):
+    """Returns the text of a VCALENDAR with one recurring event per class."""
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:-//{domain}//Class Schedule//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+    ]
+    for clazz in classes:
+        lines.extend(class_event_lines(clazz, domain))
+    lines.append('END:VCALENDAR')
+    return ''.join(_fold(line) + '\r\n' for line in lines)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.timetable import SlotGrid, TimetableSolver, find_violations, generate_instance
+
+# (classes, rooms, teachers)
+DEFAULT_SIZES = ((500, 40, 120), (1000, 80, 250), (2000, 150, 500))
+
+
+class Command(BaseCommand):
+    help = 'Runs the timetable solver on generated instances and reports time and quality.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, help='Run a single size instead of the defaults.')
+        parser.add_argument('--rooms', type=int, default=40)
+        parser.add_argument('--teachers', type=int, default=120)
+        parser.add_argument('--instances', type=int, default=3, help='Seeds per size.')
+        parser.add_argument('--time-limit', type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        sizes = DEFAULT_SIZES
+        if options['classes']:
+            sizes = ((options['classes'], options['rooms'], options['teachers']),)
+        slots_per_day = SlotGrid().slots_per_day
+
+        self.stdout.write(f"{'classes':>8} {'rooms':>6} {'teachers':>8} {'seed':>5} "
+                          f"{'seconds':>8} {'unplaced':>8} {'repairs':>8}")
+        failed = False
+        for class_count, room_count, teacher_count in sizes:
+            for seed in range(options['instances']):
+                classes, rooms = generate_instance(class_count, room_count, teacher_count, seed)
+                result = TimetableSolver(classes, rooms, slots_per_day, seed).solve(
+                    options['time_limit'])
+                clashes = find_violations(classes, result.assignments)
+                failed = failed or bool(clashes)
+                self.stdout.write(
+                    f"{class_count:>8} {room_count:>6} {teacher_count:>8} {seed:>5} "
+                    f"{result.seconds:>8.2f} {len(result.unassigned):>8} {result.repairs:>8}"
+                    + (f"  {len(clashes)} CLASHES" if clashes else ''))
+        if failed:
+            raise CommandError("Some timetables had clashes.")
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.recommendations import DEFAULT_TOP_K, engine_name, rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the "students who took this class also took" neighbours '
+            'of every class from current enrollments.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K,
+                            help='Neighbours kept per class.')
+        parser.add_argument('--engine', choices=['scipy', 'python'],
+                            help='Default: scipy when installed, else python.')
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1:
+            raise CommandError("--top-k must be at least 1.")
+        engine = options['engine'] or engine_name()
+        started = time.perf_counter()
+        try:
+            count = rebuild_recommendations(options['top_k'], engine)
+        except ImportError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {count} recommendations ({engine}, {time.perf_counter() - started:.2f}s)."))
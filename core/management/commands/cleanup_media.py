@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.media import abandon_stale_uploads, delete_orphan, find_orphans
+
+
+class Command(BaseCommand):
+    help = ('Lists files under MEDIA_ROOT that no database row refers to, '
+            'or deletes them with --delete.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true',
+                            help='Delete the orphans instead of listing them.')
+        parser.add_argument('--min-age', type=float, default=24,
+                            help='Hours a file must be untouched before it counts '
+                                 'as an orphan, so uploads in progress are kept.')
+
+    def handle(self, *args, **options):
+        if options['min_age'] < 0:
+            raise CommandError("--min-age cannot be negative.")
+        min_age = options['min_age'] * 3600
+        delete = options['delete']
+        if delete:
+            abandoned = abandon_stale_uploads(min_age)
+            if abandoned:
+                self.stdout.write(f"Marked {abandoned} stale upload(s) as failed.")
+
+        count = total = 0
+        for name, size in find_orphans(min_age):
+            if delete and not delete_orphan(name):
+                continue
+            if not delete or options['verbosity'] > 1:
+                self.stdout.write(name)
+            count += 1
+            total += size
+
+        verb = "Deleted" if delete else "Found"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} orphaned file(s), {total / (1024 * 1024):.1f} MB."))
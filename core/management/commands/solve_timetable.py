@@ -0,0 +1,110 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Clazz
+from core.schedule import invalidate_schedule_cache
+from core.timetable import SlotGrid, TimetableSolver, build_problem, find_violations
+
+
+def _time(value):
+    try:
+        return datetime.time.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"'{value}' is not a time (HH:MM).")
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"'{value}' is not a date (YYYY-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = ('Assigns rooms and start times to the classes of a term so that no room or '
+            'teacher is double-booked. Prints the plan; use --apply to save it.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Term start (YYYY-MM-DD), default today.')
+        parser.add_argument('--end', help='Term end (YYYY-MM-DD), default six months on.')
+        parser.add_argument('--rooms', help='Comma separated rooms, default the rooms in use.')
+        parser.add_argument('--day-start', default='07:00')
+        parser.add_argument('--day-end', default='21:00')
+        parser.add_argument('--slot-minutes', type=int, default=30)
+        parser.add_argument('--default-minutes', type=int, default=90,
+                            help='Length of classes that have no times yet.')
+        parser.add_argument('--time-limit', type=float, default=10.0)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--apply', action='store_true', help='Save the new rooms and times.')
+
+    def handle(self, *args, **options):
+        start = _date(options['start']) if options['start'] else datetime.date.today()
+        end = _date(options['end']) if options['end'] else start + datetime.timedelta(days=182)
+        try:
+            grid = SlotGrid(_time(options['day_start']), _time(options['day_end']),
+                            options['slot_minutes'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        classes = {clazz.pk: clazz for clazz in Clazz.objects.filter(
+            start_date__lte=end, end_date__gte=start).order_by('class_id')}
+        if options['rooms']:
+            rooms = [room.strip() for room in options['rooms'].split(',') if room.strip()]
+        else:
+            rooms = sorted({clazz.room for clazz in classes.values() if clazz.room})
+        if not rooms:
+            raise CommandError("No rooms to assign; pass --rooms.")
+
+        problem = build_problem(classes.values(), grid, options['default_minutes'])
+        result = TimetableSolver(problem, rooms, grid.slots_per_day, options['seed']).solve(
+            options['time_limit'])
+        if find_violations(problem, result.assignments):
+            raise CommandError("The solver produced a clashing timetable; nothing was saved.")
+
+        changed = []
+        for item in problem:
+            room, slot = result.assignments.get(item.key, (None, None))
+            if room is None:
+                continue
+            clazz = classes[item.key]
+            if slot == item.preferred_start:
+                # Left in place; the slots only approximate its times.
+                start_time, end_time = clazz.start_time, clazz.end_time
+            elif item.preferred_start is not None or (
+                    clazz.start_time and clazz.end_time and clazz.end_time > clazz.start_time):
+                start_time, end_time = grid.move(clazz.start_time, clazz.end_time, slot)
+            else:
+                start_time, end_time = grid.time_of(slot), grid.time_of(slot + item.duration)
+            if (clazz.room, clazz.start_time, clazz.end_time) != (room, start_time, end_time):
+                self.stdout.write(
+                    f"{clazz.class_name}: {clazz.room} {_hhmm(clazz.start_time)}-{_hhmm(clazz.end_time)}"
+                    f" -> {room} {_hhmm(start_time)}-{_hhmm(end_time)}")
+                clazz.room, clazz.start_time, clazz.end_time = room, start_time, end_time
+                changed.append(clazz)
+
+        for key in result.unassigned:
+            self.stdout.write(self.style.WARNING(f"No conflict-free place for {classes[key].class_name}."))
+        self.stdout.write(
+            f"{len(problem)} classes, {len(rooms)} rooms: {len(changed)} to change, "
+            f"{len(result.unassigned)} unplaced, {result.seconds:.2f}s.")
+
+        if options['apply'] and changed:
+            now = timezone.now()
+            for clazz in changed:
+                clazz.updated_at = now
+            with transaction.atomic():
+                Clazz.objects.bulk_update(
+                    changed, ['room', 'start_time', 'end_time', 'updated_at'], batch_size=500)
+                # bulk_update() skips save(), so move the sessions ourselves.
+                for clazz in changed:
+                    clazz.sync_sessions()
+            # It skips the post_save handlers too.
+            invalidate_schedule_cache()
+            self.stdout.write(self.style.SUCCESS(f"Saved {len(changed)} classes."))
+
+
+def _hhmm(value):
+    return value.strftime('%H:%M') if value else '--:--'
@@ -0,0 +1,134 @@
+"""
+Finds files under MEDIA_ROOT that no database row refers to.
+
+Rows that are deleted or get a new file give their blob back through
+core.storage, but files from before the blob store, interrupted uploads and
+crashes between writing a file and saving its row are left behind. The
+`cleanup_media` command lists or deletes them.
+
+Referenced names are collected from every FileField with
+`values_list(...).iterator()` and kept as 8-byte digests, and MEDIA_ROOT is
+walked with `os.scandir`, one directory at a time, so memory stays small
+even with millions of files. A digest collision can only keep an orphan,
+never delete a file that is in use.
+"""
+import hashlib
+import os
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FileField
+from django.utils import timezone
+
+from .models import StoredBlob, UploadSession
+from .storage import BLOB_DIR
+
+REFERENCE_CHUNK_SIZE = 5000
+
+
+def _key(name):
+    return hashlib.blake2b(name.replace('\\', '/').lstrip('/').encode(), digest_size=8).digest()
+
+
+def referenced_keys(min_age):
+    """Digests of every stored file name, including the chunks of uploads
+    that were active within `min_age` seconds."""
+    keys = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if not isinstance(field, FileField):
+                continue
+            names = (model._base_manager.exclude(**{field.attname: ''})
+                     .exclude(**{f'{field.attname}__isnull': True})
+                     .values_list(field.attname, flat=True))
+            keys.update(_key(name) for name in names.iterator(chunk_size=REFERENCE_CHUNK_SIZE))
+
+    active = UploadSession.objects.filter(
+        status='open', updated_at__gte=timezone.now() - timedelta(seconds=min_age))
+    for upload in active.only('chunk_names').iterator():
+        keys.update(_key(name) for name in upload.chunk_names)
+    return keys
+
+
+def walk_media(root):
+    """Yields (name relative to root, DirEntry) for every file below root."""
+    pending = ['']
+    while pending:
+        prefix = pending.pop()
+        try:
+            entries = os.scandir(os.path.join(root, prefix))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = f'{prefix}/{entry.name}' if prefix else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry
+
+
+def find_orphans(min_age, root=None):
+    """Yields (name, size) of unreferenced files older than `min_age` seconds."""
+    root = str(root or settings.MEDIA_ROOT)
+    keys = referenced_keys(min_age)
+    cutoff = time.time() - min_age
+    for name, entry in walk_media(root):
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime <= cutoff and _key(name) not in keys:
+            yield name, stat.st_size
+
+
+def abandon_stale_uploads(min_age):
+    """Fails open uploads idle for `min_age` seconds, whose chunks are then
+    orphans."""
+    return UploadSession.objects.filter(
+        status='open', updated_at__lt=timezone.now() - timedelta(seconds=min_age),
+    ).update(status='failed', updated_at=timezone.now())
+
+
+def _is_referenced(name):
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if (isinstance(field, FileField) and
+                    model._base_manager.filter(**{field.attname: name}).exists()):
+                return True
+    return False
+
+
+def _remove(root, name):
+    # A blob row means the same content was stored again in the meantime.
+    if name.startswith(f'{BLOB_DIR}/') and StoredBlob.objects.filter(name=name).exists():
+        return
+    path = os.path.join(root, name)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    # Drop directories the file leaves empty, e.g. blobs/ab/<digest>/.
+    parent = os.path.dirname(path)
+    while os.path.normpath(parent) != os.path.normpath(root):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
+
+
+def delete_orphan(name, root=None):
+    """Deletes a file found by find_orphans() unless a row has come to refer
+    to it since, and returns whether it was deleted."""
+    root = str(root or settings.MEDIA_ROOT)
+    with transaction.atomic():
+        # Holds off an upload of the same content (core.storage) until the
+        # blob row is gone; otherwise it would get this name back.
+        blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+        if _is_referenced(name):
+            return False
+        if blob is not None:
+            blob.delete()
+        transaction.on_commit(lambda: _remove(root, name))
+    return True
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:38
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# A frozen copy of core.schedule.parse_weekdays, so later changes to the
+# parser do not change what this migration writes.
+_ENGLISH_PREFIXES = {name[:3]: index for index, name in enumerate(
+    ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'))}
+_VIETNAMESE_DAY = re.compile(r'\b(?:(?:thu\s*|t)([2-7])|thu\s+(hai|ba|tu|nam|sau|bay))\b')
+_VIETNAMESE_NUMBERS = {'hai': 2, 'ba': 3, 'tu': 4, 'nam': 5, 'sau': 6, 'bay': 7}
+_VIETNAMESE_SUNDAY = re.compile(r'\b(?:chu\s*nhat|cn)\b')
+_WORD = re.compile(r'[a-z]+')
+
+
+def parse_weekdays(text):
+    if not text:
+        return 0
+    decomposed = unicodedata.normalize('NFD', text.lower())
+    normalized = ''.join(ch for ch in decomposed
+                         if not unicodedata.combining(ch)).replace('đ', 'd')
+    mask = 0
+    for match in _VIETNAMESE_DAY.finditer(normalized):
+        number = match.group(1) or _VIETNAMESE_NUMBERS[match.group(2)]
+        mask |= 1 << (int(number) - 2)
+    if _VIETNAMESE_SUNDAY.search(normalized):
+        mask |= 1 << 6
+    normalized = _VIETNAMESE_SUNDAY.sub(' ', _VIETNAMESE_DAY.sub(' ', normalized))
+    for word in _WORD.findall(normalized):
+        if len(word) >= 3 and word[:3] in _ENGLISH_PREFIXES:
+            mask |= 1 << _ENGLISH_PREFIXES[word[:3]]
+    return mask
+
+
+def backfill_weekday_mask(apps, schema_editor):
+    Clazz = apps.get_model('core', 'Clazz')
+    classes = list(Clazz.objects.exclude(day_of_week__isnull=True).exclude(
+        day_of_week='').only('pk', 'day_of_week'))
+    for clazz in classes:
+        clazz.weekday_mask = parse_weekdays(clazz.day_of_week)
+    Clazz.objects.bulk_update(classes, ['weekday_mask'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_admin_alter_clazz_staff_student_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clazz',
+            name='weekday_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Weekday Mask'),
+        ),
+        migrations.RunPython(backfill_weekday_mask,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A frozen copy of core.schedule.weekdays_from_mask, so later changes to the
+# helper do not change what this migration writes.
+def weekdays_from_mask(mask):
+    return [day for day in range(7) if mask & (1 << day)]
+
+
+def backfill_class_weekdays(apps, schema_editor):
+    Clazz = apps.get_model('core', 'Clazz')
+    ClassWeekday = apps.get_model('core', 'ClassWeekday')
+    rows = [ClassWeekday(clazz_id=pk, weekday=day)
+            for pk, mask in Clazz.objects.values_list('pk', 'weekday_mask').iterator()
+            for day in weekdays_from_mask(mask)]
+    ClassWeekday.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_clazz_weekday_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassWeekday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(verbose_name='Weekday')),
+                ('clazz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekdays', to='core.clazz', verbose_name='Class')),
+            ],
+            options={
+                'verbose_name': 'Class Weekday',
+                'verbose_name_plural': 'Class Weekdays',
+                'indexes': [models.Index(fields=['weekday', 'clazz'], name='core_classw_weekday_fd764f_idx')],
+                'unique_together': {('clazz', 'weekday')},
+            },
+        ),
+        migrations.RunPython(backfill_class_weekdays,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:57
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copies of core.schedule.iter_class_dates and the helper it uses, so
+# later changes to them do not change what this migration writes.
+def weekdays_from_mask(mask):
+    return [day for day in range(7) if mask & (1 << day)]
+
+
+def iter_class_dates(clazz, start, end):
+    first = max(start, clazz.start_date)
+    last = min(end, clazz.end_date)
+    if first > last:
+        return
+    for weekday in weekdays_from_mask(clazz.weekday_mask):
+        day = first + datetime.timedelta(days=(weekday - first.weekday()) % 7)
+        while day <= last:
+            yield day
+            day += datetime.timedelta(days=7)
+
+
+def backfill_class_sessions(apps, schema_editor):
+    Clazz = apps.get_model('core', 'Clazz')
+    ClassSession = apps.get_model('core', 'ClassSession')
+    Attendance = apps.get_model('core', 'Attendance')
+    AttendanceSession = apps.get_model('core', 'AttendanceSession')
+
+    sessions = {}
+    for clazz in Clazz.objects.all().iterator():
+        for day in iter_class_dates(clazz, clazz.start_date, clazz.end_date):
+            sessions[(clazz.pk, day)] = ClassSession(
+                clazz_id=clazz.pk, date=day, start_time=clazz.start_time, end_time=clazz.end_time)
+
+    # Attendance taken on off-schedule days becomes an extra session.
+    times = {pk: (start, end) for pk, start, end in
+             Clazz.objects.values_list('pk', 'start_time', 'end_time')}
+    held = set(Attendance.objects.values_list('enrollment__clazz_id', 'date').distinct())
+    held |= set(AttendanceSession.objects.values_list('clazz_id', 'date').distinct())
+    for clazz_id, day in held - sessions.keys():
+        start, end = times[clazz_id]
+        sessions[(clazz_id, day)] = ClassSession(
+            clazz_id=clazz_id, date=day, start_time=start, end_time=end, is_extra=True)
+    ClassSession.objects.bulk_create(sessions.values(), batch_size=500)
+
+    session_ids = {(clazz_id, day): pk for pk, clazz_id, day in
+                   ClassSession.objects.values_list('pk', 'clazz_id', 'date').iterator()}
+    attendances = list(Attendance.objects.values_list('pk', 'enrollment__clazz_id', 'date'))
+    Attendance.objects.bulk_update(
+        [Attendance(pk=pk, session_id=session_ids[(clazz_id, day)]) for pk, clazz_id, day in attendances],
+        ['session'], batch_size=500)
+    qr_sessions = list(AttendanceSession.objects.values_list('pk', 'clazz_id', 'date'))
+    AttendanceSession.objects.bulk_update(
+        [AttendanceSession(pk=pk, class_session_id=session_ids[(clazz_id, day)])
+         for pk, clazz_id, day in qr_sessions],
+        ['class_session'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_classweekday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassSession',
+            fields=[
+                ('session_id', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField(verbose_name='Date')),
+                ('start_time', models.TimeField(blank=True, null=True, verbose_name='Start Time')),
+                ('end_time', models.TimeField(blank=True, null=True, verbose_name='End Time')),
+                ('is_extra', models.BooleanField(default=False, verbose_name='Extra Session')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('clazz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='core.clazz', verbose_name='Class')),
+            ],
+            options={
+                'verbose_name': 'Class Session',
+                'verbose_name_plural': 'Class Sessions',
+            },
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendances', to='core.classsession', verbose_name='Session'),
+        ),
+        migrations.AddField(
+            model_name='attendancesession',
+            name='class_session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='qr_sessions', to='core.classsession', verbose_name='Class Session'),
+        ),
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(fields=['date', 'clazz'], name='core_classs_date_d97c6e_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='classsession',
+            unique_together={('clazz', 'date')},
+        ),
+        migrations.RunPython(backfill_class_sessions,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_seats_taken(apps, schema_editor):
+    Clazz = apps.get_model('core', 'Clazz')
+    Enrollment = apps.get_model('core', 'Enrollment')
+    approved = Enrollment.objects.filter(clazz=OuterRef('pk'), status='approved').values(
+        'clazz').annotate(count=Count('pk')).values('count')
+    Clazz.objects.update(seats_taken=Coalesce(Subquery(approved), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_classsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clazz',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Leave empty for no limit.', null=True, verbose_name='Capacity'),
+        ),
+        migrations.AddField(
+            model_name='clazz',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Seats Taken'),
+        ),
+        migrations.RunPython(backfill_seats_taken,
+                             migrations.RunPython.noop),
+    ]
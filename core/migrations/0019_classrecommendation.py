@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_enrollment_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Similarity')),
+                ('clazz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='core.clazz', verbose_name='Class')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_by', to='core.clazz', verbose_name='Similar Class')),
+            ],
+            options={
+                'verbose_name': 'Class Recommendation',
+                'verbose_name_plural': 'Class Recommendations',
+                'unique_together': {('clazz', 'similar')},
+            },
+        ),
+    ]
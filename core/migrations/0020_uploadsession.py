@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:17
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_classrecommendation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('purpose', models.CharField(choices=[('material', 'Class Material'), ('submission', 'Assignment Submission')], max_length=20, verbose_name='Purpose')),
+                ('target_id', models.PositiveIntegerField(verbose_name='Target')),
+                ('title', models.CharField(blank=True, max_length=255, verbose_name='Title')),
+                ('filename', models.CharField(max_length=255, verbose_name='File Name')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Size')),
+                ('chunk_size', models.PositiveIntegerField(verbose_name='Chunk Size')),
+                ('received', models.PositiveBigIntegerField(default=0, verbose_name='Bytes Received')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='SHA-256')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('complete', 'Complete'), ('failed', 'Failed')], default='open', max_length=10, verbose_name='Status')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Upload Session',
+                'verbose_name_plural': 'Upload Sessions',
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='core_upload_status_f56ba6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:22
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Storage Name')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Size')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='References')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Stored Blob',
+                'verbose_name_plural': 'Stored Blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='assignmentsubmission',
+            name='submission_file',
+            field=models.FileField(max_length=255, storage=core.storage.get_blob_storage, upload_to='assignment_submissions/', verbose_name='Submission File'),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='file',
+            field=models.FileField(max_length=255, storage=core.storage.get_blob_storage, upload_to='class_materials/', verbose_name='File'),
+        ),
+    ]
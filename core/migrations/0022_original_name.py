@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_storedblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignmentsubmission',
+            name='original_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Original File Name'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='original_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Original File Name'),
+        ),
+    ]
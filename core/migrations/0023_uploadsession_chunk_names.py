@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:15
+
+from django.db import migrations, models
+
+
+def record_chunk_names(apps, schema_editor):
+    # Open uploads keep the chunks they stored under the fixed names used so far.
+    UploadSession = apps.get_model('core', 'UploadSession')
+    for upload in UploadSession.objects.filter(status='open', received__gt=0):
+        received = -(-upload.received // upload.chunk_size)
+        upload.chunk_names = [f"uploads/{upload.upload_id}/{index:06d}.part"
+                              for index in range(received)]
+        upload.save(update_fields=['chunk_names'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_original_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='chunk_names',
+            field=models.JSONField(default=list, editable=False, verbose_name='Chunk Names'),
+        ),
+        migrations.RunPython(record_chunk_names, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,46 @@
-from django.db import models
+import os
+import uuid
+from functools import partial
+
+from django.db import models, transaction
+from django.db.models import (
+    BooleanField, Case, Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value, When)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.dispatch import Signal
+
+from .schedule import iter_class_dates, parse_weekdays, weekdays_from_mask
+from .storage import get_blob_storage
+
+
+class TracksLoadedValues:
+    """Remembers the column values a row was loaded with, so signal handlers
+    can tell which fields a save actually changed."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def has_changed(self, *attnames):
+        """True for unsaved rows, including copies of a loaded row with the
+        pk cleared, or if any of `attnames` differs from the loaded value."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or self.pk is None or self._state.adding:
+            return True
+        return any(name in loaded and getattr(self, name) != loaded[name]
+                   for name in attnames)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {field.attname: getattr(self, field.attname)
+                               for field in self._meta.concrete_fields
+                               if field.attname not in deferred}
 
 # Role-Specific Models
 
@@ -85,7 +123,36 @@ class ClassType(models.Model):
         return self.code
 
 
-class Clazz(models.Model):
+class ClassFullError(Exception):
+    """Raised when approving an enrollment in a class with no seats left."""
+
+
+class ClazzQuerySet(models.QuerySet):
+    def with_free_seats(self):
+        return self.filter(Q(capacity__isnull=True) | Q(seats_taken__lt=F('capacity')))
+
+    def claim_seat(self):
+        """Takes a seat in each class that has one free, in a single
+        conditional UPDATE, and returns how many classes were updated."""
+        return self.with_free_seats().update(seats_taken=F('seats_taken') + 1)
+
+    def release_seats(self, count=1):
+        return self.filter(seats_taken__gte=count).update(seats_taken=F('seats_taken') - count)
+
+    def promote_waitlist(self):
+        """Approves waitlisted requests into the free seats of each class,
+        oldest first, and returns how many were promoted."""
+        promoted = 0
+        with transaction.atomic():
+            for clazz in self.select_for_update().only('capacity', 'seats_taken'):
+                count = clazz.enrollments.promote(limit=clazz.seats_left)
+                if count:
+                    Clazz.objects.filter(pk=clazz.pk).update(seats_taken=F('seats_taken') + count)
+                promoted += count
+        return promoted
+
+
+class Clazz(TracksLoadedValues, models.Model):
     class_id = models.AutoField(primary_key=True)
     class_name = models.CharField(max_length=100, verbose_name="Class Name")
     class_type = models.ForeignKey(
@@ -109,19 +176,252 @@ class Clazz(models.Model):
     start_time = models.TimeField(
         verbose_name="Start Time", null=True, blank=True)
     end_time = models.TimeField(verbose_name="End Time", null=True, blank=True)
+    # Parsed from day_of_week on save; bit 0 is Monday (see core.schedule).
+    weekday_mask = models.PositiveSmallIntegerField(
+        default=0, editable=False, verbose_name="Weekday Mask")
+    capacity = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Leave empty for no limit.", verbose_name="Capacity")
+    # Approved enrollments; kept in step by Enrollment.save() and the
+    # ClazzQuerySet seat methods instead of counting rows.
+    seats_taken = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Seats Taken")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Fields that ClassSession rows are generated from.
+    SESSION_FIELDS = ('weekday_mask', 'start_date', 'end_date', 'start_time', 'end_time')
+    # Fields shown in calendars; changing one invalidates cached schedules.
+    SCHEDULE_FIELDS = ('class_name', 'room', 'teacher_id', 'day_of_week',
+                       'start_date', 'end_date', 'start_time', 'end_time')
+    # Fields shown with cached assignment progress (core.assignments).
+    PROGRESS_FIELDS = ('class_name', 'teacher_id')
+
     class Meta:
         verbose_name = "Class"
         verbose_name_plural = "Classes"
 
+    objects = ClazzQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.class_name} ({self.class_id})"
 
+    @property
+    def seats_left(self):
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.seats_taken, 0)
+
+    @property
+    def is_full(self):
+        return self.seats_left == 0
+
+    def save(self, *args, **kwargs):
+        self.weekday_mask = parse_weekdays(self.day_of_week)
+        existing = (self.pk is not None and not self._state.adding
+                    and not kwargs.get('force_insert'))
+        if kwargs.get('update_fields') is None and existing:
+            # Never write back a stale seats_taken over concurrent claims.
+            skipped = self.get_deferred_fields() | {'seats_taken'}
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.attname not in skipped]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'day_of_week' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'weekday_mask'}
+        weekdays_changed = self.has_changed('weekday_mask')
+        sessions_changed = self.has_changed(*self.SESSION_FIELDS)
+        capacity_changed = not self._state.adding and self.has_changed('capacity')
+        super().save(*args, **kwargs)
+        if capacity_changed:
+            Clazz.objects.filter(pk=self.pk).promote_waitlist()
+        if weekdays_changed:
+            self.sync_weekdays()
+        if sessions_changed:
+            self.sync_sessions()
+
+    def sync_weekdays(self):
+        """Brings the ClassWeekday rows in line with weekday_mask."""
+        wanted = set(weekdays_from_mask(self.weekday_mask))
+        existing = set(self.weekdays.values_list('weekday', flat=True))
+        if existing - wanted:
+            self.weekdays.filter(weekday__in=existing - wanted).delete()
+        ClassWeekday.objects.bulk_create(
+            [ClassWeekday(clazz=self, weekday=day) for day in sorted(wanted - existing)])
+
+
+    def sync_sessions(self):
+        """Regenerates the scheduled ClassSession rows, touching only the
+        dates and times that differ. Dropped dates that already have
+        attendance are kept as extra sessions."""
+        wanted = set(iter_class_dates(self, self.start_date, self.end_date))
+        existing = {session.date: session for session in self.sessions.all()}
+
+        dropped = ClassSession.objects.filter(
+            pk__in=[s.pk for day, s in existing.items() if day not in wanted and not s.is_extra])
+        held = dropped.filter(Q(attendances__isnull=False) | Q(qr_sessions__isnull=False))
+        ClassSession.objects.filter(pk__in=held.values('pk')).update(is_extra=True)
+        dropped.exclude(pk__in=held.values('pk')).delete()
+
+        now = timezone.now()
+        changed = []
+        for day in wanted & existing.keys():
+            session = existing[day]
+            if (session.start_time, session.end_time, session.is_extra) != (self.start_time, self.end_time, False):
+                session.start_time, session.end_time = self.start_time, self.end_time
+                session.is_extra = False
+                # bulk_update() bypasses auto_now, so stamp it ourselves.
+                session.updated_at = now
+                changed.append(session)
+        ClassSession.objects.bulk_update(
+            changed, ['start_time', 'end_time', 'is_extra', 'updated_at'], batch_size=500)
+        ClassSession.objects.bulk_create(
+            [ClassSession(clazz=self, date=day, start_time=self.start_time, end_time=self.end_time)
+             for day in sorted(wanted - existing.keys())], batch_size=500)
+
+
+class ClassWeekday(models.Model):
+    """One row per weekday a class meets on (0 is Monday), kept in sync with
+    Clazz.day_of_week so "classes on a given day" is an indexed lookup."""
+    clazz = models.ForeignKey(
+        Clazz, on_delete=models.CASCADE, related_name="weekdays", verbose_name="Class")
+    weekday = models.PositiveSmallIntegerField(verbose_name="Weekday")
+
+    class Meta:
+        unique_together = ('clazz', 'weekday')
+        indexes = [models.Index(fields=['weekday', 'clazz'])]
+        verbose_name = "Class Weekday"
+        verbose_name_plural = "Class Weekdays"
 
-class Enrollment(models.Model):
+    def __str__(self):
+        return f"{self.clazz.class_name} on weekday {self.weekday}"
+
+
+# Overall score weights: average of the four mini tests, midterm, final test.
+MINITEST_WEIGHT = 0.2
+MIDTERM_WEIGHT = 0.3
+FINAL_WEIGHT = 0.5
+PASS_SCORE = 4.0
+
+
+# Sent after a bulk EnrollmentQuerySet transition that approves or waitlists
+# requests, once per batch, with the `pks` of the batch and the `fields` that
+# were set. Queryset updates skip post_save, so receivers that react to
+# enrollment changes listen here too. Rejections and payment marks run as a
+# single UPDATE without it; they touch no seat, calendar or progress count.
+enrollments_updated = Signal()
+
+BULK_BATCH_SIZE = 500
+
+
+def _batches(pks):
+    for start in range(0, len(pks), BULK_BATCH_SIZE):
+        yield pks[start:start + BULK_BATCH_SIZE]
+
+
+class EnrollmentQuerySet(models.QuerySet):
+    def with_overall_score(self):
+        """
+        Annotates `overall_score` (20% mini test average, 30% midterm,
+        50% final test, missing scores counted as 0) and `is_passed`,
+        computed by the database so it can be filtered and ordered on.
+        """
+        def score(field_name):
+            return Coalesce(F(field_name), Value(0.0), output_field=FloatField())
+
+        mini_avg = (score('minitest1') + score('minitest2') +
+                    score('minitest3') + score('minitest4')) / Value(4.0)
+        overall = (mini_avg * Value(MINITEST_WEIGHT) +
+                   score('midterm') * Value(MIDTERM_WEIGHT) +
+                   score('final_test') * Value(FINAL_WEIGHT))
+        return self.annotate(overall_score=overall).annotate(
+            is_passed=Case(
+                When(overall_score__gte=PASS_SCORE, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ))
+
+    def _transition(self, condition, **changes):
+        """Sets `changes` on the rows matching `condition` in one UPDATE and
+        returns the number of rows changed. Rows changed concurrently no
+        longer match and are skipped."""
+        return self.filter(condition).update(updated_at=timezone.now(), **changes)
+
+    def _update_batches(self, pks, condition, changes):
+        # One conditional UPDATE per batch of ids; must run in a transaction.
+        now = timezone.now()
+        changed = 0
+        for batch in _batches(pks):
+            changed += self.model.objects.filter(condition, pk__in=batch).update(
+                updated_at=now, **changes)
+            transaction.on_commit(partial(
+                enrollments_updated.send, sender=self.model, pks=batch, fields=tuple(changes)))
+        return changed
+
+    def in_batches(self, pks):
+        """Splits the rows with the given ids into querysets of at most
+        BULK_BATCH_SIZE ids each, oldest request first, so no single query
+        passes more ids than the database accepts. Run the batches in one
+        transaction to apply a transition to all of them."""
+        rows = []
+        for batch in _batches(list(pks)):
+            rows += self.filter(pk__in=batch).values_list('enrollment_date', 'pk')
+        return [self.filter(pk__in=batch) for batch in _batches([pk for _, pk in sorted(rows)])]
+
+    def approve(self, paid=None):
+        """Approves the pending requests, optionally setting `is_paid`,
+        oldest first until each class is full; the rest are waitlisted.
+        Returns the numbers of approved and waitlisted requests."""
+        changes = {'status': 'approved'}
+        if paid is not None:
+            changes['is_paid'] = paid
+        approved = waitlisted = 0
+        with transaction.atomic():
+            by_class = {}
+            for pk, clazz_id in self.filter(status='pending').order_by(
+                    'enrollment_date', 'pk').values_list('pk', 'clazz_id'):
+                by_class.setdefault(clazz_id, []).append(pk)
+            for clazz_id, pks in by_class.items():
+                # The row lock holds off concurrent claims until we commit.
+                clazz = Clazz.objects.select_for_update().only(
+                    'capacity', 'seats_taken').get(pk=clazz_id)
+                if clazz.seats_left is not None:
+                    waitlisted += self._update_batches(
+                        pks[clazz.seats_left:], Q(status='pending'), {'status': 'waitlisted'})
+                    pks = pks[:clazz.seats_left]
+                count = self._update_batches(pks, Q(status='pending'), changes)
+                if count:
+                    Clazz.objects.filter(pk=clazz_id).update(seats_taken=F('seats_taken') + count)
+                approved += count
+        return approved, waitlisted
+
+    def promote(self, limit=None):
+        """Approves up to `limit` waitlisted requests, oldest first, and
+        returns how many were approved. The caller holds the class row and
+        adds them to its seats_taken."""
+        with transaction.atomic():
+            # Served by the (clazz, status, enrollment_date) index.
+            pks = list(self.filter(status='waitlisted').order_by(
+                'enrollment_date', 'pk').values_list('pk', flat=True)[:limit])
+            return self._update_batches(pks, Q(status='waitlisted'), {'status': 'approved'})
+
+    def with_waitlist_position(self):
+        """Annotates `waitlist_position`, 1 for the head of a class's waitlist."""
+        ahead = (Enrollment.objects
+                 .filter(clazz=OuterRef('clazz_id'), status='waitlisted')
+                 .filter(Q(enrollment_date__lt=OuterRef('enrollment_date')) |
+                         Q(enrollment_date=OuterRef('enrollment_date'), pk__lt=OuterRef('pk')))
+                 .order_by().values('clazz').annotate(n=Count('pk')).values('n'))
+        return self.annotate(waitlist_position=Coalesce(
+            Subquery(ahead, output_field=IntegerField()), 0) + 1)
+
+    def reject(self):
+        return self._transition(Q(status__in=['pending', 'waitlisted']), status='rejected')
+
+    def mark_paid(self):
+        return self._transition(Q(is_paid=False), is_paid=True)
+
+
+class Enrollment(TracksLoadedValues, models.Model):
     enrollment_id = models.AutoField(primary_key=True)
     student = models.ForeignKey(
         Student, on_delete=models.CASCADE, related_name="enrollments", verbose_name="Student")
@@ -130,7 +430,8 @@ class Enrollment(models.Model):
     enrollment_date = models.DateField(
         default=timezone.now, verbose_name="Enrollment Date")
     status = models.CharField(max_length=20, choices=[('pending', 'Pending'), (
-        'approved', 'Approved'), ('rejected', 'Rejected')], default='pending', verbose_name="Status")
+        'approved', 'Approved'), ('waitlisted', 'Waitlisted'), ('rejected', 'Rejected')],
+        default='pending', verbose_name="Status")
     is_paid = models.BooleanField(default=False, verbose_name="Payment Status")
 
     minitest1 = models.FloatField(
@@ -148,14 +449,93 @@ class Enrollment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EnrollmentQuerySet.as_manager()
+
     class Meta:
         unique_together = ('student', 'clazz')
+        indexes = [models.Index(fields=['clazz', 'status', 'enrollment_date'])]
         verbose_name = "Enrollment"
         verbose_name_plural = "Enrollments"
 
     def __str__(self):
         return f"{self.student.full_name} enrolled in {self.clazz.class_name}"
 
+    def save(self, *args, **kwargs):
+        if not self.has_changed('status', 'clazz_id'):
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            # Compare with the locked row, not the loaded copy, so that two
+            # concurrent approvals cannot both take a seat.
+            current = None
+            if self.pk is not None:
+                current = Enrollment.objects.select_for_update().filter(
+                    pk=self.pk).values_list('status', 'clazz_id').first()
+            held = current[1] if current and current[0] == 'approved' else None
+            wanted = self.clazz_id if self.status == 'approved' else None
+            if held == wanted:
+                return super().save(*args, **kwargs)
+            if wanted is not None and not Clazz.objects.filter(pk=wanted).claim_seat():
+                raise ClassFullError(f"{self.clazz.class_name} is full.")
+            super().save(*args, **kwargs)
+            if held is not None:
+                # The freed seat goes to the head of that class's waitlist.
+                freed = Clazz.objects.filter(pk=held)
+                freed.release_seats()
+                freed.promote_waitlist()
+
+
+class ClassRecommendation(models.Model):
+    """Students who enrolled in `clazz` also enrolled in `similar`. The top
+    neighbours of each class are rebuilt by `manage.py build_recommendations`."""
+    clazz = models.ForeignKey(
+        Clazz, on_delete=models.CASCADE, related_name="neighbours", verbose_name="Class")
+    similar = models.ForeignKey(
+        Clazz, on_delete=models.CASCADE, related_name="recommended_by", verbose_name="Similar Class")
+    score = models.FloatField(verbose_name="Similarity")
+
+    class Meta:
+        unique_together = ('clazz', 'similar')
+        verbose_name = "Class Recommendation"
+        verbose_name_plural = "Class Recommendations"
+
+    def __str__(self):
+        return f"{self.clazz.class_name} -> {self.similar.class_name} ({self.score:.2f})"
+
+
+class ClassSession(models.Model):
+    """One meeting of a class, materialized from its schedule by
+    Clazz.sync_sessions(). Sessions held on off-schedule days are marked
+    is_extra and survive schedule changes."""
+    session_id = models.AutoField(primary_key=True)
+    clazz = models.ForeignKey(
+        Clazz, on_delete=models.CASCADE, related_name="sessions", verbose_name="Class")
+    date = models.DateField(verbose_name="Date")
+    start_time = models.TimeField(
+        verbose_name="Start Time", null=True, blank=True)
+    end_time = models.TimeField(verbose_name="End Time", null=True, blank=True)
+    is_extra = models.BooleanField(default=False, verbose_name="Extra Session")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('clazz', 'date')
+        indexes = [models.Index(fields=['date', 'clazz'])]
+        verbose_name = "Class Session"
+        verbose_name_plural = "Class Sessions"
+
+    def __str__(self):
+        return f"{self.clazz.class_name} on {self.date}"
+
+    @classmethod
+    def for_date(cls, clazz, date):
+        """The session of `clazz` on `date`; an extra one is created for an
+        off-schedule date."""
+        session, _ = cls.objects.get_or_create(
+            clazz=clazz, date=date,
+            defaults={'start_time': clazz.start_time, 'end_time': clazz.end_time, 'is_extra': True})
+        return session
+
 
 class Attendance(models.Model):
     attendance_id = models.AutoField(primary_key=True)
@@ -164,6 +544,8 @@ class Attendance(models.Model):
     date = models.DateField(verbose_name="Date")
     status = models.CharField(max_length=20, choices=[(
         'Present', 'Present'), ('Absent', 'Absent'), ('Excused', 'Excused')], verbose_name="Status")
+    session = models.ForeignKey(ClassSession, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name="attendances", verbose_name="Session")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -181,6 +563,8 @@ class AttendanceSession(models.Model):
     clazz = models.ForeignKey(Clazz, on_delete=models.CASCADE,
                               related_name="attendance_sessions", verbose_name="Class")
     date = models.DateField(default=timezone.now, verbose_name="Date")
+    class_session = models.ForeignKey(ClassSession, on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name="qr_sessions", verbose_name="Class Session")
     token = models.CharField(max_length=64, unique=True,
                              verbose_name="Session Token")
     passcode = models.CharField(
@@ -237,9 +621,14 @@ class Message(models.Model):
         return f"From {self.sender.username} to {self.recipient.username}: {self.subject}"
 
 
-class Material(models.Model):
+class Material(TracksLoadedValues, models.Model):
     title = models.CharField(max_length=255, verbose_name="Title")
-    file = models.FileField(upload_to='class_materials/', verbose_name="File")
+    file = models.FileField(upload_to='class_materials/', storage=get_blob_storage,
+                            max_length=255, verbose_name="File")
+    # Identical uploads share one stored file, whose name is the first
+    # uploader's; this is the name this row's file was uploaded with.
+    original_name = models.CharField(
+        max_length=255, blank=True, editable=False, verbose_name="Original File Name")
     clazz = models.ForeignKey(
         Clazz, related_name='materials', on_delete=models.CASCADE, verbose_name="Class")
     uploaded_at = models.DateTimeField(auto_now_add=True)
@@ -247,6 +636,10 @@ class Material(models.Model):
     def __str__(self):
         return f"{self.title} ({self.clazz.class_name})"
 
+    @property
+    def file_name(self):
+        return self.original_name or os.path.basename(self.file.name)
+
 
 class Announcement(models.Model):
     title = models.CharField(max_length=255, verbose_name="Title")
@@ -259,7 +652,7 @@ class Announcement(models.Model):
         return f"{self.title} ({self.clazz.class_name})"
 
 
-class Assignment(models.Model):
+class Assignment(TracksLoadedValues, models.Model):
     title = models.CharField(max_length=255, verbose_name="Title")
     description = models.TextField(verbose_name="Description")
     due_date = models.DateTimeField(verbose_name="Due Date")
@@ -271,13 +664,16 @@ class Assignment(models.Model):
         return f"{self.title} ({self.clazz.class_name})"
 
 
-class AssignmentSubmission(models.Model):
+class AssignmentSubmission(TracksLoadedValues, models.Model):
     assignment = models.ForeignKey(
         Assignment, related_name='submissions', on_delete=models.CASCADE, verbose_name="Assignment")
     student = models.ForeignKey(
         Student, related_name='submissions', on_delete=models.CASCADE, verbose_name="Student")
     submission_file = models.FileField(
-        upload_to='assignment_submissions/', verbose_name="Submission File")
+        upload_to='assignment_submissions/', storage=get_blob_storage,
+        max_length=255, verbose_name="Submission File")
+    original_name = models.CharField(
+        max_length=255, blank=True, editable=False, verbose_name="Original File Name")
     submitted_at = models.DateTimeField(
         auto_now_add=True, verbose_name="Submitted At")
     grade = models.FloatField(null=True, blank=True, verbose_name="Grade")
@@ -291,6 +687,78 @@ class AssignmentSubmission(models.Model):
     def __str__(self):
         return f"{self.student.full_name} - {self.assignment.title}"
 
+    @property
+    def file_name(self):
+        return self.original_name or os.path.basename(self.submission_file.name)
+
+
+class StoredBlob(models.Model):
+    """A file in the content-addressed storage (core.storage) and the number
+    of references handed out for it."""
+    digest = models.CharField(max_length=64, primary_key=True, verbose_name="SHA-256")
+    name = models.CharField(max_length=255, unique=True, verbose_name="Storage Name")
+    size = models.PositiveBigIntegerField(verbose_name="Size")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="References")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Stored Blob"
+        verbose_name_plural = "Stored Blobs"
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class UploadSession(models.Model):
+    """A resumable upload, received as fixed-size chunks in the storage
+    backend and assembled into a material or a submission file once the
+    last chunk is in (see dashboard.uploads)."""
+    PURPOSE_CHOICES = [
+        ('material', 'Class Material'),
+        ('submission', 'Assignment Submission'),
+    ]
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='upload_sessions', verbose_name="User")
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES, verbose_name="Purpose")
+    # Class pk for materials, assignment pk for submissions.
+    target_id = models.PositiveIntegerField(verbose_name="Target")
+    title = models.CharField(max_length=255, blank=True, verbose_name="Title")
+    filename = models.CharField(max_length=255, verbose_name="File Name")
+    size = models.PositiveBigIntegerField(verbose_name="Size")
+    chunk_size = models.PositiveIntegerField(verbose_name="Chunk Size")
+    received = models.PositiveBigIntegerField(default=0, verbose_name="Bytes Received")
+    # Storage names of the received chunks, in order.
+    chunk_names = models.JSONField(default=list, editable=False, verbose_name="Chunk Names")
+    checksum = models.CharField(max_length=64, blank=True, verbose_name="SHA-256")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default='open', verbose_name="Status")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Upload Session"
+        verbose_name_plural = "Upload Sessions"
+        indexes = [models.Index(fields=['status', 'updated_at'])]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    @property
+    def chunk_count(self):
+        return -(-self.size // self.chunk_size) if self.size else 0
+
+    def new_chunk_name(self, index):
+        """A name of its own for one attempt at chunk `index`; the attempt
+        that advances the session is recorded in chunk_names."""
+        return f"uploads/{self.upload_id}/{index:06d}.{uuid.uuid4().hex[:12]}.part"
+
 
 class ContentReadStatus(models.Model):
     CONTENT_TYPES = [
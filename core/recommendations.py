@@ -0,0 +1,124 @@
+"""
+"Students who took this class also took" recommendations.
+
+Enrollments form a sparse student x class matrix. Item-item cosine
+similarity between two classes is the number of students they share over
+the geometric mean of their sizes. The top neighbours of every class are
+computed offline (see the build_recommendations command) with SciPy sparse
+products when SciPy is installed, or by counting co-enrolled pairs in pure
+Python otherwise, and stored as ClassRecommendation rows. Serving a
+student is then one query over that table.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ClassRecommendation, Clazz, Enrollment
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # SciPy is optional; the pure-Python engine is used instead
+    np = sparse = None
+
+DEFAULT_TOP_K = 10
+
+
+def _top(scored, top_k):
+    # Highest score first; ties go to the lower class id so engines agree.
+    return [(class_id, score) for score, class_id in
+            heapq.nsmallest(top_k, scored, key=lambda item: (-item[0], item[1]))]
+
+
+def _python_neighbours(pairs, top_k):
+    classes_by_student = defaultdict(set)
+    for student_id, class_id in pairs:
+        classes_by_student[student_id].add(class_id)
+
+    sizes = Counter()
+    shared = defaultdict(Counter)
+    for classes in classes_by_student.values():
+        sizes.update(classes)
+        for a, b in combinations(classes, 2):
+            shared[a][b] += 1
+            shared[b][a] += 1
+
+    return {a: _top([(count / math.sqrt(sizes[a] * sizes[b]), b) for b, count in row.items()], top_k)
+            for a, row in shared.items()}
+
+
+def _scipy_neighbours(pairs, top_k):
+    students, classes = {}, {}
+    rows, cols = [], []
+    for student_id, class_id in pairs:
+        rows.append(students.setdefault(student_id, len(students)))
+        cols.append(classes.setdefault(class_id, len(classes)))
+    if not cols:
+        return {}
+
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                               shape=(len(students), len(classes)))
+    matrix.data[:] = 1.0  # repeated pairs are summed on construction
+    shared = (matrix.T @ matrix).tocsr()
+    inverse_norm = sparse.diags(1.0 / np.sqrt(shared.diagonal()))
+    similarity = (inverse_norm @ shared @ inverse_norm).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    class_ids = np.array(list(classes))
+    neighbours = {}
+    for i in range(similarity.shape[0]):
+        start, end = similarity.indptr[i], similarity.indptr[i + 1]
+        if start == end:
+            continue
+        scores = similarity.data[start:end]
+        ids = class_ids[similarity.indices[start:end]]
+        order = np.lexsort((ids, -scores))[:top_k]
+        neighbours[int(class_ids[i])] = [(int(ids[j]), float(scores[j])) for j in order]
+    return neighbours
+
+
+def engine_name():
+    return 'scipy' if sparse is not None else 'python'
+
+
+def class_neighbours(pairs, top_k=DEFAULT_TOP_K, engine=None):
+    """Maps each class id to its `top_k` most similar (class id, score)
+    pairs, given (student id, class id) enrollment pairs."""
+    engine = engine or engine_name()
+    if engine == 'scipy':
+        if sparse is None:
+            raise ImportError("SciPy is not installed.")
+        return _scipy_neighbours(pairs, top_k)
+    return _python_neighbours(pairs, top_k)
+
+
+def rebuild_recommendations(top_k=DEFAULT_TOP_K, engine=None):
+    """Recomputes the stored neighbours from current enrollments and returns
+    the number of rows written."""
+    pairs = Enrollment.objects.exclude(status='rejected').values_list(
+        'student_id', 'clazz_id').iterator()
+    neighbours = class_neighbours(pairs, top_k, engine)
+    rows = [ClassRecommendation(clazz_id=class_id, similar_id=similar_id, score=score)
+            for class_id, items in neighbours.items() for similar_id, score in items]
+    with transaction.atomic():
+        ClassRecommendation.objects.all().delete()
+        ClassRecommendation.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def recommended_classes(student, limit=6):
+    """Running classes similar to the student's own, best first, excluding
+    classes the student already has an enrollment for."""
+    own = Enrollment.objects.filter(student=student).values('clazz')
+    return (Clazz.objects.filter(recommended_by__clazz__in=own,
+                                 end_date__gte=timezone.localdate())
+            .exclude(pk__in=own)
+            .annotate(recommendation_score=Sum('recommended_by__score'))
+            .select_related('teacher', 'class_type')
+            .order_by('-recommendation_score', 'class_name')[:limit])
@@ -0,0 +1,218 @@
+"""
+Weekday parsing and the calendar occurrence engine for class schedules.
+
+`Clazz.day_of_week` is free text such as "Monday, Wednesday" or
+"Thứ 2, Thứ 4". It is parsed once into `Clazz.weekday_mask` (bit 0 is
+Monday, matching `date.weekday()`), and calendar occurrences are produced by
+weekday arithmetic instead of testing every day against every class.
+
+Occurrences for a user are cached per (user, month) under a version kept
+per user. A change that moves a class in someone's calendar gives the users
+who see that class a new version (see core.signals), retiring their cached
+months only; bulk updates that bypass the signals bump a global version
+instead, which retires every cached month at once.
+"""
+import calendar
+import datetime
+import re
+import time
+import unicodedata
+
+from django.core.cache import cache
+from django.db.models import F
+
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday',
+                 'Friday', 'Saturday', 'Sunday')
+ALL_WEEKDAYS_MASK = (1 << 7) - 1
+
+_ENGLISH_PREFIXES = {name[:3].lower(): index
+                     for index, name in enumerate(WEEKDAY_NAMES)}
+# "Thứ 2" .. "Thứ 7" (also "T2") or "Thứ Hai" .. "Thứ Bảy", Monday .. Saturday;
+# "Chủ Nhật" / "CN" is Sunday.
+_VIETNAMESE_DAY = re.compile(r'\b(?:(?:thu\s*|t)([2-7])|thu\s+(hai|ba|tu|nam|sau|bay))\b')
+_VIETNAMESE_NUMBERS = {'hai': 2, 'ba': 3, 'tu': 4, 'nam': 5, 'sau': 6, 'bay': 7}
+_VIETNAMESE_SUNDAY = re.compile(r'\b(?:chu\s*nhat|cn)\b')
+_WORD = re.compile(r'[a-z]+')
+
+
+def _strip_accents(text):
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in decomposed
+                   if not unicodedata.combining(ch)).replace('đ', 'd')
+
+
+def parse_weekdays(text):
+    """Returns the weekday bitmask for a free-text `day_of_week` value."""
+    if not text:
+        return 0
+    normalized = _strip_accents(text.lower())
+    mask = 0
+    for match in _VIETNAMESE_DAY.finditer(normalized):
+        number = match.group(1) or _VIETNAMESE_NUMBERS[match.group(2)]
+        mask |= 1 << (int(number) - 2)
+    if _VIETNAMESE_SUNDAY.search(normalized):
+        mask |= 1 << 6
+    # Drop the Vietnamese names so "thu" is not read as Thursday below.
+    normalized = _VIETNAMESE_SUNDAY.sub(' ', _VIETNAMESE_DAY.sub(' ', normalized))
+    for word in _WORD.findall(normalized):
+        if len(word) >= 3 and word[:3] in _ENGLISH_PREFIXES:
+            mask |= 1 << _ENGLISH_PREFIXES[word[:3]]
+    return mask
+
+
+def weekdays_from_mask(mask):
+    return [day for day in range(7) if mask & (1 << day)]
+
+
+def iter_class_dates(clazz, start, end):
+    """Yields the dates between `start` and `end` (inclusive) on which
+    `clazz` meets, one weekday at a time."""
+    first = max(start, clazz.start_date)
+    last = min(end, clazz.end_date)
+    if first > last:
+        return
+    for weekday in weekdays_from_mask(clazz.weekday_mask):
+        day = first + datetime.timedelta(days=(weekday - first.weekday()) % 7)
+        while day <= last:
+            yield day
+            day += datetime.timedelta(days=7)
+
+
+def occurrences_by_date(classes, start, end):
+    """Maps each date between `start` and `end` to the classes meeting that
+    day, ordered by start time."""
+    by_date = {}
+    for clazz in classes:
+        for day in iter_class_dates(clazz, start, end):
+            by_date.setdefault(day, []).append(clazz)
+    for day_classes in by_date.values():
+        day_classes.sort(key=lambda c: (c.start_time is None, c.start_time or datetime.time.min))
+    return by_date
+
+
+def classes_meeting_on(day, classes=None):
+    """Classes that meet on `day` (running that day, on its weekday),
+    ordered by start time. Uses the ClassWeekday index rather than matching
+    `day_of_week` text."""
+    from .models import Clazz
+
+    classes = Clazz.objects.all() if classes is None else classes
+    return classes.filter(
+        weekdays__weekday=day.weekday(), start_date__lte=day, end_date__gte=day,
+    ).order_by(F('start_time').asc(nulls_last=True), 'class_name')
+
+
+SCHEDULE_CACHE_TIMEOUT = 60 * 60 * 24
+_CACHE_VERSION_KEY = 'schedule:version'
+
+
+def _format_time(value):
+    return value.strftime('%H:%M') if value else None
+
+
+def occurrence_list(classes, start, end):
+    """Returns the meetings of `classes` between `start` and `end` as plain
+    dicts, ordered by date and start time."""
+    occurrences = []
+    for day, day_classes in sorted(occurrences_by_date(classes, start, end).items()):
+        for clazz in day_classes:
+            occurrences.append({
+                'date': day.isoformat(),
+                'start_time': _format_time(clazz.start_time),
+                'end_time': _format_time(clazz.end_time),
+                'class_id': clazz.pk,
+                'class_name': clazz.class_name,
+                'room': clazz.room,
+            })
+    return occurrences
+
+
+def classes_for_user(user):
+    """The classes shown in a user's calendar: taught ones for teachers,
+    approved enrollments for students."""
+    from .models import Clazz
+
+    if hasattr(user, 'teacher_profile'):
+        classes = Clazz.objects.filter(teacher__user=user)
+    elif hasattr(user, 'student_profile'):
+        classes = Clazz.objects.filter(
+            enrollments__student__user=user, enrollments__status='approved')
+    else:
+        classes = Clazz.objects.none()
+    return classes
+
+
+def _cache_version(key=_CACHE_VERSION_KEY):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a lost counter never revives old entries.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _user_version_key(user_id):
+    return f"{_CACHE_VERSION_KEY}:user:{user_id}"
+
+
+def invalidate_schedule_cache():
+    """Drops every cached calendar month."""
+    try:
+        cache.incr(_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.add(_CACHE_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_user_schedules(*user_ids):
+    """Drops the cached calendar months of the given users."""
+    version = time.time_ns()
+    cache.set_many({_user_version_key(pk): version for pk in user_ids if pk is not None}, None)
+
+
+def calendar_users(classes=(), teachers=(), students=()):
+    """Ids of the users whose calendars show any of `classes` (their
+    teachers and approved students), plus those of `teachers` and
+    `students`. Each argument is a collection of ids or a values() query."""
+    from .models import Enrollment, Student, Teacher
+
+    users = set()
+    if classes:
+        users.update(Teacher.objects.filter(classes_taught__in=classes).values_list('user_id', flat=True))
+        users.update(Enrollment.objects.filter(clazz__in=classes, status='approved')
+                     .values_list('student__user_id', flat=True))
+    if teachers:
+        users.update(Teacher.objects.filter(pk__in=teachers).values_list('user_id', flat=True))
+    if students:
+        users.update(Student.objects.filter(pk__in=students).values_list('user_id', flat=True))
+    users.discard(None)
+    return users
+
+
+def month_occurrences(user, year, month):
+    """Cached occurrences of the user's classes in one calendar month."""
+    version = f"{_cache_version()}.{_cache_version(_user_version_key(user.pk))}"
+    key = f"schedule:{version}:{user.pk}:{year}-{month:02d}"
+    occurrences = cache.get(key)
+    if occurrences is None:
+        first = datetime.date(year, month, 1)
+        last = datetime.date(year, month, calendar.monthrange(year, month)[1])
+        classes = classes_for_user(user).only(
+            'class_id', 'class_name', 'room', 'start_date', 'end_date',
+            'start_time', 'end_time', 'weekday_mask')
+        occurrences = occurrence_list(classes, first, last)
+        cache.set(key, occurrences, SCHEDULE_CACHE_TIMEOUT)
+    return occurrences
+
+
+def occurrences_between(user, start, end):
+    """Occurrences of the user's classes from `start` to `end` (inclusive),
+    assembled from the cached months covering the range."""
+    start_iso, end_iso = start.isoformat(), end.isoformat()
+    occurrences = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        occurrences.extend(
+            o for o in month_occurrences(user, year, month)
+            if start_iso <= o['date'] <= end_iso)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return occurrences
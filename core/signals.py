@@ -0,0 +1,123 @@
+"""
+Signal handlers that keep cached schedules, cached assignment progress,
+class seat counts and stored file references in step with the database.
+
+Cached calendars are versioned per user, so a change only drops the months
+of the teacher and approved students it concerns. Queryset `.update()` calls
+bypass these handlers; code that moves classes in bulk invalidates the
+calendars itself, and bulk enrollment transitions send `enrollments_updated`.
+"""
+import os
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .assignments import invalidate_assignment_progress, teachers_of_classes
+from .models import Assignment, AssignmentSubmission, Clazz, Enrollment, Material, enrollments_updated
+from .schedule import calendar_users, invalidate_user_schedules
+
+
+@receiver(post_save, sender=Clazz)
+def clazz_saved(sender, instance, created, **kwargs):
+    previous_teacher = getattr(instance, '_loaded_values', {}).get('teacher_id')
+    if created or instance.has_changed(*Clazz.SCHEDULE_FIELDS):
+        invalidate_user_schedules(*calendar_users(
+            classes={instance.pk}, teachers={previous_teacher} - {None}))
+    if not created and instance.has_changed(*Clazz.PROGRESS_FIELDS):
+        invalidate_assignment_progress(previous_teacher, instance.teacher_id)
+
+
+def _was_approved(instance):
+    return getattr(instance, '_loaded_values', {}).get('status') == 'approved'
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, **kwargs):
+    # Grade edits leave calendars alone, and requests that are not approved
+    # (before or after) appear in no calendar and no progress count.
+    if not (created or instance.has_changed('status', 'clazz_id', 'student_id')):
+        return
+    if instance.status != 'approved' and not _was_approved(instance):
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    invalidate_user_schedules(*calendar_users(
+        students={instance.student_id, loaded.get('student_id')} - {None}))
+    invalidate_assignment_progress(
+        *teachers_of_classes({instance.clazz_id, loaded.get('clazz_id')}))
+
+
+@receiver(enrollments_updated, sender=Enrollment)
+def enrollments_bulk_updated(sender, pks, fields, **kwargs):
+    # Bulk transitions only ever move requests into approval, not out of it.
+    if 'status' in fields:
+        approved = Enrollment.objects.filter(pk__in=pks, status='approved')
+        invalidate_user_schedules(*calendar_users(students=approved.values('student_id')))
+        invalidate_assignment_progress(*teachers_of_classes(approved.values('clazz_id')))
+
+
+@receiver(post_delete, sender=Clazz)
+def clazz_deleted(sender, instance, **kwargs):
+    # Its enrollments were deleted first, each dropping its student's months.
+    invalidate_user_schedules(*calendar_users(teachers={instance.teacher_id} - {None}))
+    invalidate_assignment_progress(instance.teacher_id)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    if instance.status == 'approved':
+        invalidate_user_schedules(*calendar_users(students={instance.student_id}))
+        freed = Clazz.objects.filter(pk=instance.clazz_id)
+        freed.release_seats()
+        freed.promote_waitlist()
+        invalidate_assignment_progress(*teachers_of_classes({instance.clazz_id}))
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    # Moving an assignment to another class also changes the old teacher's list.
+    previous = getattr(instance, '_loaded_values', {}).get('clazz_id')
+    invalidate_assignment_progress(*teachers_of_classes({instance.clazz_id, previous}))
+
+
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_delete, sender=AssignmentSubmission)
+def submission_changed(sender, instance, **kwargs):
+    class_ids = Assignment.objects.filter(pk=instance.assignment_id).values('clazz_id')
+    invalidate_assignment_progress(*teachers_of_classes(class_ids))
+
+
+# Each new upload takes a reference in the file's storage (core.storage);
+# the file a row held before is given back when it is replaced or deleted.
+STORED_FILE_FIELDS = {Material: 'file', AssignmentSubmission: 'submission_file'}
+
+
+@receiver(pre_save, sender=Material)
+@receiver(pre_save, sender=AssignmentSubmission)
+def stored_file_saving(sender, instance, **kwargs):
+    attname = STORED_FILE_FIELDS[sender]
+    file = getattr(instance, attname)
+    instance._stored_file_uploaded = bool(file) and not file._committed
+    # The stored name may be another uploader's, so keep this upload's name.
+    if instance._stored_file_uploaded:
+        instance.original_name = os.path.basename(file.name)[:255]
+
+
+@receiver(post_save, sender=Material)
+@receiver(post_save, sender=AssignmentSubmission)
+def stored_file_saved(sender, instance, created, **kwargs):
+    attname = STORED_FILE_FIELDS[sender]
+    previous = getattr(instance, '_loaded_values', {}).get(attname)
+    if created or not previous:
+        return
+    # An identical re-upload keeps the name but still took a reference.
+    if instance._stored_file_uploaded or instance.has_changed(attname):
+        sender._meta.get_field(attname).storage.delete(previous)
+
+
+@receiver(post_delete, sender=Material)
+@receiver(post_delete, sender=AssignmentSubmission)
+def stored_file_deleted(sender, instance, **kwargs):
+    file = getattr(instance, STORED_FILE_FIELDS[sender])
+    if file:
+        file.storage.delete(file.name)
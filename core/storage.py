@@ -0,0 +1,131 @@
+"""
+Content-addressed storage for class materials and assignment submissions.
+
+Uploads are hashed (SHA-256) while they are written to a staging file, then
+moved to `blobs/<2 hex>/<digest>/<file name>`. A second upload with the same
+content costs no extra disk: it gets the existing blob's name back.
+
+Every `save()` hands out one reference to a blob, counted on its StoredBlob
+row, and every `delete()` gives one back; once the transaction that gave
+back the last reference commits, the file and its row are removed together
+under the row's lock. core.signals calls `delete()` for the old file when a Material or
+AssignmentSubmission is deleted or gets a new file. Names saved before this
+storage existed have no StoredBlob row and are deleted as plain files.
+"""
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = 'blobs'
+# Keeps blob names (74 characters before the file name) within the 255
+# characters of the file fields.
+MAX_FILENAME_LENGTH = 100
+
+
+class _HashingReader:
+    """Passes reads through while hashing and counting the bytes."""
+
+    def __init__(self, content):
+        self._content = content
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self._content.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def _save(self, name, content):
+        from .models import StoredBlob
+
+        if hasattr(content, 'seek') and content.seekable():
+            content.seek(0)
+        reader = _HashingReader(content)
+        staged = super()._save(f"{BLOB_DIR}/incoming/{uuid.uuid4().hex}", File(reader))
+        digest = reader.sha256.hexdigest()
+        root, ext = os.path.splitext(self.get_valid_name(os.path.basename(name)))
+        filename = (root[:MAX_FILENAME_LENGTH - len(ext)] or 'file') + ext[:16]
+        blob_name = validate_file_name(
+            f"{BLOB_DIR}/{digest[:2]}/{digest}/{filename}", allow_relative_path=True)
+
+        try:
+            with transaction.atomic():
+                # The row is written, or locked, before the file is moved in,
+                # so a concurrent delete() of the same blob waits for it.
+                blob = StoredBlob.objects.select_for_update().filter(digest=digest).first()
+                if blob is None:
+                    blob = StoredBlob.objects.create(
+                        digest=digest, name=blob_name, size=reader.size, ref_count=1)
+                    self._move_into_place(staged, blob.name)
+                    return blob.name
+                if blob.ref_count == 0:
+                    # Given back and maybe already removed: store it again.
+                    self._move_into_place(staged, blob.name)
+                StoredBlob.objects.filter(pk=digest).update(ref_count=F('ref_count') + 1)
+        except IntegrityError:
+            # Another worker stored the same content first.
+            StoredBlob.objects.filter(pk=digest).update(ref_count=F('ref_count') + 1)
+            blob = StoredBlob.objects.get(pk=digest)
+        if self.exists(staged):
+            super().delete(staged)
+        return blob.name
+
+    def _move_into_place(self, staged, name):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        os.replace(self.path(staged), self.path(name))
+
+    def get_available_name(self, name, max_length=None):
+        # Blob names are decided by their content in _save.
+        return name
+
+    def delete(self, name):
+        """Gives back one reference; the file goes with the last one."""
+        from .models import StoredBlob
+
+        if not name:
+            return
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                # A blob without a row has already been given back.
+                if not name.startswith(f'{BLOB_DIR}/'):
+                    transaction.on_commit(lambda: self._remove_file(name))
+                return
+            if blob.ref_count == 0:
+                return
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            if blob.ref_count == 1:
+                transaction.on_commit(lambda: self._remove_unreferenced(blob.pk))
+
+    def _remove_file(self, name):
+        super().delete(name)
+
+    def _remove_unreferenced(self, digest):
+        from .models import StoredBlob
+
+        # Under the row lock, so the same content cannot be stored again
+        # between the check and the removal.
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(
+                pk=digest, ref_count=0).first()
+            if blob is not None:
+                blob.delete()
+                super().delete(blob.name)
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def get_blob_storage():
+    return blob_storage
@@ -0,0 +1,51 @@
+"""
+Helpers shared by the tests that store files: a temporary MEDIA_ROOT and
+the teacher, class, assignment and student rows they upload against.
+"""
+import datetime
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+
+from .models import Assignment, ClassType, Clazz, Student, Teacher
+
+
+class TemporaryMediaMixin:
+    """Points MEDIA_ROOT at a directory of its own, `cls.media_root`, for
+    the test class and removes it afterwards."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=cls.media_root)
+        media.enable()
+        cls.addClassCleanup(media.disable)
+        super().setUpClass()
+
+
+def make_teacher(username='teacher'):
+    user = User.objects.create_user(username=username, password='password')
+    return Teacher.objects.create(user=user, full_name="Test Teacher", dob=datetime.date(1980, 1, 1))
+
+
+def make_class(teacher=None, **fields):
+    today = datetime.date.today()
+    fields = {'class_name': "Math 101", 'room': "101", 'price': 100.00,
+              'start_date': today, 'end_date': today, **fields}
+    class_type, _ = ClassType.objects.get_or_create(code="MATH")
+    return Clazz.objects.create(class_type=class_type, teacher=teacher, **fields)
+
+
+def make_assignment(clazz, title="Homework"):
+    return Assignment.objects.create(
+        title=title, description="", due_date=timezone.now(), clazz=clazz)
+
+
+def make_student(username=None, full_name="Student"):
+    """A student, with a login of the given username if there is one."""
+    user = User.objects.create_user(username=username, password='password') if username else None
+    return Student.objects.create(user=user, full_name=full_name, dob=datetime.date(2000, 1, 1))
@@ -0,0 +1,135 @@
+import datetime
+import random
+import time
+
+from django import forms
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from core.conflicts import ClassSlot, ConflictIndex, find_conflicts, slot_for
+from core.models import Clazz, ClassType, Teacher
+from dashboard.forms import ScheduleConflictMixin, ScheduleForm
+
+TERM = (datetime.date(2025, 9, 1), datetime.date(2025, 12, 31))
+
+
+class TeacherScheduleForm(ScheduleConflictMixin, forms.ModelForm):
+    class Meta:
+        model = Clazz
+        fields = ['class_name', 'teacher', 'room', 'day_of_week', 'start_date',
+                  'end_date', 'start_time', 'end_time']
+
+
+def make_slot(pk, room, teacher_id, mask, start, end, dates=TERM):
+    return ClassSlot(pk, f"Class {pk}", room, teacher_id, mask, dates[0], dates[1],
+                     datetime.time(*start), datetime.time(*end))
+
+
+class ConflictIndexTests(TestCase):
+    def test_overlaps_by_room_teacher_weekday_and_dates(self):
+        index = ConflictIndex([
+            make_slot(1, "101", 1, 0b1, (9, 0), (10, 30)),
+            make_slot(2, "102", 2, 0b1, (10, 0), (11, 0)),
+            # Same room, later term.
+            make_slot(3, "101", 3, 0b1, (9, 0), (10, 0),
+                      dates=(datetime.date(2026, 1, 1), datetime.date(2026, 5, 1))),
+        ])
+        # Back-to-back in room 101 is fine; overlapping teacher 2 on Monday is not.
+        conflicts = index.conflicts_for(make_slot(4, "101", 2, 0b101, (10, 30), (12, 0)))
+        self.assertEqual([(c.kind, c.other.pk, c.weekdays) for c in conflicts],
+                         [('teacher', 2, 'Monday')])
+        self.assertEqual(index.conflicts_for(make_slot(5, " 101 ", None, 0b10, (9, 0), (10, 0))), [])
+
+        index.add(make_slot(6, "101", 9, 0b11, (8, 0), (9, 30)))
+        self.assertEqual(
+            [(c.kind, c.slot.pk, c.other.pk, c.weekdays) for c in index.all_conflicts()],
+            [('room', 1, 6, 'Monday')])
+
+    def test_lookup_is_fast_on_a_large_index(self):
+        rng = random.Random(7)
+        slots = []
+        for pk in range(5000):
+            hour = rng.randint(7, 20)
+            slots.append(make_slot(pk, f"R{rng.randint(1, 60)}", rng.randint(1, 200),
+                                   1 << rng.randint(0, 6), (hour, 0), (hour + 1, 30)))
+        index = ConflictIndex(slots)
+        index.conflicts_for(slots[0])  # builds the buckets
+        started = time.perf_counter()
+        for slot in slots[:200]:
+            index.conflicts_for(slot)
+        self.assertLess((time.perf_counter() - started) / 200, 0.001)
+
+
+class ScheduleValidationTests(TestCase):
+    def setUp(self):
+        class_type = ClassType.objects.create(code="MATH")
+        self.teacher = Teacher.objects.create(
+            full_name="Test Teacher", dob=datetime.date(1980, 1, 1), email="t@example.com")
+        common = dict(class_type=class_type, price=100.00, day_of_week="Monday, Wednesday",
+                      start_date=TERM[0], end_date=TERM[1])
+        self.existing = Clazz.objects.create(
+            class_name="Math 101", room="101", teacher=self.teacher,
+            start_time=datetime.time(9, 0), end_time=datetime.time(10, 30), **common)
+        self.other = Clazz.objects.create(
+            class_name="Math 102", room="202", teacher=self.teacher,
+            start_time=datetime.time(13, 0), end_time=datetime.time(14, 0), **common)
+
+    def test_schedule_form_rejects_double_booking(self):
+        form = ScheduleForm({'day_of_week': "Wednesday", 'start_time': "10:00",
+                             'end_time': "11:00"}, instance=self.other)
+        self.assertFalse(form.is_valid())
+        self.assertIn("The teacher is already booked for Math 101 on Wednesday 09:00-10:30.",
+                      form.non_field_errors())
+
+        form = ScheduleForm({'day_of_week': "Wednesday", 'start_time': "10:30",
+                             'end_time': "11:30"}, instance=self.other)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def schedule_data(self, **overrides):
+        data = {'class_name': "Math 201", 'teacher': self.teacher.pk, 'room': "303",
+                'day_of_week': "Monday", 'start_date': TERM[0], 'end_date': TERM[1],
+                'start_time': "09:00", 'end_time': "10:00"}
+        data.update(overrides)
+        return data
+
+    def test_new_class_rejects_a_booked_teacher(self):
+        form = TeacherScheduleForm(self.schedule_data())
+        self.assertFalse(form.is_valid())
+        self.assertIn("The teacher is already booked for Math 101 on Monday 09:00-10:30.",
+                      form.non_field_errors())
+
+        other_teacher = Teacher.objects.create(
+            full_name="Other Teacher", dob=datetime.date(1985, 1, 1), email="o@example.com")
+        form = TeacherScheduleForm(self.schedule_data(teacher=other_teacher.pk))
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_changing_the_teacher_checks_the_new_teacher(self):
+        other_teacher = Teacher.objects.create(
+            full_name="Other Teacher", dob=datetime.date(1985, 1, 1), email="o@example.com")
+        clazz = Clazz.objects.create(
+            class_name="Math 201", room="303", teacher=other_teacher,
+            class_type=self.existing.class_type, price=100.00, day_of_week="Monday",
+            start_date=TERM[0], end_date=TERM[1],
+            start_time=datetime.time(9, 0), end_time=datetime.time(10, 0))
+
+        form = TeacherScheduleForm(self.schedule_data(), instance=clazz)
+        self.assertFalse(form.is_valid())
+        self.assertIn("The teacher is already booked for Math 101 on Monday 09:00-10:30.",
+                      form.non_field_errors())
+
+        form = TeacherScheduleForm(self.schedule_data(teacher=other_teacher.pk), instance=clazz)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_unchanged_class_does_not_clash_with_itself(self):
+        self.assertEqual(find_conflicts(slot_for(self.existing)), [])
+
+    def test_conflict_report(self):
+        Clazz.objects.filter(pk=self.other.pk).update(
+            start_time=datetime.time(10, 0), room="101", teacher=None)
+        User.objects.create_superuser(username="staff", password="password")
+        self.client.login(username="staff", password="password")
+        response = self.client.get(reverse('dashboard:schedule_conflicts'),
+                                   {'start': '2025-09-01', 'end': '2025-12-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(c.kind, c.weekdays) for c, _ in response.context['conflict_rows']],
+                         [('room', 'Monday, Wednesday')])
@@ -1,7 +1,13 @@
-from django.test import TestCase
+import re
+import threading
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
-from core.models import Clazz, Student, ClassType, Teacher, Enrollment
+from core.models import ClassFullError, Clazz, Student, ClassType, Teacher, Enrollment
 from django.utils import timezone
 
 
@@ -70,6 +76,17 @@ class EnrollmentTests(TestCase):
         self.assertEqual(Enrollment.objects.filter(
             student=self.student, clazz=self.clazz).count(), 1)
 
+    def test_enroll_student_reports_existing_status(self):
+        Enrollment.objects.create(student=self.student, clazz=self.clazz, status='rejected')
+
+        self.client.login(username='student', password='password')
+        response = self.client.get(
+            reverse('enroll_student', args=[self.clazz.class_id]), follow=True)
+
+        self.assertEqual([str(m) for m in response.context['messages']], [
+            "Your previous enrollment request for this class was rejected."])
+        self.assertEqual(Enrollment.objects.get(student=self.student).status, 'rejected')
+
     def test_enroll_student_not_logged_in(self):
         response = self.client.get(
             reverse('enroll_student', args=[self.clazz.class_id]))
@@ -77,3 +94,297 @@ class EnrollmentTests(TestCase):
         # Django default login url is /accounts/login/ or whatever is in settings.
         # We just check it's a redirect (302) and not 200
         self.assertEqual(response.status_code, 302)
+
+
+class BulkRequestTests(TestCase):
+    def setUp(self):
+        self.class_type = ClassType.objects.create(code='MATH', description='Math Class')
+        self.clazz, self.other_class = [Clazz.objects.create(
+            class_name=name, class_type=self.class_type, start_date=timezone.now().date(),
+            end_date=timezone.now().date(), price=100.00, room='101')
+            for name in ('Algebra 101', 'Physics 101')]
+        self.students = [Student.objects.create(
+            full_name=f'Student {i}', dob='2000-01-01', phone_number='1234567890',
+            email=f's{i}@example.com', address='123 Test St') for i in range(4)]
+        self.requests = [Enrollment.objects.create(student=student, clazz=self.clazz)
+                         for student in self.students[:3]]
+        self.other = Enrollment.objects.create(student=self.students[3], clazz=self.other_class)
+        User.objects.create_superuser(username='admin', password='password')
+        self.client.login(username='admin', password='password')
+
+    def test_transitions_only_touch_pending_rows(self):
+        self.requests[0].status = 'rejected'
+        self.requests[0].save()
+        pending = Enrollment.objects.filter(clazz=self.clazz)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(pending.approve(paid=True), (2, 0))
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(pending.approve(), (0, 0))
+        self.assertEqual(pending.mark_paid(), 1)
+        self.requests[0].refresh_from_db()
+        self.assertEqual(self.requests[0].status, 'rejected')
+        self.assertTrue(self.requests[0].is_paid)
+
+    def test_bulk_action_on_selected_requests(self):
+        response = self.client.post(reverse('dashboard:manage_requests'), {
+            'action': 'reject', 'selected': [self.requests[0].pk, self.other.pk]})
+        self.assertRedirects(response, reverse('dashboard:manage_requests') + '?q=&class=')
+        self.assertEqual(
+            sorted(Enrollment.objects.filter(status='rejected').values_list('pk', flat=True)),
+            sorted([self.requests[0].pk, self.other.pk]))
+
+    @mock.patch('core.models.BULK_BATCH_SIZE', 2)
+    def test_selected_ids_are_looked_up_in_batches(self):
+        selected = [self.requests[2].pk, self.requests[0].pk, self.requests[1].pk]
+        batches = Enrollment.objects.filter(status='pending').in_batches(selected)
+        self.assertEqual([[e.pk for e in batch.order_by('pk')] for batch in batches],
+                         [[self.requests[0].pk, self.requests[1].pk], [self.requests[2].pk]])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('dashboard:manage_requests'), {
+                'action': 'approve_unpaid', 'selected': selected})
+        self.assertEqual(Enrollment.objects.filter(clazz=self.clazz, status='approved').count(), 3)
+        id_lists = [ids for query in queries.captured_queries
+                    for ids in re.findall(r' IN \(([^)]*)\)', query['sql'])]
+        self.assertTrue(id_lists)
+        self.assertTrue(all(ids.count(',') < 2 for ids in id_lists), id_lists)
+
+    def test_bulk_action_on_whole_filter(self):
+        self.client.post(reverse('dashboard:manage_requests'), {
+            'action': 'approve_unpaid', 'scope': 'all', 'class': self.clazz.pk})
+        self.assertEqual(Enrollment.objects.filter(clazz=self.clazz, status='approved').count(), 3)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.status, 'pending')
+
+    def test_reject_on_whole_filter_is_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('dashboard:manage_requests'), {
+                'action': 'reject', 'scope': 'all', 'class': self.clazz.pk})
+        enrollment_queries = [query['sql'] for query in queries.captured_queries
+                              if 'core_enrollment' in query['sql']]
+        self.assertEqual(len(enrollment_queries), 1, enrollment_queries)
+        self.assertTrue(enrollment_queries[0].startswith('UPDATE'))
+        self.assertEqual(Enrollment.objects.filter(status='rejected').count(), 3)
+
+    def test_requests_page_filters_by_class(self):
+        response = self.client.get(reverse('dashboard:manage_requests'), {'class': self.other_class.pk})
+        self.assertEqual(list(response.context['requests']), [self.other])
+        self.assertEqual(self.client.get(reverse('dashboard:manage_enrollments')).status_code, 200)
+
+
+class CapacityTestMixin:
+    def make_class(self, capacity, requests):
+        clazz = Clazz.objects.create(
+            class_name='Algebra 101', class_type=ClassType.objects.create(code='MATH'),
+            start_date=timezone.now().date(), end_date=timezone.now().date(),
+            price=100.00, room='101', capacity=capacity)
+        enrollments = [Enrollment.objects.create(
+            clazz=clazz, student=Student.objects.create(
+                full_name=f'Student {i}', dob='2000-01-01', phone_number='1234567890',
+                email=f's{i}@example.com', address='123 Test St'))
+            for i in range(requests)]
+        return clazz, enrollments
+
+
+class CapacityTests(CapacityTestMixin, TestCase):
+    def test_seat_counter_follows_status(self):
+        clazz, (first, second) = self.make_class(capacity=1, requests=2)
+        first.status = 'approved'
+        first.save()
+        clazz.refresh_from_db()
+        self.assertTrue(clazz.is_full)
+
+        second.status = 'approved'
+        with self.assertRaises(ClassFullError):
+            second.save()
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'pending')
+
+        first.status = 'rejected'
+        first.save()
+        clazz.refresh_from_db()
+        self.assertEqual(clazz.seats_taken, 0)
+
+        second.status = 'approved'
+        second.save()
+        second.delete()
+        clazz.refresh_from_db()
+        self.assertEqual(clazz.seats_taken, 0)
+
+    def test_bulk_approve_stops_at_capacity(self):
+        clazz, enrollments = self.make_class(capacity=2, requests=3)
+        self.assertEqual(Enrollment.objects.all().approve(), (2, 1))
+        clazz.refresh_from_db()
+        self.assertEqual(clazz.seats_taken, 2)
+        self.assertEqual(
+            list(Enrollment.objects.filter(status='approved').order_by('pk')), enrollments[:2])
+        enrollments[2].refresh_from_db()
+        self.assertEqual(enrollments[2].status, 'waitlisted')
+
+    def test_saving_a_class_keeps_the_seat_count(self):
+        clazz, (enrollment,) = self.make_class(capacity=5, requests=1)
+        stale = Clazz.objects.get(pk=clazz.pk)
+        enrollment.status = 'approved'
+        enrollment.save()
+        stale.room = '102'
+        stale.save()
+        clazz.refresh_from_db()
+        self.assertEqual((clazz.room, clazz.seats_taken), ('102', 1))
+
+    def test_copying_a_class_inserts_a_new_row(self):
+        clazz, _ = self.make_class(capacity=5, requests=0)
+        clazz.day_of_week = "Mon, Tue, Wed, Thu, Fri, Sat, Sun"
+        clazz.save()
+        self.assertEqual((clazz.weekdays.count(), clazz.sessions.count()), (7, 1))
+        for mark_adding in (False, True):
+            copy = Clazz.objects.get(pk=clazz.pk)
+            copy.pk = None
+            copy._state.adding = mark_adding
+            copy.save()
+            self.assertNotEqual(copy.pk, clazz.pk)
+            self.assertEqual(copy.weekdays.count(), clazz.weekdays.count())
+            self.assertEqual(copy.sessions.count(), clazz.sessions.count())
+        self.assertEqual(Clazz.objects.filter(class_name=clazz.class_name).count(), 3)
+
+
+class WaitlistTests(CapacityTestMixin, TestCase):
+    def setUp(self):
+        self.clazz, self.enrollments = self.make_class(capacity=2, requests=5)
+        Enrollment.objects.all().approve()
+
+    def waitlist(self):
+        return list(Enrollment.objects.filter(status='waitlisted').order_by('pk'))
+
+    def test_rejecting_an_approved_student_promotes_the_oldest(self):
+        self.assertEqual(self.waitlist(), self.enrollments[2:])
+        first = self.enrollments[0]
+        first.status = 'rejected'
+        first.save()
+        self.assertEqual(self.waitlist(), self.enrollments[3:])
+        self.clazz.refresh_from_db()
+        self.assertEqual(self.clazz.seats_taken, 2)
+
+    def test_deleting_an_approved_student_promotes_the_oldest(self):
+        Enrollment.objects.get(pk=self.enrollments[1].pk).delete()
+        self.assertEqual(self.waitlist(), self.enrollments[3:])
+
+    def test_raising_capacity_promotes_in_request_order(self):
+        self.clazz.capacity = 4
+        self.clazz.save()
+        self.assertEqual(self.waitlist(), self.enrollments[4:])
+        self.clazz.refresh_from_db()
+        self.assertEqual(self.clazz.seats_taken, 4)
+
+    def test_bulk_reject_clears_the_waitlist(self):
+        self.assertEqual(Enrollment.objects.filter(clazz=self.clazz).reject(), 3)
+        self.assertEqual(self.waitlist(), [])
+        self.assertEqual(Enrollment.objects.filter(status='approved').count(), 2)
+
+    def test_enrollments_page_lists_the_waitlist_in_order(self):
+        User.objects.create_superuser(username='admin', password='password')
+        self.client.login(username='admin', password='password')
+        response = self.client.get(reverse('dashboard:manage_enrollments'))
+        self.assertEqual([(e.pk, e.waitlist_position) for e in response.context['waitlisted']],
+                         [(e.pk, position) for position, e in enumerate(self.enrollments[2:], 1)])
+        self.assertContains(response, '#3')
+
+    def test_students_asking_for_a_full_class_are_waitlisted(self):
+        user = User.objects.create_user(username='late', password='password')
+        student = Student.objects.create(
+            user=user, full_name='Late Student', dob='2000-01-01',
+            phone_number='1234567890', email='late@example.com', address='123 Test St')
+        self.client.login(username='late', password='password')
+        self.client.get(reverse('enroll_student', args=[self.clazz.pk]))
+        self.assertEqual(Enrollment.objects.get(student=student).status, 'waitlisted')
+
+
+class StudentCatalogTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='student', password='password')
+        self.student = Student.objects.create(
+            user=user, full_name='Test Student', dob='2000-01-01',
+            phone_number='1234567890', email='student@example.com', address='123 Test St')
+        self.math = ClassType.objects.create(code='MATH')
+        self.art = ClassType.objects.create(code='ART')
+        self.client.login(username='student', password='password')
+
+    def add_classes(self, count, class_type):
+        return [Clazz.objects.create(
+            class_name=f'{class_type.code} {i:03}', class_type=class_type,
+            start_date=timezone.now().date(), end_date=timezone.now().date(),
+            price=100.00, room='101') for i in range(count)]
+
+    def catalog_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard:student_courses'), params)
+        return response, len(queries)
+
+    def test_each_class_carries_the_students_status(self):
+        requested, enrolled, other = self.add_classes(3, self.math)
+        Enrollment.objects.create(student=self.student, clazz=requested)
+        Enrollment.objects.create(student=self.student, clazz=enrolled, status='approved')
+        response, _ = self.catalog_queries()
+        self.assertEqual([(c.pk, c.enrollment_status) for c in response.context['classes']],
+                         [(requested.pk, 'pending'), (enrolled.pk, 'approved'), (other.pk, None)])
+
+        response, _ = self.catalog_queries(hide_mine='1')
+        self.assertEqual(list(response.context['classes']), [other])
+
+    def test_filtering_and_query_count(self):
+        self.add_classes(30, self.art)
+        _, small = self.catalog_queries(type=self.art.pk, page=2)
+        self.add_classes(30, self.art)
+        self.add_classes(3, self.math)
+        response, large = self.catalog_queries(type=self.art.pk, page=2)
+        self.assertEqual(small, large)
+        self.assertEqual(response.context['page'].number, 2)
+        self.assertEqual(response.context['page'].paginator.count, 60)
+        self.assertTrue(all(c.class_type_id == self.art.pk for c in response.context['classes']))
+
+    def test_first_page_adds_only_the_recommendation_query(self):
+        self.add_classes(30, self.art)
+        first, first_count = self.catalog_queries()
+        second, second_count = self.catalog_queries(page=2)
+        self.assertEqual(second.context['recommended'], [])
+        self.assertEqual(first_count, second_count + 1)
+        self.add_classes(30, self.math)
+        self.assertEqual(self.catalog_queries()[1], first_count)
+
+
+class ConcurrentApprovalTests(CapacityTestMixin, TransactionTestCase):
+    def test_parallel_approvals_never_oversubscribe(self):
+        clazz, enrollments = self.make_class(capacity=3, requests=12)
+        approved, errors = [], []
+        start = threading.Barrier(len(enrollments))
+
+        def approve(pk):
+            start.wait()
+            try:
+                while True:
+                    try:
+                        enrollment = Enrollment.objects.get(pk=pk)
+                        enrollment.status = 'approved'
+                        enrollment.save()
+                    except ClassFullError:
+                        return
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting.
+                        continue
+                    approved.append(pk)
+                    return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=approve, args=(e.pk,)) for e in enrollments]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        clazz.refresh_from_db()
+        self.assertEqual(len(approved), 3)
+        self.assertEqual(clazz.seats_taken, 3)
+        self.assertEqual(Enrollment.objects.filter(status='approved').count(), 3)
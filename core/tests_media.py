@@ -0,0 +1,76 @@
+import io
+import os
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+
+from .media import delete_orphan
+from .models import Material, StoredBlob, UploadSession
+from .storage import blob_storage
+from .testing import TemporaryMediaMixin, make_class
+
+
+class CleanupMediaTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        clazz = make_class()
+        self.material = Material.objects.create(
+            clazz=clazz, title="Slides", file=SimpleUploadedFile('slides.pdf', b'slides'))
+        # Stored, but the row that would refer to it was never saved.
+        self.orphan = blob_storage.save('lost.pdf', ContentFile(b'lost'))
+        self.legacy = self.write('class_materials/old.pdf')
+        upload = UploadSession.objects.create(
+            user=User.objects.create_user(username='teacher'), purpose='material',
+            target_id=clazz.pk, filename='video.mp4', size=10, chunk_size=5, received=5)
+        self.chunk = self.write(upload.new_chunk_name(0))
+        UploadSession.objects.filter(pk=upload.pk).update(chunk_names=[self.chunk])
+
+    def write(self, name):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x')
+        return name
+
+    def cleanup(self, *args):
+        out = io.StringIO()
+        call_command('cleanup_media', '--min-age', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reports_orphans_without_deleting(self):
+        output = self.cleanup()
+        self.assertIn(self.orphan, output)
+        self.assertIn(self.legacy, output)
+        self.assertNotIn(self.material.file.name, output)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, self.orphan)))
+
+    def test_delete_removes_orphans_and_their_blob_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cleanup('--delete')
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, self.orphan)))
+        self.assertFalse(os.path.exists(os.path.dirname(os.path.join(self.media_root, self.orphan))))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, self.legacy)))
+        self.assertTrue(os.path.exists(self.material.file.path))
+        self.assertEqual(list(StoredBlob.objects.values_list('name', flat=True)),
+                         [self.material.file.name])
+        # With --min-age 0 the open upload counts as stale.
+        self.assertEqual(UploadSession.objects.get().status, 'failed')
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, self.chunk)))
+
+    def test_a_file_referenced_since_the_scan_is_kept(self):
+        Material.objects.create(clazz=self.material.clazz, title="Found", file=self.orphan)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(delete_orphan(self.orphan))
+            self.assertTrue(delete_orphan(self.legacy))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, self.orphan)))
+        self.assertTrue(StoredBlob.objects.filter(name=self.orphan).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, self.legacy)))
+
+    def test_recent_files_and_active_uploads_are_kept(self):
+        out = io.StringIO()
+        call_command('cleanup_media', '--delete', stdout=out)
+        self.assertIn("Deleted 0 orphaned file(s)", out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, self.chunk)))
+        self.assertEqual(UploadSession.objects.get().status, 'open')
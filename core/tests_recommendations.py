@@ -0,0 +1,71 @@
+import datetime
+import io
+import unittest
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import recommendations
+from core.models import ClassRecommendation, ClassType, Clazz, Enrollment, Student
+from core.recommendations import class_neighbours, recommended_classes
+
+PAIRS = [
+    # student, class
+    (1, 10), (1, 20), (1, 30),
+    (2, 10), (2, 20),
+    (3, 20), (3, 30),
+    (4, 40),
+    (4, 40),  # repeated pairs count once
+]
+
+
+class NeighbourTests(unittest.TestCase):
+    def test_cosine_similarity_and_top_k(self):
+        neighbours = class_neighbours(PAIRS, top_k=1, engine='python')
+        # 10 and 20 share two students: 2 / sqrt(2 * 3).
+        self.assertEqual(neighbours[10], [(20, 2 / 6 ** 0.5)])
+        # 20 ties between 10 and 30; the lower id wins.
+        self.assertEqual(neighbours[20], [(10, 2 / 6 ** 0.5)])
+        self.assertNotIn(40, neighbours)
+
+    @unittest.skipIf(recommendations.sparse is None, "SciPy is not installed")
+    def test_engines_agree(self):
+        python = class_neighbours(PAIRS, top_k=3, engine='python')
+        scipy = class_neighbours(PAIRS, top_k=3, engine='scipy')
+        self.assertEqual(python.keys(), scipy.keys())
+        for class_id, items in python.items():
+            self.assertEqual([c for c, _ in items], [c for c, _ in scipy[class_id]])
+            for (_, a), (_, b) in zip(items, scipy[class_id]):
+                self.assertAlmostEqual(a, b)
+
+
+class RecommendedClassesTests(TestCase):
+    def setUp(self):
+        class_type = ClassType.objects.create(code='MATH')
+        today = datetime.date.today()
+        self.classes = [Clazz.objects.create(
+            class_name=name, class_type=class_type, price=100.00, room='101',
+            start_date=today, end_date=today + datetime.timedelta(days=30))
+            for name in ('Algebra', 'Geometry', 'Calculus', 'Pottery')]
+        self.students = [Student.objects.create(
+            full_name=f'Student {i}', dob='2000-01-01', phone_number='1234567890',
+            email=f's{i}@example.com', address='123 Test St') for i in range(3)]
+
+    def enroll(self, student, *classes):
+        for clazz in classes:
+            Enrollment.objects.create(student=student, clazz=clazz, status='approved')
+
+    def test_recommends_co_enrolled_classes_the_student_lacks(self):
+        algebra, geometry, calculus, pottery = self.classes
+        self.enroll(self.students[0], algebra, geometry, calculus)
+        self.enroll(self.students[1], algebra, calculus, pottery)
+        self.enroll(self.students[2], algebra)
+
+        call_command('build_recommendations', engine='python', stdout=io.StringIO())
+        self.assertTrue(ClassRecommendation.objects.exists())
+
+        with self.assertNumQueries(1):
+            recommended = list(recommended_classes(self.students[2]))
+        self.assertEqual(recommended[0], calculus)
+        self.assertEqual(set(recommended), {calculus, geometry, pottery})
+        self.assertEqual(list(recommended_classes(self.students[0])), [pottery])
@@ -0,0 +1,284 @@
+import datetime
+import importlib
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from dashboard.views import schedule_feed_token
+from core.models import Attendance, ClassSession, ClassWeekday, Clazz, ClassType, Enrollment, Student, Teacher
+from core.ical import build_calendar
+from core.schedule import (
+    WEEKDAY_NAMES, classes_meeting_on, month_occurrences, occurrences_by_date, parse_weekdays,
+    weekdays_from_mask)
+
+
+class WeekdayParsingTests(TestCase):
+    def test_english_names_and_abbreviations(self):
+        self.assertEqual(weekdays_from_mask(
+            parse_weekdays("Monday, Wednesday")), [0, 2])
+        self.assertEqual(weekdays_from_mask(
+            parse_weekdays("tue/thurs & Sun")), [1, 3, 6])
+
+    def test_vietnamese_names(self):
+        self.assertEqual(weekdays_from_mask(
+            parse_weekdays("Thứ 2, Thứ 4, Chủ Nhật")), [0, 2, 6])
+        self.assertEqual(weekdays_from_mask(parse_weekdays("T3 - T5")), [1, 3])
+
+    def test_vietnamese_word_names(self):
+        self.assertEqual(weekdays_from_mask(parse_weekdays("Thứ Hai, Thứ Ba")), [0, 1])
+        self.assertEqual(weekdays_from_mask(
+            parse_weekdays("Thứ Tư, Thứ Năm, Thứ Sáu, Thứ Bảy")), [2, 3, 4, 5])
+        self.assertEqual(weekdays_from_mask(parse_weekdays("thu tu - thu sau")), [2, 4])
+        self.assertEqual(weekdays_from_mask(parse_weekdays("Tue, Thu")), [1, 3])
+
+    def test_migration_parser_matches(self):
+        migration = importlib.import_module('core.migrations.0014_clazz_weekday_mask')
+        for text in ("Monday, Wednesday", "tue/thurs & Sun", "Thứ 2, Thứ 4, Chủ Nhật",
+                     "T3 - T5", "Thứ Hai, Thứ Ba", "Thứ Năm, Thứ Bảy", "TBA"):
+            self.assertEqual(migration.parse_weekdays(text), parse_weekdays(text), text)
+
+    def test_migration_mask_helper_matches(self):
+        migration = importlib.import_module('core.migrations.0015_classweekday')
+        for mask in range(128):
+            self.assertEqual(migration.weekdays_from_mask(mask), weekdays_from_mask(mask), mask)
+
+    def test_empty(self):
+        self.assertEqual(parse_weekdays(None), 0)
+        self.assertEqual(parse_weekdays("TBA"), 0)
+
+
+class OccurrenceTests(TestCase):
+    def setUp(self):
+        self.class_type = ClassType.objects.create(code="MATH", description="Math")
+
+    def test_occurrences_respect_weekdays_and_date_range(self):
+        clazz = Clazz.objects.create(
+            class_name="Math 101", class_type=self.class_type, room="101",
+            price=100.00, day_of_week="Monday, Friday",
+            # 2025-09-03 is a Wednesday
+            start_date=datetime.date(2025, 9, 3),
+            end_date=datetime.date(2025, 9, 19))
+        self.assertEqual(clazz.weekday_mask, 0b10001)
+
+        occurrences = occurrences_by_date(
+            [clazz], datetime.date(2025, 9, 1), datetime.date(2025, 9, 30))
+        self.assertEqual(sorted(occurrences), [
+            datetime.date(2025, 9, 5), datetime.date(2025, 9, 8),
+            datetime.date(2025, 9, 12), datetime.date(2025, 9, 15),
+            datetime.date(2025, 9, 19),
+        ])
+
+
+class TeacherScheduleTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="teacher", password="password")
+        teacher = Teacher.objects.create(
+            user=self.user, full_name="Test Teacher", dob=datetime.date(1980, 1, 1),
+            email="teacher@example.com")
+        self.clazz = Clazz.objects.create(
+            class_name="Math 101", class_type=ClassType.objects.create(code="MATH"),
+            teacher=teacher, room="101", price=100.00, day_of_week="Monday",
+            start_time=datetime.time(9, 0), end_time=datetime.time(10, 30),
+            start_date=datetime.date(2025, 9, 1), end_date=datetime.date(2025, 12, 31))
+
+
+class ScheduleCacheTests(TeacherScheduleTestCase):
+    def test_month_is_cached_until_schedule_changes(self):
+        first = month_occurrences(self.user, 2025, 9)
+        self.assertEqual([o['date'] for o in first][:2], ['2025-09-01', '2025-09-08'])
+
+        with self.assertNumQueries(0):
+            month_occurrences(self.user, 2025, 9)
+
+        clazz = Clazz.objects.get(pk=self.clazz.pk)
+        clazz.price = 120.00
+        clazz.save()
+        with self.assertNumQueries(0):
+            month_occurrences(self.user, 2025, 9)
+
+        clazz.day_of_week = "Tuesday"
+        clazz.save()
+        self.assertEqual(month_occurrences(self.user, 2025, 9)[0]['date'], '2025-09-02')
+
+    def test_requests_only_drop_the_student_months_once_approved(self):
+        student_user = User.objects.create_user(username="student", password="password")
+        student = Student.objects.create(
+            user=student_user, full_name="Test Student", dob=datetime.date(2000, 1, 1),
+            phone_number="1234567890", email="student@example.com", address="123 Test St")
+        self.assertEqual(month_occurrences(student_user, 2025, 9), [])
+        month_occurrences(self.user, 2025, 9)
+
+        enrollment = Enrollment.objects.create(student=student, clazz=self.clazz)
+        with self.assertNumQueries(0):
+            month_occurrences(student_user, 2025, 9)
+            month_occurrences(self.user, 2025, 9)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.filter(pk=enrollment.pk).approve()
+        with self.assertNumQueries(0):
+            month_occurrences(self.user, 2025, 9)
+        self.assertEqual(len(month_occurrences(student_user, 2025, 9)), 5)
+
+        clazz = Clazz.objects.get(pk=self.clazz.pk)
+        clazz.room = "102"
+        clazz.save()
+        self.assertEqual(month_occurrences(self.user, 2025, 9)[0]['room'], "102")
+        self.assertEqual(month_occurrences(student_user, 2025, 9)[0]['room'], "102")
+
+    def test_range_endpoint(self):
+        self.client.login(username="teacher", password="password")
+        url = reverse('dashboard:schedule_occurrences')
+        response = self.client.get(url, {'start': '2025-09-25', 'end': '2025-10-10'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(o['date'], o['start_time']) for o in response.json()['occurrences']],
+            [('2025-09-29', '09:00'), ('2025-10-06', '09:00')])
+
+        self.assertEqual(self.client.get(url, {'start': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get(
+            url, {'start': '2025-01-01', 'end': '2027-01-01'}).status_code, 400)
+
+
+class ICalFeedTests(TeacherScheduleTestCase):
+    def test_one_recurring_event_per_class(self):
+        self.clazz.day_of_week = "Tuesday, Thursday"
+        self.clazz.class_name = "Toán, nâng cao; " + "x" * 80
+        self.clazz.save()
+        text = build_calendar([self.clazz], "Schedule", "example.com")
+        self.assertEqual(text.count("BEGIN:VEVENT"), 1)
+        # 2025-09-01 is a Monday; the first meeting is the Tuesday after.
+        self.assertIn("DTSTART:20250902T090000\r\n", text)
+        self.assertIn("RRULE:FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20251231T235959\r\n", text)
+        self.assertIn("SUMMARY:Toán\\, nâng cao\\;", text)
+        for line in text.split("\r\n"):
+            self.assertLessEqual(len(line.encode("utf-8")), 75)
+
+    def test_feed_answers_not_modified(self):
+        url = reverse('dashboard:schedule_feed', args=[schedule_feed_token(self.user)])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertIn(b"UID:class-", response.content)
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        self.clazz.start_time = datetime.time(8, 0)
+        self.clazz.save()
+        self.assertEqual(self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+        bad_url = reverse('dashboard:schedule_feed', args=["not-a-token"])
+        self.assertEqual(self.client.get(bad_url).status_code, 404)
+
+
+class ClassesMeetingOnTests(TeacherScheduleTestCase):
+    def test_weekday_rows_follow_day_of_week(self):
+        self.assertEqual(list(self.clazz.weekdays.values_list('weekday', flat=True)), [0])
+        self.clazz.day_of_week = "Tuesday, Thursday"
+        self.clazz.save()
+        self.assertEqual(sorted(self.clazz.weekdays.values_list('weekday', flat=True)), [1, 3])
+        self.assertEqual(ClassWeekday.objects.count(), 2)
+
+    def test_only_running_classes_in_start_time_order(self):
+        early = Clazz.objects.create(
+            class_name="Early Math", class_type=self.clazz.class_type, room="102",
+            price=100.00, day_of_week="Thứ 2", start_time=datetime.time(7, 0),
+            end_time=datetime.time(8, 0), start_date=datetime.date(2025, 9, 1),
+            end_date=datetime.date(2025, 9, 30))
+        monday = datetime.date(2025, 9, 15)
+        self.assertEqual(list(classes_meeting_on(monday)), [early, self.clazz])
+        self.assertEqual(list(classes_meeting_on(monday + datetime.timedelta(days=1))), [])
+        # After the early class has ended.
+        self.assertEqual(list(classes_meeting_on(datetime.date(2025, 10, 6))), [self.clazz])
+
+    def test_teacher_dashboard_lists_todays_classes(self):
+        today = datetime.date.today()
+        Clazz.objects.filter(pk=self.clazz.pk).update(
+            start_date=today, end_date=today + datetime.timedelta(days=30))
+        self.clazz.refresh_from_db()
+        self.clazz.day_of_week = WEEKDAY_NAMES[today.weekday()]
+        self.clazz.save()
+
+        self.client.login(username="teacher", password="password")
+        response = self.client.get(reverse('dashboard:teacher_dashboard'))
+        self.assertEqual(list(response.context['today_schedule']), [self.clazz])
+
+
+class ClassSessionTests(TeacherScheduleTestCase):
+    def setUp(self):
+        super().setUp()
+        student = Student.objects.create(
+            full_name="Test Student", dob=datetime.date(2005, 1, 1),
+            phone_number="0123456789", email="student@example.com", address="Street")
+        self.enrollment = Enrollment.objects.create(
+            student=student, clazz=self.clazz, status='approved')
+
+    def test_sessions_follow_the_schedule(self):
+        sessions = self.clazz.sessions.order_by('date')
+        # Every Monday from 2025-09-01 to 2025-12-29.
+        self.assertEqual(sessions.count(), 18)
+        self.assertEqual(sessions.first().date, datetime.date(2025, 9, 1))
+        self.assertEqual(sessions.last().date, datetime.date(2025, 12, 29))
+        self.assertFalse(sessions.filter(is_extra=True).exists())
+
+    def test_schedule_change_only_touches_changed_sessions(self):
+        ids = set(self.clazz.sessions.values_list('pk', flat=True))
+        self.clazz.start_time = datetime.time(13, 0)
+        self.clazz.end_time = datetime.time(14, 30)
+        self.clazz.save()
+        self.assertEqual(set(self.clazz.sessions.values_list('pk', flat=True)), ids)
+        self.assertEqual(set(self.clazz.sessions.values_list('start_time', flat=True)),
+                         {datetime.time(13, 0)})
+
+    def test_moving_the_class_keeps_held_sessions(self):
+        held = ClassSession.objects.get(clazz=self.clazz, date=datetime.date(2025, 9, 8))
+        Attendance.objects.create(enrollment=self.enrollment, date=held.date,
+                                  status='Present', session=held)
+        self.clazz.day_of_week = "Tuesday"
+        self.clazz.save()
+
+        sessions = self.clazz.sessions
+        self.assertEqual(sessions.filter(is_extra=False).count(), 18)
+        self.assertFalse(sessions.filter(is_extra=False, date__week_day=2).exists())
+        self.assertEqual(list(sessions.filter(is_extra=True)), [held])
+
+    def test_attendance_on_an_extra_day_creates_a_session(self):
+        saturday = datetime.date(2025, 9, 13)
+        self.client.login(username="teacher", password="password")
+        self.client.post(reverse('dashboard:take_attendance', args=[self.clazz.pk]), {
+            'date': saturday.isoformat(), f'status_{self.enrollment.pk}': 'Present'})
+        attendance = Attendance.objects.get(enrollment=self.enrollment, date=saturday)
+        self.assertTrue(attendance.session.is_extra)
+        self.assertEqual(attendance.session.date, saturday)
+
+    def test_backfill_links_existing_attendance(self):
+        migration = importlib.import_module('core.migrations.0016_classsession')
+        ClassSession.objects.all().delete()
+        monday = Attendance.objects.create(
+            enrollment=self.enrollment, date=datetime.date(2025, 9, 1), status='Present')
+        sunday = Attendance.objects.create(
+            enrollment=self.enrollment, date=datetime.date(2025, 9, 7), status='Absent')
+
+        migration.backfill_class_sessions(apps, None)
+        monday.refresh_from_db()
+        sunday.refresh_from_db()
+        self.assertEqual(self.clazz.sessions.count(), 19)
+        self.assertFalse(monday.session.is_extra)
+        self.assertTrue(sunday.session.is_extra)
+
+    def test_dashboard_counts_sessions_held_so_far(self):
+        today = datetime.date.today()
+        Clazz.objects.filter(pk=self.clazz.pk).update(
+            start_date=today.replace(day=1), end_date=today + datetime.timedelta(days=30))
+        self.clazz.refresh_from_db()
+        self.clazz.day_of_week = ", ".join(WEEKDAY_NAMES)
+        self.clazz.save()
+
+        self.client.login(username="teacher", password="password")
+        response = self.client.get(reverse('dashboard:teacher_dashboard'))
+        self.assertEqual(response.context['monthly_sessions'], today.day)
+        self.assertEqual(response.context['yearly_sessions'], today.day)
@@ -0,0 +1,37 @@
+import datetime
+
+from django.test import TestCase
+from core.models import Student, Clazz, ClassType, Enrollment
+
+
+class OverallScoreTests(TestCase):
+    def setUp(self):
+        class_type = ClassType.objects.create(code="MATH", description="Math")
+        self.clazz = Clazz.objects.create(
+            class_name="Math 101", class_type=class_type, room="101",
+            price=100.00, start_date=datetime.date.today(),
+            end_date=datetime.date.today())
+
+    def enroll(self, name, **scores):
+        student = Student.objects.create(
+            full_name=name, dob=datetime.date(2000, 1, 1),
+            email=f"{name}@example.com")
+        return Enrollment.objects.create(
+            student=student, clazz=self.clazz, status='approved', **scores)
+
+    def test_weighted_score_and_pass_flag(self):
+        self.enroll('top', minitest1=10, minitest2=10, minitest3=10,
+                    minitest4=10, midterm=10, final_test=10)
+        # 0.2 * 2 + 0.3 * 4 + 0.5 * 4 = 3.6 -> failed
+        self.enroll('low', minitest1=8, midterm=4, final_test=4)
+        self.enroll('empty')
+
+        ranked = list(Enrollment.objects.with_overall_score().order_by(
+            '-overall_score').values_list('student__full_name', 'overall_score', 'is_passed'))
+
+        self.assertEqual([row[0] for row in ranked], ['top', 'low', 'empty'])
+        self.assertAlmostEqual(ranked[0][1], 10.0)
+        self.assertAlmostEqual(ranked[1][1], 3.6)
+        self.assertEqual([row[2] for row in ranked], [True, False, False])
+        self.assertEqual(
+            Enrollment.objects.with_overall_score().filter(is_passed=True).count(), 1)
@@ -0,0 +1,88 @@
+import os
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from .models import AssignmentSubmission, Material, StoredBlob
+from .storage import blob_storage
+from .testing import TemporaryMediaMixin, make_assignment, make_class, make_student
+
+
+class ContentAddressedStorageTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.classes = [make_class(class_name=f"Math {i}") for i in range(2)]
+
+    def add_material(self, clazz, content=b'%PDF-1.4 slides', name='slides.pdf'):
+        return Material.objects.create(
+            clazz=clazz, title="Slides", file=SimpleUploadedFile(name, content))
+
+    def test_duplicate_uploads_share_one_blob(self):
+        first = self.add_material(self.classes[0])
+        second = self.add_material(self.classes[1], name='copy.pdf')
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith('blobs/'))
+        self.assertEqual((first.file_name, second.file_name), ('slides.pdf', 'copy.pdf'))
+        self.assertEqual(Material.objects.get(pk=second.pk).file_name, 'copy.pdf')
+        blob = StoredBlob.objects.get()
+        self.assertEqual((blob.ref_count, blob.size), (2, len(b'%PDF-1.4 slides')))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'blobs', 'incoming')), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(blob_storage.exists(second.file.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(blob_storage.exists(second.file.name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_content_stored_again_before_the_removal_is_kept(self):
+        first = self.add_material(self.classes[0])
+        name = first.file.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 0)
+
+        second = self.add_material(self.classes[1])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(second.file.name, name)
+        self.assertTrue(blob_storage.exists(name))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+        # A removal that got as far as the file is undone by the next upload.
+        os.remove(blob_storage.path(name))
+        StoredBlob.objects.update(ref_count=0)
+        third = self.add_material(self.classes[0])
+        self.assertEqual(third.file.read(), b'%PDF-1.4 slides')
+        third.file.close()
+
+    def test_replacing_a_file_releases_the_old_blob(self):
+        clazz = self.classes[0]
+        submission = AssignmentSubmission.objects.create(
+            assignment=make_assignment(clazz), student=make_student(),
+            submission_file=SimpleUploadedFile('essay.pdf', b'draft'))
+        draft = submission.submission_file.name
+        self.assertEqual(submission.file_name, 'essay.pdf')
+
+        submission = AssignmentSubmission.objects.get(pk=submission.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            submission.submission_file = SimpleUploadedFile('essay.pdf', b'final')
+            submission.save()
+        self.assertFalse(blob_storage.exists(draft))
+
+        # Uploading the same content again keeps a single reference.
+        submission = AssignmentSubmission.objects.get(pk=submission.pk)
+        submission.submission_file = SimpleUploadedFile('essay.pdf', b'final')
+        submission.save()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_files_saved_before_the_blob_store_are_deleted_plainly(self):
+        legacy = os.path.join('class_materials', 'legacy.pdf')
+        os.makedirs(os.path.join(self.media_root, 'class_materials'), exist_ok=True)
+        with open(os.path.join(self.media_root, legacy), 'wb') as f:
+            f.write(b'legacy')
+        material = Material.objects.create(clazz=self.classes[0], title="Old", file=legacy)
+        with self.captureOnCommitCallbacks(execute=True):
+            material.delete()
+        self.assertFalse(blob_storage.exists(legacy))
@@ -0,0 +1,81 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from core.conflicts import term_conflicts
+from core.models import Clazz, ClassType, Teacher
+from core.timetable import (
+    SlotGrid, TimetableClass, TimetableSolver, find_violations, generate_instance)
+
+
+class TimetableSolverTests(TestCase):
+    def test_term_of_500_classes_is_conflict_free(self):
+        classes, rooms = generate_instance(500, 40, 120, seed=1)
+        result = TimetableSolver(classes, rooms, SlotGrid().slots_per_day).solve(time_limit=10)
+        self.assertEqual(result.unassigned, [])
+        self.assertEqual(find_violations(classes, result.assignments), set())
+        self.assertLess(result.seconds, 5)
+
+    def test_repair_places_classes_construction_missed(self):
+        # A crowded instance (60 classes, 3 rooms) that the greedy pass
+        # leaves incomplete.
+        classes, rooms = generate_instance(60, 3, 15, seed=22)
+        result = TimetableSolver(classes, rooms, SlotGrid().slots_per_day).solve(time_limit=5)
+        self.assertGreater(result.repairs, 0)
+        self.assertEqual(result.unassigned, [])
+        self.assertEqual(find_violations(classes, result.assignments), set())
+
+    def test_impossible_classes_are_reported(self):
+        classes = [TimetableClass("long", 5, (0,), teacher=1),
+                   TimetableClass("fits", 2, (0,), teacher=1)]
+        result = TimetableSolver(classes, ["A"], 4).solve(time_limit=1)
+        self.assertEqual(result.unassigned, ["long"])
+        self.assertEqual(result.assignments, {"fits": ("A", 0)})
+
+
+class SolveTimetableCommandTests(TestCase):
+    def test_apply_resolves_clashes(self):
+        class_type = ClassType.objects.create(code="MATH")
+        teacher = Teacher.objects.create(
+            full_name="Test Teacher", dob=datetime.date(1980, 1, 1), email="t@example.com")
+        for number in range(3):
+            Clazz.objects.create(
+                class_name=f"Math {number}", class_type=class_type, teacher=teacher,
+                room="101", price=100.00, day_of_week="Monday",
+                start_time=datetime.time(9, 0), end_time=datetime.time(10, 30),
+                start_date=datetime.date(2025, 9, 1), end_date=datetime.date(2025, 12, 31))
+        term = (datetime.date(2025, 9, 1), datetime.date(2025, 12, 31))
+        self.assertTrue(term_conflicts(*term))
+
+        out = StringIO()
+        call_command('solve_timetable', start='2025-09-01', end='2025-12-31',
+                     rooms='101,102', apply=True, stdout=out)
+        self.assertIn("Saved 2 classes.", out.getvalue())
+        self.assertEqual(term_conflicts(*term), [])
+        # The first class keeps its room and time.
+        first = Clazz.objects.get(class_name="Math 0")
+        self.assertEqual((first.room, first.start_time), ("101", datetime.time(9, 0)))
+
+    def test_classes_left_in_place_keep_their_exact_times(self):
+        Clazz.objects.create(
+            class_name="Math 0", class_type=ClassType.objects.create(code="MATH"),
+            room="101", price=100.00, day_of_week="Monday",
+            start_time=datetime.time(9, 15), end_time=datetime.time(10, 45),
+            start_date=datetime.date(2025, 9, 1), end_date=datetime.date(2025, 12, 31))
+        out = StringIO()
+        call_command('solve_timetable', start='2025-09-01', end='2025-12-31',
+                     apply=True, stdout=out)
+        self.assertIn("0 to change", out.getvalue())
+        clazz = Clazz.objects.get()
+        self.assertEqual((clazz.start_time, clazz.end_time),
+                         (datetime.time(9, 15), datetime.time(10, 45)))
+
+
+class SlotGridTests(TestCase):
+    def test_moving_keeps_the_offset_and_length(self):
+        grid = SlotGrid(datetime.time(7, 0), datetime.time(21, 0), 30)
+        start, end = datetime.time(9, 20), datetime.time(10, 20)
+        self.assertEqual(grid.duration_of(grid.time_of(grid.slot_of(start)), end), 3)
+        self.assertEqual(grid.move(start, end, grid.slot_of(datetime.time(13, 0))),
+                         (datetime.time(13, 20), datetime.time(14, 20)))
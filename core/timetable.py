@@ -0,0 +1,409 @@
+"""
+Automatic room and start-time assignment for a term's classes.
+
+The week is cut into fixed slots (30 minutes by default). Each class needs a
+room and one start slot that it keeps on all of its weekdays, and no room or
+teacher may hold two classes in the same slot. All classes in a run are
+treated as meeting for the whole term.
+
+The solver is pure Python and works in two phases:
+
+1. Construction: classes are placed most-constrained-first (fewest free
+   room/start pairs, estimated lazily), each taking the earliest free slot,
+   with forward checking against the teacher's other unplaced classes.
+   Occupancy per room/teacher and weekday is an int bitset, so "free starts"
+   for a duration is a few shifts and masks.
+2. Repair: classes that could not be placed are inserted by min-conflicts
+   local search, evicting the fewest placed classes, with a short tabu list
+   against cycling.
+"""
+import datetime
+import heapq
+import random
+import time
+from collections import namedtuple
+
+DEFAULT_DAY_START = datetime.time(7, 0)
+DEFAULT_DAY_END = datetime.time(21, 0)
+DEFAULT_SLOT_MINUTES = 30
+
+TimetableClass = namedtuple(
+    'TimetableClass', ['key', 'duration', 'weekdays', 'teacher', 'preferred_room', 'preferred_start'],
+    defaults=(None, None))
+TimetableClass.__doc__ = """A class to place: `duration` in slots, `weekdays` as
+0 (Monday) .. 6, and `teacher` any hashable id or None."""
+
+TimetableResult = namedtuple('TimetableResult', ['assignments', 'unassigned', 'seconds', 'repairs'])
+TimetableResult.__doc__ = """`assignments` maps class keys to (room, start slot);
+`unassigned` lists the keys that found no conflict-free place."""
+
+
+class SlotGrid:
+    """Converts between times of day and slot numbers."""
+
+    def __init__(self, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END,
+                 slot_minutes=DEFAULT_SLOT_MINUTES):
+        self.day_start = day_start
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = (_minutes(day_end) - _minutes(day_start)) // slot_minutes
+        if self.slots_per_day <= 0:
+            raise ValueError("The day must end after it starts.")
+
+    def slot_of(self, value):
+        """Slot containing `value`, or None if it is outside the day."""
+        slot = (_minutes(value) - _minutes(self.day_start)) // self.slot_minutes
+        return slot if 0 <= slot < self.slots_per_day else None
+
+    def duration_of(self, start, end):
+        """Whole slots needed to cover start..end."""
+        return -(-(_minutes(end) - _minutes(start)) // self.slot_minutes)
+
+    def time_of(self, slot):
+        minutes = _minutes(self.day_start) + slot * self.slot_minutes
+        return datetime.time(minutes // 60, minutes % 60)
+
+    def move(self, start, end, slot):
+        """start..end moved to `slot`, keeping its length and how far into
+        its slot it starts."""
+        offset = (_minutes(start) - _minutes(self.day_start)) % self.slot_minutes
+        if self.slot_of(start) is None:
+            offset = 0
+        begin = _minutes(self.time_of(slot)) + offset
+        finish = begin + _minutes(end) - _minutes(start)
+        return (datetime.time(begin // 60, begin % 60),
+                datetime.time(finish // 60, finish % 60))
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _blocked_starts(busy, duration):
+    """Bit s is set when a class of `duration` starting at slot s would hit a
+    busy slot."""
+    blocked = busy
+    for shift in range(1, duration):
+        blocked |= busy >> shift
+    return blocked
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class TimetableSolver:
+    def __init__(self, classes, rooms, slots_per_day, seed=0):
+        self.classes = list(classes)
+        self.rooms = list(rooms)
+        self.slots_per_day = slots_per_day
+        self.random = random.Random(seed)
+        if not self.rooms:
+            raise ValueError("At least one room is needed.")
+
+        self._room_index = {room: i for i, room in enumerate(self.rooms)}
+        self._room_busy = [[0] * 7 for _ in self.rooms]
+        self._room_owner = [[[None] * slots_per_day for _ in range(7)] for _ in self.rooms]
+        self._teacher_busy = {}
+        self._teacher_owner = {}
+        self._peers = {}
+        for index, clazz in enumerate(self.classes):
+            if clazz.teacher is not None:
+                self._teacher_busy.setdefault(clazz.teacher, [0] * 7)
+                self._teacher_owner.setdefault(
+                    clazz.teacher, [[None] * slots_per_day for _ in range(7)])
+                self._peers.setdefault(clazz.teacher, []).append(index)
+        self._placement = [None] * len(self.classes)
+
+    # Occupancy
+
+    def _valid_starts(self, clazz):
+        if clazz.duration > self.slots_per_day or not clazz.weekdays:
+            return 0
+        return (1 << (self.slots_per_day - clazz.duration + 1)) - 1
+
+    def _teacher_free(self, clazz):
+        valid = self._valid_starts(clazz)
+        if clazz.teacher is None:
+            return valid
+        busy = 0
+        for day in clazz.weekdays:
+            busy |= self._teacher_busy[clazz.teacher][day]
+        return valid & ~_blocked_starts(busy, clazz.duration)
+
+    def _room_free(self, clazz, room, starts):
+        busy = 0
+        for day in clazz.weekdays:
+            busy |= self._room_busy[room][day]
+        return starts & ~_blocked_starts(busy, clazz.duration)
+
+    def _place(self, index, room, start):
+        clazz = self.classes[index]
+        span = ((1 << clazz.duration) - 1) << start
+        for day in clazz.weekdays:
+            self._room_busy[room][day] |= span
+            owners = self._room_owner[room][day]
+            for slot in range(start, start + clazz.duration):
+                owners[slot] = index
+            if clazz.teacher is not None:
+                self._teacher_busy[clazz.teacher][day] |= span
+                owners = self._teacher_owner[clazz.teacher][day]
+                for slot in range(start, start + clazz.duration):
+                    owners[slot] = index
+        self._placement[index] = (room, start)
+
+    def _remove(self, index):
+        room, start = self._placement[index]
+        clazz = self.classes[index]
+        span = ((1 << clazz.duration) - 1) << start
+        for day in clazz.weekdays:
+            self._room_busy[room][day] &= ~span
+            owners = self._room_owner[room][day]
+            for slot in range(start, start + clazz.duration):
+                owners[slot] = None
+            if clazz.teacher is not None:
+                self._teacher_busy[clazz.teacher][day] &= ~span
+                owners = self._teacher_owner[clazz.teacher][day]
+                for slot in range(start, start + clazz.duration):
+                    owners[slot] = None
+        self._placement[index] = None
+
+    # Construction
+
+    def _free_count(self, index):
+        clazz = self.classes[index]
+        starts = self._teacher_free(clazz)
+        if not starts:
+            return 0
+        return sum(bin(self._room_free(clazz, room, starts)).count('1')
+                   for room in range(len(self.rooms)))
+
+    def _room_order(self, clazz):
+        order = list(range(len(self.rooms)))
+        preferred = self._room_index.get(clazz.preferred_room)
+        if preferred is not None:
+            order.remove(preferred)
+            order.insert(0, preferred)
+        return order
+
+    def _candidates(self, index):
+        """Free (room, start) pairs, best first: closest to the preferred
+        start, then the preferred room, then best fit (starts flush against
+        busy slots, in the fullest room) so that large free blocks stay open
+        for long classes."""
+        clazz = self.classes[index]
+        starts = self._teacher_free(clazz)
+        if not starts:
+            return []
+        target = clazz.preferred_start
+        day_end = 1 << (self.slots_per_day - clazz.duration)
+        candidates = []
+        for rank, room in enumerate(self._room_order(clazz)):
+            busy = 0
+            for day in clazz.weekdays:
+                busy |= self._room_busy[room][day]
+            free = starts & ~_blocked_starts(busy, clazz.duration)
+            if not free:
+                continue
+            flush_left = free & ((busy << 1) | 1)
+            flush_right = free & ((busy >> clazz.duration) | day_end)
+            both = flush_left & flush_right
+            load = bin(busy).count('1')
+            preferred = 0 if rank == 0 and clazz.preferred_room is not None else 1
+            # Without a preferred time only the flush starts can fit best.
+            options = free if target is not None else (flush_left | flush_right) or (free & -free)
+            for start in _bits(options):
+                touching = 2 if (both >> start) & 1 else int(
+                    bool(((flush_left | flush_right) >> start) & 1))
+                distance = abs(start - target) if target is not None else 0
+                candidates.append((distance, preferred, -touching, -load, start, room))
+        candidates.sort()
+        return [(room, start) for *_, start, room in candidates]
+
+    def _open_peers(self, index):
+        """The teacher's other unplaced classes that still have a free start."""
+        clazz = self.classes[index]
+        if clazz.teacher is None:
+            return []
+        return [peer for peer in self._peers[clazz.teacher]
+                if peer != index and self._placement[peer] is None
+                and self._teacher_free(self.classes[peer])]
+
+    def _construct(self, deadline, max_tries=8):
+        heap = [(self._free_count(i), -len(c.weekdays) * c.duration, i)
+                for i, c in enumerate(self.classes) if self._valid_starts(c)]
+        heapq.heapify(heap)
+        unplaced = []
+        while heap:
+            if time.monotonic() > deadline:
+                unplaced.extend(i for _, _, i in heap)
+                break
+            stale, tie, index = heapq.heappop(heap)
+            # Counts only shrink, so a stale key is an upper bound; refresh it
+            # and put the class back if it is no longer the most constrained.
+            count = self._free_count(index)
+            if heap and count < stale and count > heap[0][0]:
+                heapq.heappush(heap, (count, tie, index))
+                continue
+            placed = False
+            peers = self._open_peers(index)
+            for room, start in self._candidates(index)[:max_tries]:
+                self._place(index, room, start)
+                # Forward check: no other class of the teacher may lose its
+                # last free start.
+                if all(self._teacher_free(self.classes[peer]) for peer in peers):
+                    placed = True
+                    break
+                self._remove(index)
+            if not placed:
+                unplaced.append(index)
+        return unplaced
+
+    # Repair
+
+    def _owners(self, table, clazz, start):
+        found = set()
+        for day in clazz.weekdays:
+            found.update(table[day][start:start + clazz.duration])
+        return found
+
+    def _moves(self, index):
+        """Yields (room, start, classes to evict) for every placement."""
+        clazz = self.classes[index]
+        valid = self._valid_starts(clazz)
+        teacher_free = self._teacher_free(clazz)
+        teacher_conflicts = {}
+        if clazz.teacher is not None:
+            table = self._teacher_owner[clazz.teacher]
+            for start in _bits(valid & ~teacher_free):
+                teacher_conflicts[start] = self._owners(table, clazz, start)
+        for room in range(len(self.rooms)):
+            room_free = self._room_free(clazz, room, valid)
+            for start in _bits(valid):
+                conflicts = set(teacher_conflicts.get(start, ()))
+                if not (room_free >> start) & 1:
+                    conflicts |= self._owners(self._room_owner[room], clazz, start)
+                conflicts.discard(None)
+                conflicts.discard(index)
+                yield room, start, conflicts
+
+    def _size(self, index):
+        clazz = self.classes[index]
+        return clazz.duration * len(clazz.weekdays)
+
+    def _repair(self, unplaced, deadline, tabu_size=50):
+        queue = sorted(unplaced, key=self._size)
+        tabu = []
+        repairs = 0
+        while queue and time.monotonic() < deadline:
+            # Largest first: small classes are easier to fit back in.
+            index = queue.pop()
+            best, best_moves = None, []
+            for room, start, conflicts in self._moves(index):
+                if (index, room, start) in tabu:
+                    continue
+                # Evicting fewer, smaller classes leaves less to repair.
+                cost = sum(self._size(other) for other in conflicts)
+                if best is None or cost < best:
+                    best, best_moves = cost, [(room, start, conflicts)]
+                elif cost == best:
+                    best_moves.append((room, start, conflicts))
+            if not best_moves:
+                queue.insert(0, index)
+                continue
+            room, start, conflicts = self.random.choice(best_moves)
+            for other in conflicts:
+                other_room, other_start = self._placement[other]
+                self._remove(other)
+                tabu.append((other, other_room, other_start))
+                queue.insert(0, other)
+            del tabu[:-tabu_size]
+            self._place(index, room, start)
+            repairs += 1
+        return queue, repairs
+
+    def solve(self, time_limit=10.0):
+        started = time.monotonic()
+        deadline = started + time_limit
+        unplaced = [i for i, c in enumerate(self.classes) if not self._valid_starts(c)]
+        impossible = set(unplaced)
+        unplaced += [i for i in self._construct(deadline) if i not in impossible]
+        remaining, repairs = self._repair(
+            [i for i in unplaced if i not in impossible], deadline)
+        assignments = {}
+        for index, placement in enumerate(self._placement):
+            if placement is not None:
+                room, start = placement
+                assignments[self.classes[index].key] = (self.rooms[room], start)
+        unassigned = [self.classes[i].key for i in sorted(impossible | set(remaining))]
+        return TimetableResult(assignments, unassigned, time.monotonic() - started, repairs)
+
+
+def find_violations(classes, assignments):
+    """Pairs of class keys that share a room or teacher in some slot; empty
+    for a valid timetable."""
+    seen = {}
+    violations = set()
+    for clazz in classes:
+        placement = assignments.get(clazz.key)
+        if placement is None:
+            continue
+        room, start = placement
+        for day in clazz.weekdays:
+            for slot in range(start, start + clazz.duration):
+                keys = [('room', room, day, slot)]
+                if clazz.teacher is not None:
+                    keys.append(('teacher', clazz.teacher, day, slot))
+                for key in keys:
+                    other = seen.setdefault(key, clazz.key)
+                    if other != clazz.key:
+                        violations.add((other, clazz.key))
+    return violations
+
+
+def generate_instance(class_count, room_count, teacher_count, seed=0, slots_per_day=28):
+    """Random benchmark instance: (classes, rooms) with 1-3 meetings a week
+    of 60-180 minutes (in 30 minute slots). Teachers are drawn at random
+    but kept to at most half a day of teaching per weekday where possible."""
+    rng = random.Random(seed)
+    rooms = [f"R{number:03d}" for number in range(1, room_count + 1)]
+    daily_limit = slots_per_day // 2
+    load = [[0] * 7 for _ in range(teacher_count)]
+    classes = []
+    for key in range(class_count):
+        weekdays = tuple(sorted(rng.sample(range(6), rng.choice((1, 2, 2, 3)))))
+        duration = rng.choice((2, 3, 3, 4, 6))
+        for _ in range(20):
+            teacher = rng.randrange(teacher_count)
+            if all(load[teacher][day] + duration <= daily_limit for day in weekdays):
+                break
+        for day in weekdays:
+            load[teacher][day] += duration
+        classes.append(TimetableClass(key=key, duration=duration, weekdays=weekdays,
+                                      teacher=teacher))
+    return classes, rooms
+
+
+def build_problem(classes, grid, default_minutes=90):
+    """TimetableClass rows for Clazz objects, keeping their current room
+    and start time as preferences. Classes without meeting days are
+    skipped; classes without times get `default_minutes`."""
+    problem = []
+    for clazz in classes:
+        weekdays = tuple(day for day in range(7) if clazz.weekday_mask & (1 << day))
+        if not weekdays:
+            continue
+        if clazz.start_time and clazz.end_time and clazz.end_time > clazz.start_time:
+            preferred_start = grid.slot_of(clazz.start_time)
+            # Count from the slot boundary, so a 9:20 start still fits.
+            first = clazz.start_time if preferred_start is None else grid.time_of(preferred_start)
+            duration = grid.duration_of(first, clazz.end_time)
+        else:
+            duration = -(-default_minutes // grid.slot_minutes)
+            preferred_start = None
+        problem.append(TimetableClass(
+            key=clazz.pk, duration=duration, weekdays=weekdays, teacher=clazz.teacher_id,
+            preferred_room=clazz.room, preferred_start=preferred_start))
+    return problem
@@ -2,6 +2,7 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Clazz, Student, Teacher, Enrollment
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 
 
@@ -66,10 +67,17 @@ def class_detail(request, pk):
     return render(request, 'core/class_detail.html', context)
 
 
+# Reported when the student already has an enrollment for the class.
+EXISTING_ENROLLMENT_MESSAGES = {
+    'approved': (messages.WARNING, "You are already enrolled in this class."),
+    'pending': (messages.INFO, "You have already requested to enroll in this class. Please wait for approval."),
+    'waitlisted': (messages.INFO, "You are on the waitlist for this class. You will be enrolled when a seat frees up."),
+    'rejected': (messages.ERROR, "Your previous enrollment request for this class was rejected."),
+}
+
+
 @login_required
 def enroll_student(request, class_id):
-    clazz = get_object_or_404(Clazz, pk=class_id)
-
     # Check if user has a student profile
     try:
         student = request.user.student_profile
@@ -77,27 +85,29 @@ def enroll_student(request, class_id):
         messages.error(request, "Only students can enroll in classes.")
         return redirect('class_detail', pk=class_id)
 
-    # Check if already enrolled (or requested)
-    enrollment = Enrollment.objects.filter(
-        student=student, clazz=clazz).first()
-    if enrollment:
-        if enrollment.status == 'approved':
-            messages.warning(
-                request, "You are already enrolled in this class.")
-            return redirect('dashboard:student_dashboard')
-        elif enrollment.status == 'pending':
-            messages.info(
-                request, "You have already requested to enroll in this class. Please wait for approval.")
-            return redirect('dashboard:student_dashboard')
-        elif enrollment.status == 'rejected':
-            messages.error(
-                request, "Your previous enrollment request for this class was rejected.")
+    clazz = get_object_or_404(
+        Clazz.objects.only('class_name', 'capacity', 'seats_taken'), pk=class_id)
+    status = 'waitlisted' if clazz.is_full else 'pending'
+
+    # Insert first and let unique_together catch repeats, so double clicks
+    # cannot race past an existence check.
+    try:
+        with transaction.atomic():
+            Enrollment.objects.create(student=student, clazz=clazz, status=status)
+    except IntegrityError:
+        existing = Enrollment.objects.filter(
+            student=student, clazz=clazz).values_list('status', flat=True).first()
+        level, message = EXISTING_ENROLLMENT_MESSAGES.get(
+            existing, (messages.ERROR, "Could not send your enrollment request."))
+        messages.add_message(request, level, message)
         return redirect('class_detail', pk=class_id)
 
-    # Create enrollment request
-    Enrollment.objects.create(student=student, clazz=clazz, status='pending')
-    messages.success(
-        request, f"Enrollment request for {clazz.class_name} sent successfully! Please wait for admin approval.")
+    if status == 'waitlisted':
+        messages.info(
+            request, f"{clazz.class_name} is full, so you have been added to its waitlist.")
+    else:
+        messages.success(
+            request, f"Enrollment request for {clazz.class_name} sent successfully! Please wait for admin approval.")
     return redirect('dashboard:student_dashboard')
 
 
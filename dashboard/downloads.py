@@ -0,0 +1,128 @@
+"""
+Access-checked downloads of class materials and assignment submissions.
+
+The views check who is asking and then hand the byte transfer to the web
+server when PROTECTED_MEDIA_SERVER is set:
+
+- 'nginx' answers with an X-Accel-Redirect to PROTECTED_MEDIA_URL, which
+  nginx must serve from MEDIA_ROOT as an `internal` location.
+- 'sendfile' answers with an X-Sendfile header carrying the file's path
+  (Apache mod_xsendfile, lighttpd).
+
+Without it, Django streams the file itself with a FileResponse. Whole files
+go through the WSGI server's file wrapper, which uses sendfile() where the
+server supports it. Single byte ranges are answered with 206 responses, so
+video seeking and resumed downloads work in development too.
+"""
+import mimetypes
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import content_disposition_header
+from django.views.static import serve
+
+from core.models import Enrollment
+
+from .permissions import is_staff_user
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def can_view_class_files(user, clazz):
+    """Staff, the class's teacher and its approved students."""
+    if is_staff_user(user):
+        return True
+    if clazz.teacher_id is not None and clazz.teacher.user_id == user.pk:
+        return True
+    return Enrollment.objects.filter(
+        clazz=clazz, student__user=user, status='approved').exists()
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range, None when the
+    header should be ignored, or ValueError when it cannot be satisfied."""
+    match = _RANGE.match(header.strip()) if header else None
+    if match is None or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # "bytes=-500" is the last 500 bytes.
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class _RangeFile:
+    """Reads `length` bytes of `file` from `start`."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def serve_file(request, field_file, filename):
+    """Answers with the stored file behind `field_file`."""
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', '')
+    disposition = content_disposition_header(False, filename)
+    if server in ('nginx', 'sendfile'):
+        response = HttpResponse(
+            content_type=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        if server == 'nginx':
+            response['X-Accel-Redirect'] = (
+                settings.PROTECTED_MEDIA_URL + quote(field_file.name))
+        else:
+            response['X-Sendfile'] = field_file.path
+        response['Content-Disposition'] = disposition
+        response['Cache-Control'] = 'private'
+        return response
+
+    size = field_file.size
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = field_file.storage.open(field_file.name, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, filename=filename)
+    else:
+        start, end = byte_range
+        response = FileResponse(_RangeFile(file, start, end - start + 1),
+                                filename=filename, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = disposition
+    response['Cache-Control'] = 'private'
+    return response
+
+
+def serve_public_media(request, path):
+    """Development server for MEDIA_URL that refuses PROTECTED_MEDIA_DIRS.
+    The path is normalized first, so `./blobs/`, `//blobs/` or
+    `x/../blobs/` cannot reach them either."""
+    normalized = posixpath.normpath(path.replace('\\', '/')).lstrip('/')
+    first = normalized.split('/', 1)[0].lower()
+    if first in {d.lower() for d in settings.PROTECTED_MEDIA_DIRS}:
+        raise Http404("Protected files are served by the download views.")
+    return serve(request, normalized, document_root=settings.MEDIA_ROOT)
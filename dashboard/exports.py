@@ -0,0 +1,171 @@
+"""
+Streaming CSV/XLSX exports for class gradebooks, attendance and enrollment
+rosters, and ZIP archives of assignment submissions.
+
+Rows are read with `.values_list(...).iterator(chunk_size=...)` and CSV is
+written straight into a StreamingHttpResponse, so memory use stays flat and
+the download starts with the first chunk. XLSX needs openpyxl: its
+write-only workbook spools rows to a temporary file, which is then streamed
+back in blocks. ZIP archives are written by zipfile into an unseekable
+buffer that is emptied after every file block, so they stream the same way.
+"""
+import csv
+import os
+import tempfile
+import zipfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from django.utils.text import slugify
+
+from core.models import AssignmentSubmission, Attendance, Enrollment
+from .grades import GRADE_FIELDS, grade_label
+from .gradebook import openpyxl
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def available_formats():
+    return EXPORT_FORMATS if openpyxl else ('csv',)
+
+
+def _csv_response(rows, filename):
+    writer = csv.writer(_Echo())
+
+    def lines():
+        # BOM so Excel opens UTF-8 names correctly.
+        yield '\ufeff'
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(
+        lines(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def _xlsx_response(rows, filename, sheet_title):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    for row in rows:
+        sheet.append(row)
+    spool = tempfile.TemporaryFile()
+    workbook.save(spool)
+    spool.seek(0)
+    return FileResponse(spool, as_attachment=True, filename=f"{filename}.xlsx",
+                        content_type=XLSX_CONTENT_TYPE)
+
+
+def export_response(rows, filename, export_format='csv', sheet_title='Export'):
+    """Builds a download response for `rows` (an iterable of sequences,
+    header first). Raises ValueError for an unavailable format."""
+    if export_format not in available_formats():
+        raise ValueError(f"Export format '{export_format}' is not available.")
+    if export_format == 'xlsx':
+        return _xlsx_response(rows, filename, sheet_title)
+    return _csv_response(rows, filename)
+
+
+def gradebook_rows(clazz):
+    yield (['Student ID', 'Full Name', 'Email'] +
+           [grade_label(field) for field in GRADE_FIELDS] +
+           ['Overall Score', 'Passed'])
+    enrollments = Enrollment.objects.filter(
+        clazz=clazz, status='approved').with_overall_score().order_by(
+        'student__full_name').values_list(
+        'student_id', 'student__full_name', 'student__email',
+        *GRADE_FIELDS, 'overall_score', 'is_passed')
+    for row in enrollments.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        *values, overall, passed = row
+        yield values + [round(overall, 2), 'Yes' if passed else 'No']
+
+
+def attendance_rows(clazz):
+    yield ['Date', 'Student ID', 'Full Name', 'Status']
+    records = Attendance.objects.filter(enrollment__clazz=clazz).order_by(
+        'date', 'enrollment__student__full_name').values_list(
+        'date', 'enrollment__student_id', 'enrollment__student__full_name', 'status')
+    for date, student_id, full_name, status in records.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [date.isoformat(), student_id, full_name, status]
+
+
+def enrollment_rows(enrollments):
+    yield ['Enrollment ID', 'Student ID', 'Full Name', 'Email', 'Class ID',
+           'Class Name', 'Status', 'Paid', 'Enrollment Date']
+    records = enrollments.order_by('enrollment_id').values_list(
+        'enrollment_id', 'student_id', 'student__full_name', 'student__email',
+        'clazz_id', 'clazz__class_name', 'status', 'is_paid', 'enrollment_date')
+    for row in records.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        *values, is_paid, enrollment_date = row
+        yield values + ['Yes' if is_paid else 'No', enrollment_date.isoformat()]
+
+
+class _ZipBuffer:
+    """Unseekable file object for zipfile; take() hands back what was
+    written since the last call. Without seek(), zipfile writes sizes and
+    CRCs in data descriptors after each file instead of going back."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _submission_files(assignment):
+    """(archive name, field file) per submission, named after the student."""
+    submissions = (AssignmentSubmission.objects
+                   .filter(assignment=assignment).exclude(submission_file='')
+                   .select_related('student').order_by('student__full_name', 'pk'))
+    for submission in submissions.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        # A shared blob keeps the first uploader's name; use this upload's.
+        ext = os.path.splitext(submission.file_name)[1]
+        student = submission.student
+        name = f"{slugify(student.full_name) or 'student'}-{student.pk}{ext}"
+        yield name, submission.submission_file
+
+
+def _zip_stream(files):
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for name, field_file in files:
+            try:
+                source = field_file.storage.open(field_file.name, 'rb')
+            except FileNotFoundError:
+                continue
+            zip64 = source.size > zipfile.ZIP64_LIMIT
+            with source, archive.open(name, 'w', force_zip64=zip64) as entry:
+                for block in source.chunks():
+                    entry.write(block)
+                    yield buffer.take()
+    # The central directory, written on close.
+    yield buffer.take()
+
+
+def submissions_zip_response(assignment):
+    """Every submission of the assignment as one streamed ZIP, stored
+    without compression (the files are mostly PDFs, images and archives)."""
+    response = StreamingHttpResponse(
+        _zip_stream(_submission_files(assignment)), content_type='application/zip')
+    filename = f"{slugify(assignment.title) or 'assignment'}-submissions.zip"
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
@@ -1,4 +1,5 @@
 from django import forms
+from core.conflicts import find_conflicts, slot_for
 from core.models import Clazz, Teacher, Student, Admin, Enrollment, ClassType, Attendance, Material, Announcement, Assignment, AssignmentSubmission, Message, Feedback
 
 
@@ -12,7 +13,26 @@ class BootstrapFormMixin:
                 field.widget.attrs['class'] = 'form-input'
 
 
-class ClassForm(BootstrapFormMixin, forms.ModelForm):
+class ScheduleConflictMixin:
+    """Rejects a schedule that double-books the class's room or teacher."""
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        # The instance is only updated after clean(), so overlay the form data.
+        # Every model field the form edits counts, the teacher included.
+        clazz = Clazz(**{field.attname: getattr(self.instance, field.attname)
+                         for field in Clazz._meta.concrete_fields})
+        for field in Clazz._meta.concrete_fields:
+            if field.name in cleaned_data:
+                setattr(clazz, field.name, cleaned_data[field.name])
+        for conflict in find_conflicts(slot_for(clazz)):
+            self.add_error(None, conflict.message)
+        return cleaned_data
+
+
+class ClassForm(ScheduleConflictMixin, BootstrapFormMixin, forms.ModelForm):
     class Meta:
         model = Clazz
         fields = '__all__'
@@ -24,6 +44,13 @@ class ClassForm(BootstrapFormMixin, forms.ModelForm):
             'end_time': forms.TimeInput(attrs={'type': 'time'}),
         }
 
+    def clean_capacity(self):
+        capacity = self.cleaned_data.get('capacity')
+        if capacity is not None and capacity < self.instance.seats_taken:
+            raise forms.ValidationError(
+                f"{self.instance.seats_taken} students are already approved in this class.")
+        return capacity
+
 
 class TeacherForm(BootstrapFormMixin, forms.ModelForm):
     class Meta:
@@ -62,6 +89,13 @@ class EnrollmentForm(BootstrapFormMixin, forms.ModelForm):
             'enrollment_date': forms.DateInput(attrs={'type': 'date'}),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        clazz = cleaned_data.get('clazz')
+        if cleaned_data.get('status') == 'approved' and clazz and clazz.is_full:
+            self.add_error('clazz', f"{clazz.class_name} is full.")
+        return cleaned_data
+
 
 class ClassTypeForm(BootstrapFormMixin, forms.ModelForm):
     class Meta:
@@ -69,7 +103,7 @@ class ClassTypeForm(BootstrapFormMixin, forms.ModelForm):
         fields = '__all__'
 
 
-class ScheduleForm(BootstrapFormMixin, forms.ModelForm):
+class ScheduleForm(ScheduleConflictMixin, BootstrapFormMixin, forms.ModelForm):
     class Meta:
         model = Clazz
         fields = ['day_of_week', 'start_time', 'end_time']
@@ -177,3 +211,9 @@ class FeedbackForm(BootstrapFormMixin, forms.ModelForm):
             'teacher_rate': forms.NumberInput(attrs={'min': 1, 'max': 10}),
             'class_rate': forms.NumberInput(attrs={'min': 1, 'max': 10}),
         }
+
+
+class GradebookImportForm(BootstrapFormMixin, forms.Form):
+    file = forms.FileField(
+        label="Gradebook File",
+        help_text="CSV or XLSX with a student_id or email column and score columns.")
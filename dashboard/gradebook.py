@@ -0,0 +1,150 @@
+"""
+Gradebook import for a class.
+
+Uploaded CSV (or XLSX, when openpyxl is installed) files are read row by row,
+matched to the class's approved enrollments through an in-memory lookup
+built with one query, and validated with the GradeWriter. Blank cells keep
+the current score. Nothing is written unless every row is valid; the changes
+are then saved with one bulk_update.
+"""
+import codecs
+import csv
+import os
+import re
+import zipfile
+
+from .grades import GRADE_FIELDS, GradeWriter, grade_label
+
+try:
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+except ImportError:  # XLSX support is optional
+    openpyxl = None
+    InvalidFileException = zipfile.BadZipFile
+
+# Errors beyond this are summarised instead of listed one by one.
+MAX_REPORTED_ERRORS = 50
+
+
+class GradebookError(Exception):
+    """The uploaded file cannot be read as a gradebook."""
+
+
+def _normalize_header(value):
+    return re.sub(r'[^a-z0-9]', '', str(value or '').lower())
+
+
+# Accepts both field names ("final_test") and labels ("Final Test").
+HEADER_ALIASES = {'studentid': 'student_id', 'id': 'student_id',
+                  'email': 'email', 'emailaddress': 'email'}
+for _field in GRADE_FIELDS:
+    HEADER_ALIASES[_normalize_header(_field)] = _field
+    HEADER_ALIASES[_normalize_header(grade_label(_field))] = _field
+
+
+def supported_extensions():
+    return ('.csv', '.xlsx') if openpyxl else ('.csv',)
+
+
+def _iter_csv(uploaded_file):
+    # File iteration yields one line at a time, even for spooled uploads.
+    yield from csv.reader(codecs.iterdecode(uploaded_file, 'utf-8-sig'))
+
+
+def _iter_xlsx(uploaded_file):
+    workbook = openpyxl.load_workbook(
+        uploaded_file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _checked_rows(rows):
+    """Turns errors from reading the file into GradebookErrors."""
+    try:
+        yield from rows
+    except UnicodeDecodeError:
+        raise GradebookError(
+            "The CSV file is not UTF-8 encoded. Save it as \"CSV UTF-8\" and upload it again.")
+    except csv.Error as e:
+        raise GradebookError(f"The CSV file could not be read: {e}.")
+    except (zipfile.BadZipFile, InvalidFileException):
+        raise GradebookError("The file is not a valid XLSX workbook.")
+
+
+def read_gradebook_rows(uploaded_file):
+    """Yields (row_number, {column: value}) for each data row of the file."""
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    if extension not in supported_extensions():
+        raise GradebookError(
+            f"Unsupported file type '{extension}'. Upload a "
+            f"{' or '.join(ext.lstrip('.').upper() for ext in supported_extensions())} file.")
+    rows = _checked_rows(_iter_xlsx(uploaded_file) if extension == '.xlsx'
+                         else _iter_csv(uploaded_file))
+
+    header = next(rows, None)
+    if header is None:
+        raise GradebookError("The uploaded file is empty.")
+    columns = [HEADER_ALIASES.get(_normalize_header(name)) for name in header]
+    if 'student_id' not in columns and 'email' not in columns:
+        raise GradebookError(
+            "The file needs a 'student_id' or 'email' column.")
+    if not any(column in GRADE_FIELDS for column in columns):
+        raise GradebookError("The file has no score columns.")
+
+    for row_number, values in enumerate(rows, start=2):
+        row = {column: value for column, value in zip(columns, values)
+               if column is not None}
+        if not any(str(value).strip() for value in row.values() if value is not None):
+            continue
+        yield row_number, row
+
+
+def import_gradebook(clazz, uploaded_file):
+    """Stages the grades from `uploaded_file` for `clazz`.
+
+    Returns a GradeWriter; the caller checks its errors and saves it.
+    """
+    by_id = {}
+    by_email = {}
+    for enrollment in clazz.enrollments.filter(
+            status='approved').select_related('student'):
+        by_id[str(enrollment.student_id)] = enrollment
+        if enrollment.student.email:
+            by_email[enrollment.student.email.strip().lower()] = enrollment
+
+    writer = GradeWriter()
+    seen = set()
+    for row_number, row in read_gradebook_rows(uploaded_file):
+        student_id = _cell_text(row.get('student_id'))
+        email = _cell_text(row.get('email')).lower()
+        enrollment = by_id.get(student_id) if student_id else None
+        if enrollment is None and email:
+            enrollment = by_email.get(email)
+        if enrollment is None:
+            writer.errors.append(
+                f"Row {row_number}: no approved student matches "
+                f"'{student_id or email or '(blank)'}'.")
+            continue
+        if enrollment.pk in seen:
+            writer.errors.append(
+                f"Row {row_number}: {enrollment.student.full_name} appears more than once.")
+            continue
+        seen.add(enrollment.pk)
+
+        # Blank cells leave the existing score untouched.
+        scores = {field: row[field] for field in GRADE_FIELDS
+                  if _cell_text(row.get(field))}
+        writer.stage(enrollment, scores,
+                     label=f"Row {row_number} ({enrollment.student.full_name})")
+    return writer
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheet ids come back as floats, e.g. 12.0
+        value = int(value)
+    return str(value).strip()
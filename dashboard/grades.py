@@ -0,0 +1,126 @@
+"""
+Diff-based grade writing for enrollments.
+
+Submitted scores are validated and compared with the values already loaded,
+so only enrollments whose scores actually changed are written, in a single
+`bulk_update` that touches only the changed columns.
+"""
+from django.utils import timezone
+
+from core.models import Enrollment
+
+GRADE_FIELDS = ('minitest1', 'minitest2', 'minitest3',
+                'minitest4', 'midterm', 'final_test')
+MIN_SCORE = 0.0
+MAX_SCORE = 10.0
+
+
+def grade_label(field_name):
+    return str(Enrollment._meta.get_field(field_name).verbose_name)
+
+
+def parse_score(raw):
+    """Returns a score as a float, or None for an empty value.
+
+    Raises ValueError with a readable message for anything else that is not a
+    number between MIN_SCORE and MAX_SCORE.
+    """
+    if raw is None:
+        return None
+    raw = str(raw).strip()
+    if raw == '':
+        return None
+    try:
+        score = float(raw)
+    except ValueError:
+        raise ValueError(f"'{raw}' is not a number")
+    if not MIN_SCORE <= score <= MAX_SCORE:
+        raise ValueError(
+            f"{raw} is outside the {MIN_SCORE:g}-{MAX_SCORE:g} range")
+    return score
+
+
+class GradeWriter:
+    """Collects grade changes for many enrollments and saves them at once."""
+
+    def __init__(self):
+        # enrollment pk -> (enrollment, {field: (old, new)})
+        self.changes = {}
+        self.errors = []
+
+    def stage(self, enrollment, raw_scores, label=None):
+        """Validates `raw_scores` and records the fields that differ.
+
+        `raw_scores` maps grade field names to submitted values; fields that
+        are missing are left untouched and an empty value clears the score.
+        Nothing is staged for an enrollment with an invalid value. Returns
+        True if the row was valid.
+        """
+        label = label or enrollment.student.full_name
+        parsed = {}
+        row_errors = []
+        for field in GRADE_FIELDS:
+            if field not in raw_scores:
+                continue
+            try:
+                parsed[field] = parse_score(raw_scores[field])
+            except ValueError as e:
+                row_errors.append(f"{label}: {grade_label(field)} {e}.")
+        if row_errors:
+            self.errors.extend(row_errors)
+            return False
+
+        diff = {}
+        for field, new in parsed.items():
+            old = getattr(enrollment, field)
+            if old != new:
+                diff[field] = (old, new)
+                setattr(enrollment, field, new)
+        if diff:
+            _, staged = self.changes.setdefault(
+                enrollment.pk, (enrollment, {}))
+            staged.update(diff)
+        return True
+
+    @property
+    def changed_fields(self):
+        changed = set()
+        for _, diff in self.changes.values():
+            changed.update(diff)
+        return [field for field in GRADE_FIELDS if field in changed]
+
+    @property
+    def changed_scores_count(self):
+        return sum(len(diff) for _, diff in self.changes.values())
+
+    def save(self):
+        """Writes all staged changes. Returns the number of enrollments
+        updated; nothing is written while there are validation errors."""
+        if self.errors or not self.changes:
+            return 0
+        now = timezone.now()
+        enrollments = []
+        for enrollment, _ in self.changes.values():
+            # bulk_update() bypasses auto_now, so stamp it ourselves.
+            enrollment.updated_at = now
+            enrollments.append(enrollment)
+        Enrollment.objects.bulk_update(
+            enrollments, self.changed_fields + ['updated_at'])
+        return len(enrollments)
+
+    def summary(self, limit=5):
+        """Short human readable description of the staged changes."""
+        parts = []
+        for enrollment, diff in list(self.changes.values())[:limit]:
+            fields = ", ".join(
+                f"{grade_label(field)} {_format_score(old)} → {_format_score(new)}"
+                for field, (old, new) in diff.items())
+            parts.append(f"{enrollment.student.full_name} ({fields})")
+        remaining = len(self.changes) - limit
+        if remaining > 0:
+            parts.append(f"and {remaining} more")
+        return "; ".join(parts)
+
+
+def _format_score(score):
+    return "-" if score is None else f"{score:g}"
@@ -0,0 +1,97 @@
+"""
+In-process live attendance counters for QR attendance sessions.
+
+`student_qr_scan_view` records check-ins here and the teacher's QR screen
+listens through `teacher_qr_live_view`, so the present/total numbers update
+without the page re-running its queries. Counters live in the memory of the
+current process: with several workers, a stream only sees check-ins handled
+by its own worker, and a counter missing after a restart is seeded again from
+the database by the first stream that asks for it.
+"""
+import asyncio
+import threading
+
+_counters = {}
+_lock = threading.Lock()
+
+
+class SessionCounter:
+    def __init__(self, total, present_ids=()):
+        self.total = total
+        self.present_ids = set(present_ids)
+        self.closed = False
+        self.version = 0
+        self._waiters = set()
+
+    def snapshot(self):
+        with _lock:
+            return {
+                'present': len(self.present_ids),
+                'total': self.total,
+                'closed': self.closed,
+                'version': self.version,
+            }
+
+    def _changed(self):
+        # Must be called with _lock held.
+        self.version += 1
+        for loop, event in list(self._waiters):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The listener's event loop is already closed.
+                self._waiters.discard((loop, event))
+
+
+def get_counter(session_id):
+    return _counters.get(session_id)
+
+
+def open_session(session_id, total, present_ids=()):
+    """Registers a counter for a session, keeping any existing one."""
+    with _lock:
+        counter = _counters.get(session_id)
+        if counter is None:
+            counter = SessionCounter(total, present_ids)
+            _counters[session_id] = counter
+        return counter
+
+
+def mark_present(session_id, enrollment_id):
+    """Counts a check-in. Repeated scans by the same student count once."""
+    with _lock:
+        counter = _counters.get(session_id)
+        if counter is None or enrollment_id in counter.present_ids:
+            return
+        counter.present_ids.add(enrollment_id)
+        counter._changed()
+
+
+def close_session(session_id):
+    """Marks a session as stopped and wakes its listeners so streams end."""
+    with _lock:
+        counter = _counters.pop(session_id, None)
+        if counter is None:
+            return
+        counter.closed = True
+        counter._changed()
+
+
+async def wait_for_change(counter, seen_version, timeout):
+    """Waits until the counter moves past `seen_version`.
+
+    Returns False if nothing changed within `timeout` seconds.
+    """
+    waiter = (asyncio.get_running_loop(), asyncio.Event())
+    with _lock:
+        if counter.version != seen_version:
+            return True
+        counter._waiters.add(waiter)
+    try:
+        await asyncio.wait_for(waiter[1].wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        with _lock:
+            counter._waiters.discard(waiter)
@@ -0,0 +1,8 @@
+def is_staff_user(user):
+    # Check if user has admin profile OR is superuser
+    if user.is_superuser:
+        return True
+    try:
+        return hasattr(user, 'admin_profile')
+    except:
+        return False
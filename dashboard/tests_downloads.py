@@ -0,0 +1,121 @@
+import datetime
+import io
+import os
+import zipfile
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from core.models import Admin, AssignmentSubmission, Enrollment, Material
+from core.testing import TemporaryMediaMixin, make_assignment, make_class, make_student, make_teacher
+from dashboard.downloads import parse_range, serve_public_media
+
+
+@override_settings(PROTECTED_MEDIA_SERVER='')
+class ProtectedDownloadTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        teacher = make_teacher()
+        self.teacher_user = teacher.user
+        clazz = make_class(teacher)
+        self.students = [make_student(f'student{i}', f"Student {i}") for i in range(2)]
+        Enrollment.objects.create(student=self.students[0], clazz=clazz, status='approved')
+        self.content = b'0123456789' * 10
+        self.material = Material.objects.create(
+            clazz=clazz, title="Slides", file=SimpleUploadedFile('slides.pdf', self.content))
+        assignment = make_assignment(clazz)
+        self.submission = AssignmentSubmission.objects.create(
+            assignment=assignment, student=self.students[0],
+            submission_file=SimpleUploadedFile('essay.pdf', b'essay'))
+        self.material_url = reverse('dashboard:download_material', args=[self.material.pk])
+        self.submission_url = reverse('dashboard:download_submission', args=[self.submission.pk])
+
+    def get(self, user, url, **headers):
+        self.client.force_login(user)
+        return self.client.get(url, headers=headers)
+
+    def test_enrolled_student_downloads_material(self):
+        response = self.get(self.students[0].user, self.material_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('slides.pdf', response['Content-Disposition'])
+
+    def test_duplicate_content_is_downloaded_under_its_own_name(self):
+        copy = Material.objects.create(
+            clazz=self.material.clazz, title="Copy",
+            file=SimpleUploadedFile('handout.pdf', self.content))
+        self.assertEqual(copy.file.name, self.material.file.name)
+        response = self.get(self.students[0].user,
+                            reverse('dashboard:download_material', args=[copy.pk]))
+        self.assertIn('handout.pdf', response['Content-Disposition'])
+        self.assertNotIn('slides.pdf', response['Content-Disposition'])
+
+    def test_staff_with_an_admin_profile_download(self):
+        user = User.objects.create_user(username='office', password='password')
+        Admin.objects.create(user=user, full_name="Office Staff", dob=datetime.date(1990, 1, 1),
+                             phone_number="0123456789", email="office@example.com", address="HQ")
+        self.assertFalse(user.is_staff)
+        self.assertEqual(self.get(user, self.material_url).status_code, 200)
+        self.assertEqual(self.get(user, self.submission_url).status_code, 200)
+
+    def test_access_is_checked(self):
+        outsider = self.students[1].user
+        self.assertEqual(self.get(outsider, self.material_url).status_code, 404)
+        self.assertEqual(self.get(outsider, self.submission_url).status_code, 404)
+        self.assertEqual(self.get(self.teacher_user, self.submission_url).status_code, 200)
+
+    def test_range_requests(self):
+        student = self.students[0].user
+        response = self.get(student, self.material_url, Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+        response = self.get(student, self.material_url, Range='bytes=200-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */100'))
+
+    def test_public_media_refuses_protected_folders(self):
+        os.makedirs(os.path.join(self.media_root, 'class_images'), exist_ok=True)
+        with open(os.path.join(self.media_root, 'class_images', 'cover.png'), 'wb') as f:
+            f.write(b'png')
+        request = RequestFactory().get('/media/')
+        response = serve_public_media(request, 'x/../class_images/cover.png')
+        self.assertEqual(b''.join(response.streaming_content), b'png')
+
+        blob = self.material.file.name
+        for path in (blob, f'./{blob}', f'/{blob}', f'x/../{blob}', blob.upper(),
+                     blob.replace('/', '\\')):
+            with self.assertRaises(Http404, msg=path):
+                serve_public_media(request, path)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=-30', 100), (70, 99))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+        # Multiple ranges are answered with the whole file.
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+
+    @override_settings(PROTECTED_MEDIA_SERVER='nginx')
+    def test_nginx_serves_the_bytes(self):
+        response = self.get(self.students[0].user, self.material_url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.material.file.name)
+        self.assertEqual(response.content, b'')
+
+    def test_teacher_downloads_all_submissions_as_zip(self):
+        # Same content as the first submission, so it shares that blob.
+        AssignmentSubmission.objects.create(
+            assignment=self.submission.assignment, student=self.students[1],
+            submission_file=SimpleUploadedFile('notes.txt', b'essay'))
+        url = reverse('dashboard:teacher_download_submissions',
+                      args=[self.submission.assignment_id])
+        response = self.get(self.teacher_user, url)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        first, second = self.students
+        self.assertEqual(archive.namelist(), [f'student-0-{first.pk}.pdf', f'student-1-{second.pk}.txt'])
+        self.assertEqual(archive.read(f'student-0-{first.pk}.pdf'), b'essay')
+        self.assertEqual(archive.read(f'student-1-{second.pk}.txt'), b'essay')
+
+        self.assertRedirects(self.get(first.user, url), reverse('home'), fetch_redirect_response=False)
@@ -0,0 +1,300 @@
+import datetime
+import io
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from django.contrib.auth.models import User
+from core.assignments import assignment_progress
+from core.models import Assignment, AssignmentSubmission, Student, Clazz, ClassType, Enrollment, Teacher
+from dashboard.gradebook import openpyxl
+from dashboard.grades import GradeWriter, parse_score
+
+
+class GradeWriterTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin_user)
+
+        class_type = ClassType.objects.create(
+            code="MATH", description="Math class")
+        teacher = Teacher.objects.create(
+            full_name="Test Teacher", dob=datetime.date(1980, 1, 1),
+            email="teacher@example.com")
+        self.clazz = Clazz.objects.create(
+            class_name="Math 101", class_type=class_type, teacher=teacher,
+            room="101", price=100.00, start_date=datetime.date.today(),
+            end_date=datetime.date.today())
+        self.enrollments = []
+        for i in range(3):
+            student = Student.objects.create(
+                full_name=f"Student {i}", dob=datetime.date(2000, 1, 1),
+                email=f"student{i}@example.com")
+            self.enrollments.append(Enrollment.objects.create(
+                student=student, clazz=self.clazz, status='approved',
+                midterm=5.0))
+
+    def post_data(self, overrides=None):
+        data = {}
+        for enrollment in self.enrollments:
+            data[f'midterm_{enrollment.pk}'] = '5.0'
+            data[f'final_test_{enrollment.pk}'] = ''
+        data.update(overrides or {})
+        return data
+
+    def test_parse_score(self):
+        self.assertIsNone(parse_score(''))
+        self.assertEqual(parse_score(' 7.5 '), 7.5)
+        with self.assertRaises(ValueError):
+            parse_score('11')
+        with self.assertRaises(ValueError):
+            parse_score('abc')
+
+    def test_only_changed_enrollments_are_written(self):
+        changed = self.enrollments[1]
+        untouched_stamp = self.enrollments[0].updated_at
+
+        with self.assertNumQueries(1):
+            writer = GradeWriter()
+            for enrollment in self.enrollments:
+                writer.stage(enrollment, {'midterm': '5.0'})
+            writer.stage(changed, {'midterm': '8', 'final_test': '9'})
+            self.assertEqual(writer.save(), 1)
+
+        self.assertEqual(writer.changed_fields, ['midterm', 'final_test'])
+        changed.refresh_from_db()
+        self.assertEqual((changed.midterm, changed.final_test), (8.0, 9.0))
+        self.enrollments[0].refresh_from_db()
+        self.assertEqual(self.enrollments[0].updated_at, untouched_stamp)
+
+    def test_view_saves_changes(self):
+        target = self.enrollments[2]
+        response = self.client.post(
+            reverse('dashboard:enter_grades', args=[self.clazz.pk]),
+            self.post_data({f'final_test_{target.pk}': '6.5'}))
+        self.assertRedirects(
+            response, reverse('dashboard:enter_grades', args=[self.clazz.pk]))
+        target.refresh_from_db()
+        self.assertEqual(target.final_test, 6.5)
+
+    def test_view_rejects_out_of_range_scores(self):
+        target = self.enrollments[0]
+        response = self.client.post(
+            reverse('dashboard:enter_grades', args=[self.clazz.pk]),
+            self.post_data({
+                f'midterm_{target.pk}': '12',
+                f'final_test_{self.enrollments[1].pk}': '7',
+            }))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Enrollment.objects.filter(
+            final_test__isnull=False).exists())
+        target.refresh_from_db()
+        self.assertEqual(target.midterm, 5.0)
+
+    def upload(self, content, name='grades.csv'):
+        return self.client.post(
+            reverse('dashboard:import_grades', args=[self.clazz.pk]),
+            {'file': SimpleUploadedFile(name, content.encode('utf-8'))})
+
+    def test_import_matches_by_id_and_email(self):
+        first, second, third = self.enrollments
+        self.upload(
+            "Student ID,Email,Final Test,Midterm\n"
+            f"{first.student_id},,9,\n"
+            f",{second.student.email.upper()},7.5,6\n")
+        first.refresh_from_db()
+        second.refresh_from_db()
+        third.refresh_from_db()
+        self.assertEqual((first.final_test, first.midterm), (9.0, 5.0))
+        self.assertEqual((second.final_test, second.midterm), (7.5, 6.0))
+        self.assertIsNone(third.final_test)
+
+    def test_import_with_errors_writes_nothing(self):
+        first = self.enrollments[0]
+        response = self.upload(
+            "student_id,final_test\n"
+            f"{first.student_id},9\n"
+            "99999,8\n"
+            f"{self.enrollments[1].student_id},15\n")
+        first.refresh_from_db()
+        self.assertIsNone(first.final_test)
+        errors = [str(m) for m in response.wsgi_request._messages]
+        self.assertTrue(any('Row 3' in e for e in errors))
+        self.assertTrue(any('Row 4' in e for e in errors))
+
+    def assert_import_fails(self, response, message):
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(message, [str(m) for m in response.wsgi_request._messages])
+        self.assertFalse(Enrollment.objects.filter(final_test__isnull=False).exists())
+
+    def test_import_rejects_non_utf8_csv(self):
+        content = f"student_id,final_test,full_name\n{self.enrollments[0].student_id},9,Zoë Müller\n"
+        response = self.client.post(
+            reverse('dashboard:import_grades', args=[self.clazz.pk]),
+            {'file': SimpleUploadedFile('grades.csv', content.encode("cp1252"))})
+        self.assert_import_fails(
+            response, 'The CSV file is not UTF-8 encoded. Save it as "CSV UTF-8" and upload it again.')
+
+    @skipUnless(openpyxl, "openpyxl is not installed")
+    def test_import_reads_xlsx(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(['Student ID', 'Final Test'])
+        workbook.active.append([self.enrollments[0].student_id, 8.5])
+        content = io.BytesIO()
+        workbook.save(content)
+        self.client.post(
+            reverse('dashboard:import_grades', args=[self.clazz.pk]),
+            {'file': SimpleUploadedFile('grades.xlsx', content.getvalue())})
+        self.enrollments[0].refresh_from_db()
+        self.assertEqual(self.enrollments[0].final_test, 8.5)
+
+    @skipUnless(openpyxl, "openpyxl is not installed")
+    def test_import_rejects_a_fake_xlsx(self):
+        response = self.upload("student_id,final_test\n1,9\n", name='grades.xlsx')
+        self.assert_import_fails(response, "The file is not a valid XLSX workbook.")
+
+    def test_export_round_trips_through_import(self):
+        response = self.client.get(
+            reverse('dashboard:export_grades', args=[self.clazz.pk]))
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        lines = content.splitlines()
+        self.assertTrue(lines[0].startswith('Student ID,Full Name,Email'))
+        self.assertEqual(len(lines), 4)
+
+        edited = content.replace(',5.0,', ',6.0,', 1)
+        self.upload(edited)
+        self.assertEqual(
+            Enrollment.objects.filter(midterm=6.0).count(), 1)
+
+
+class AssignmentGradingTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='teacher', password='password')
+        teacher = Teacher.objects.create(
+            user=user, full_name="Test Teacher", dob=datetime.date(1980, 1, 1),
+            email="teacher@example.com")
+        self.clazz = Clazz.objects.create(
+            class_name="Math 101", class_type=ClassType.objects.create(code="MATH"),
+            teacher=teacher, room="101", price=100.00, start_date=datetime.date.today(),
+            end_date=datetime.date.today())
+        self.assignment = Assignment.objects.create(
+            title="Homework 1", description="Exercises", due_date=timezone.now(), clazz=self.clazz)
+        self.submissions = self.add_students(3)
+        self.client.force_login(user)
+        self.teacher = teacher
+        cache.clear()
+
+    def add_students(self, count):
+        submissions = []
+        start = Student.objects.count()
+        for i in range(start, start + count):
+            student = Student.objects.create(
+                full_name=f"Student {i}", dob=datetime.date(2000, 1, 1),
+                email=f"student{i}@example.com")
+            Enrollment.objects.create(student=student, clazz=self.clazz, status='approved')
+            submissions.append(AssignmentSubmission.objects.create(
+                assignment=self.assignment, student=student, submission_file='homework.pdf'))
+        return submissions
+
+    def page_queries(self):
+        url = reverse('dashboard:teacher_assignment_submissions', args=[self.assignment.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_page_queries_do_not_grow_with_the_class(self):
+        small = self.page_queries()
+        self.add_students(10)
+        self.assertEqual(self.page_queries(), small)
+
+    def test_bulk_grading_saves_changed_grades(self):
+        first, second, third = self.submissions
+        second.grade = 6.0
+        second.save()
+        response = self.client.post(
+            reverse('dashboard:teacher_bulk_grade', args=[self.assignment.pk]),
+            {f'grade_{first.pk}': '8.5', f'grade_{second.pk}': '6', f'grade_{third.pk}': ''})
+        self.assertRedirects(response, reverse(
+            'dashboard:teacher_assignment_submissions', args=[self.assignment.pk]))
+        self.assertEqual([str(m) for m in response.wsgi_request._messages], ["Saved 1 grade(s)."])
+        first.refresh_from_db()
+        self.assertEqual(first.grade, 8.5)
+
+    def test_bulk_grading_with_an_invalid_grade_saves_nothing(self):
+        first, second, _ = self.submissions
+        self.client.post(
+            reverse('dashboard:teacher_bulk_grade', args=[self.assignment.pk]),
+            {f'grade_{first.pk}': '8', f'grade_{second.pk}': '12'})
+        first.refresh_from_db()
+        self.assertIsNone(first.grade)
+
+    def test_grading_one_submission(self):
+        submission = self.submissions[0]
+        self.client.post(
+            reverse('dashboard:teacher_assignment_submissions', args=[self.assignment.pk]),
+            {'submission_pk': submission.pk, 'grade': '7', 'feedback': 'Good work'})
+        submission.refresh_from_db()
+        self.assertEqual((submission.grade, submission.feedback), (7.0, 'Good work'))
+
+    def test_progress_counts(self):
+        first, second, _ = self.submissions
+        first.grade = 9.0
+        first.save()
+        due = timezone.now() + datetime.timedelta(days=1)
+        Assignment.objects.filter(pk=self.assignment.pk).update(due_date=due)
+        AssignmentSubmission.objects.filter(pk=second.pk).update(
+            submitted_at=due + datetime.timedelta(hours=1))
+        absent = Student.objects.create(
+            full_name="Absent", dob=datetime.date(2000, 1, 1), email="absent@example.com")
+        Enrollment.objects.create(student=absent, clazz=self.clazz, status='approved')
+        Enrollment.objects.create(
+            student=Student.objects.create(full_name="Pending", dob=datetime.date(2000, 1, 1)),
+            clazz=self.clazz, status='pending')
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            [progress] = assignment_progress(self.teacher)
+        self.assertEqual(
+            (progress.submitted_count, progress.graded_count,
+             progress.late_count, progress.missing_count),
+            (3, 1, 1, 1))
+
+    def test_progress_is_cached_until_a_submission_changes(self):
+        assignment_progress(self.teacher)
+        with self.assertNumQueries(0):
+            assignment_progress(self.teacher)
+
+        self.client.post(
+            reverse('dashboard:teacher_bulk_grade', args=[self.assignment.pk]),
+            {f'grade_{self.submissions[0].pk}': '8'})
+        self.assertEqual(assignment_progress(self.teacher)[0].graded_count, 1)
+
+        self.submissions[1].grade = 7.0
+        self.submissions[1].save()
+        self.assertEqual(assignment_progress(self.teacher)[0].graded_count, 2)
+
+    def test_progress_follows_class_renames_and_moved_assignments(self):
+        assignment_progress(self.teacher)
+        self.clazz.class_name = "Math 102"
+        self.clazz.save()
+        self.assertEqual(assignment_progress(self.teacher)[0].clazz.class_name, "Math 102")
+
+        other_teacher = Teacher.objects.create(
+            full_name="Other Teacher", dob=datetime.date(1980, 1, 1), email="other@example.com")
+        other_class = Clazz.objects.create(
+            class_name="Physics 101", class_type=self.clazz.class_type, teacher=other_teacher,
+            room="102", price=100.00, start_date=datetime.date.today(),
+            end_date=datetime.date.today())
+        assignment_progress(other_teacher)
+        assignment = Assignment.objects.get(pk=self.assignment.pk)
+        assignment.clazz = other_class
+        assignment.save()
+        self.assertEqual(assignment_progress(self.teacher), [])
+        self.assertEqual([a.pk for a in assignment_progress(other_teacher)], [self.assignment.pk])
@@ -0,0 +1,92 @@
+import asyncio
+import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from core.models import (
+    Student, Clazz, ClassType, Enrollment, Teacher, AttendanceSession
+)
+from dashboard import live_attendance
+
+
+class LiveAttendanceCounterTests(TestCase):
+    def tearDown(self):
+        live_attendance.close_session(1)
+
+    def test_repeated_scans_count_once(self):
+        counter = live_attendance.open_session(1, total=3)
+        live_attendance.mark_present(1, 10)
+        live_attendance.mark_present(1, 10)
+        live_attendance.mark_present(1, 11)
+        snapshot = counter.snapshot()
+        self.assertEqual(snapshot['present'], 2)
+        self.assertEqual(snapshot['total'], 3)
+
+    def test_waiter_wakes_on_check_in(self):
+        counter = live_attendance.open_session(1, total=1)
+
+        async def scan_later():
+            await asyncio.sleep(0.01)
+            live_attendance.mark_present(1, 10)
+
+        async def wait():
+            task = asyncio.ensure_future(scan_later())
+            changed = await live_attendance.wait_for_change(
+                counter, counter.version, timeout=5)
+            await task
+            return changed
+
+        self.assertTrue(asyncio.run(wait()))
+
+    def test_close_session_ends_counter(self):
+        counter = live_attendance.open_session(1, total=1)
+        live_attendance.close_session(1)
+        self.assertTrue(counter.snapshot()['closed'])
+        self.assertIsNone(live_attendance.get_counter(1))
+
+
+class QRScanLiveCounterTests(TestCase):
+    def setUp(self):
+        self.class_type = ClassType.objects.create(
+            code="MATH", description="Math class")
+        self.teacher = Teacher.objects.create(
+            full_name="Test Teacher", dob=datetime.date(1980, 1, 1),
+            email="teacher@example.com")
+        self.clazz = Clazz.objects.create(
+            class_name="Math 101", class_type=self.class_type,
+            teacher=self.teacher, room="101", price=100.00,
+            start_date=datetime.date.today(), end_date=datetime.date.today())
+        self.user = User.objects.create_user('student', password='password')
+        self.student = Student.objects.create(
+            user=self.user, full_name="Test Student",
+            dob=datetime.date(2000, 1, 1), email="student@example.com")
+        self.enrollment = Enrollment.objects.create(
+            student=self.student, clazz=self.clazz, status='approved')
+        self.session = AttendanceSession.objects.create(
+            clazz=self.clazz, token='abc', passcode='1234')
+
+    def tearDown(self):
+        live_attendance.close_session(self.session.pk)
+
+    def test_scan_updates_counter(self):
+        counter = live_attendance.open_session(self.session.pk, total=1)
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('dashboard:student_qr_scan', args=['abc']),
+            {'passcode': '1234'})
+        self.assertEqual(counter.snapshot()['present'], 1)
+
+    async def test_stream_reports_stopped_session(self):
+        teacher_user = await User.objects.acreate(username='teacher')
+        self.teacher.user = teacher_user
+        await self.teacher.asave()
+        self.session.is_active = False
+        await self.session.asave()
+
+        await self.async_client.aforce_login(teacher_user)
+        response = await self.async_client.get(
+            reverse('dashboard:teacher_qr_live', args=[self.session.pk]))
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertIn(b'"total": 1', body)
+        self.assertIn(b'"closed": true', body)
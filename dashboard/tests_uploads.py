@@ -0,0 +1,128 @@
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.test import TestCase
+from django.urls import reverse
+from core.models import AssignmentSubmission, Enrollment, Material, StoredBlob, UploadSession
+from core.testing import TemporaryMediaMixin, make_assignment, make_class, make_student, make_teacher
+from dashboard import uploads
+
+
+class ChunkedUploadTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        teacher = make_teacher()
+        self.clazz = make_class(teacher)
+        self.assignment = make_assignment(self.clazz)
+        student = make_student('student')
+        Enrollment.objects.create(student=student, clazz=self.clazz, status='approved')
+        self.teacher_user, self.student_user = teacher.user, student.user
+        # Two full chunks and a short one.
+        self.content = bytes(range(256)) * 8 * 5
+        self.chunk_size = 4096
+
+    def start(self, user=None, purpose='submission', **extra):
+        self.client.force_login(user or self.student_user)
+        target = self.assignment.pk if purpose == 'submission' else self.clazz.pk
+        data = {'purpose': purpose, 'target': target, 'filename': 'essay.pdf',
+                'size': len(self.content), **extra}
+        response = self.client.post(reverse('dashboard:upload_start'), data)
+        if response.status_code == 201:
+            # Small chunks keep the test fast.
+            UploadSession.objects.update(chunk_size=self.chunk_size)
+        return response
+
+    def send(self, state, offset, data=None, **headers):
+        if data is None:
+            data = self.content[offset:offset + self.chunk_size]
+        return self.client.post(f"{state['chunk_url']}?offset={offset}", data,
+                                content_type='application/octet-stream', headers=headers)
+
+    def test_resumable_submission(self):
+        state = self.start(checksum=hashlib.sha256(self.content).hexdigest()).json()
+
+        self.assertEqual(self.send(state, 0).json()['offset'], 4096)
+        # A retried chunk is refused with the offset to resume from.
+        retried = self.send(state, 0)
+        self.assertEqual((retried.status_code, retried.json()['offset']), (409, 4096))
+        self.assertEqual(self.client.get(state['status_url']).json()['offset'], 4096)
+
+        self.send(state, 4096)
+        chunk = self.content[8192:]
+        self.send(state, 8192, chunk, X_Chunk_SHA256=hashlib.sha256(chunk).hexdigest())
+        response = self.client.post(state['complete_url'])
+        self.assertEqual(response.status_code, 200)
+
+        submission = AssignmentSubmission.objects.get()
+        with submission.submission_file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(submission.file_name, 'essay.pdf')
+        chunk_names = UploadSession.objects.get().chunk_names
+        self.assertEqual(len(chunk_names), 3)
+        self.assertFalse(any(default_storage.exists(name) for name in chunk_names))
+
+    def test_duplicate_chunk_leaves_the_stored_chunk_alone(self):
+        self.start()
+        upload = UploadSession.objects.get()
+        stale = UploadSession.objects.get()
+        uploads.write_chunk(upload, 0, self.content[:self.chunk_size])
+        # A request that read the session before the first one advanced it.
+        with self.assertRaises(uploads.UploadError) as raised:
+            uploads.write_chunk(stale, 0, b'x' * self.chunk_size)
+        self.assertEqual(raised.exception.status, 409)
+
+        [name] = upload.chunk_names
+        with default_storage.open(name, 'rb') as f:
+            self.assertEqual(f.read(), self.content[:self.chunk_size])
+        self.assertEqual(default_storage.listdir(f'uploads/{upload.pk}')[1],
+                         [os.path.basename(name)])
+
+    def upload_all(self, user=None, purpose='submission', **extra):
+        state = self.start(user, purpose, **extra).json()
+        for offset in range(0, len(self.content), self.chunk_size):
+            self.send(state, offset)
+        return self.client.post(state['complete_url'])
+
+    def test_identical_resubmission_keeps_one_reference(self):
+        self.upload_all()
+        self.upload_all()
+        submission = AssignmentSubmission.objects.get()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            submission.delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(default_storage.exists(submission.submission_file.name))
+
+    def test_corrupt_chunk_is_rejected(self):
+        state = self.start().json()
+        response = self.send(state, 0, X_Chunk_SHA256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get().received, 0)
+
+    def test_checksum_mismatch_fails_the_upload(self):
+        state = self.start(checksum='0' * 64).json()
+        for offset in range(0, len(self.content), self.chunk_size):
+            self.send(state, offset)
+        response = self.client.post(state['complete_url'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get().status, 'failed')
+        self.assertFalse(AssignmentSubmission.objects.exists())
+
+    def test_teacher_material_upload(self):
+        state = self.start(self.teacher_user, purpose='material', title="Slides").json()
+        for offset in range(0, len(self.content), self.chunk_size):
+            self.send(state, offset)
+        self.assertIn('redirect', self.client.post(state['complete_url']).json())
+        self.assertEqual(Material.objects.get(clazz=self.clazz).title, "Slides")
+
+    def test_permissions(self):
+        self.assertEqual(self.start(purpose='material').status_code, 403)
+        state = self.start().json()
+        self.client.force_login(self.teacher_user)
+        self.assertEqual(self.client.get(state['status_url']).status_code, 404)
+        self.assertEqual(self.send(state, 0).status_code, 404)
+
+    def test_size_limit(self):
+        response = self.start(size=uploads.MAX_UPLOAD_SIZE + 1)
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,199 @@
+"""
+Chunked, resumable uploads for class materials and assignment submissions.
+
+The browser opens an UploadSession, sends the file in UPLOAD_CHUNK_SIZE
+pieces and asks for completion once every byte is in. Each chunk is saved as
+its own object in the default storage as soon as it arrives, under a name of
+its own, and the session only advances, recording that name, when the chunk
+lands at the offset it expects. A client that lost its connection asks for
+the offset and carries on from there. Completion
+streams the chunks into the target FileField's storage while hashing them;
+no request holds more than one chunk in memory.
+"""
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import AssignmentSubmission, Clazz, Enrollment, Material, Student, UploadSession
+
+# Chunks are read from request.body, so they must stay below
+# DATA_UPLOAD_MAX_MEMORY_SIZE (2.5 MB by default).
+UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+MAX_UPLOAD_SIZE = getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 1024 ** 3)
+
+
+class UploadError(Exception):
+    """A request the upload session cannot accept; `status` is the HTTP
+    status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def check_target(user, purpose, target_id):
+    """Raises UploadError unless `user` may upload for this target."""
+    if purpose == 'material':
+        allowed = Clazz.objects.filter(pk=target_id, teacher__user=user).exists()
+    elif purpose == 'submission':
+        allowed = Enrollment.objects.filter(
+            student__user=user, clazz__assignments=target_id, status='approved').exists()
+    else:
+        raise UploadError("Unknown upload purpose.")
+    if not allowed:
+        raise UploadError("You cannot upload files here.", status=403)
+
+
+def open_upload(user, purpose, target_id, filename, size, checksum='', title=''):
+    filename = os.path.basename(str(filename or '').replace('\\', '/')).strip()
+    if not filename:
+        raise UploadError("A file name is required.")
+    if not 0 < size <= MAX_UPLOAD_SIZE:
+        raise UploadError(f"Files must be between 1 byte and {MAX_UPLOAD_SIZE // (1024 * 1024)} MB.")
+    checksum = (checksum or '').lower()
+    if checksum and len(checksum) != 64:
+        raise UploadError("The checksum must be a SHA-256 hex digest.")
+    check_target(user, purpose, target_id)
+    return UploadSession.objects.create(
+        user=user, purpose=purpose, target_id=target_id, title=title[:255],
+        filename=filename[:255], size=size, chunk_size=UPLOAD_CHUNK_SIZE, checksum=checksum)
+
+
+def write_chunk(upload, offset, data, digest=None):
+    """Stores the chunk starting at `offset` and advances the session.
+    `digest` is the optional SHA-256 of the chunk, checked before saving."""
+    if upload.status != 'open':
+        raise UploadError("This upload is no longer open.", status=409)
+    if offset != upload.received:
+        raise UploadError(f"Expected the chunk at offset {upload.received}.", status=409)
+    expected = min(upload.chunk_size, upload.size - offset)
+    if len(data) != expected:
+        raise UploadError(f"Expected {expected} bytes, got {len(data)}.")
+    if digest and hashlib.sha256(data).hexdigest() != digest.lower():
+        raise UploadError("The chunk does not match its checksum.")
+
+    # A repeated request may be sending the same chunk right now, so each
+    # request saves its own object and only the one that advances the
+    # session gets its name recorded; the other deletes its copy.
+    staged = default_storage.save(
+        upload.new_chunk_name(offset // upload.chunk_size), ContentFile(data))
+    try:
+        advanced = UploadSession.objects.filter(
+            pk=upload.pk, status='open', received=offset).update(
+            received=offset + len(data), chunk_names=upload.chunk_names + [staged],
+            updated_at=timezone.now())
+    except Exception:
+        default_storage.delete(staged)
+        raise
+    if not advanced:
+        default_storage.delete(staged)
+    upload.refresh_from_db(fields=['received', 'chunk_names', 'status'])
+    if not advanced:
+        raise UploadError(f"Expected the chunk at offset {upload.received}.", status=409)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Reads the stored chunks of an upload back to back, hashing them."""
+
+    def __init__(self, upload):
+        self.size = upload.size
+        self.sha256 = hashlib.sha256()
+        self._names = list(upload.chunk_names)
+        self._current = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._names or self._current:
+            if self._current is None:
+                self._current = default_storage.open(self._names.pop(0), 'rb')
+            data = self._current.read(len(buffer))
+            if data:
+                buffer[:len(data)] = data
+                self.sha256.update(data)
+                return len(data)
+            self._current.close()
+            self._current = None
+        return 0
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+        super().close()
+
+
+def _target_instance(upload):
+    if upload.purpose == 'material':
+        instance = Material(clazz_id=upload.target_id,
+                            title=upload.title or upload.filename)
+        return instance, 'file'
+    student = Student.objects.get(user=upload.user)
+    instance = (AssignmentSubmission.objects.filter(
+        assignment_id=upload.target_id, student=student).first()
+        or AssignmentSubmission(assignment_id=upload.target_id, student=student))
+    return instance, 'submission_file'
+
+
+def discard_chunks(upload):
+    for name in upload.chunk_names:
+        default_storage.delete(name)
+
+
+def _fail(upload):
+    UploadSession.objects.filter(pk=upload.pk).update(status='failed', updated_at=timezone.now())
+    upload.status = 'failed'
+    discard_chunks(upload)
+
+
+def complete_upload(upload):
+    """Assembles the chunks into the target's file field and saves the
+    Material or AssignmentSubmission. Returns the saved instance."""
+    if upload.received != upload.size:
+        raise UploadError(f"Only {upload.received} of {upload.size} bytes were received.", status=409)
+    check_target(upload.user, upload.purpose, upload.target_id)
+    # Claim the session so a repeated request cannot assemble it twice.
+    claimed = UploadSession.objects.filter(
+        pk=upload.pk, status='open', received=upload.size).update(
+        status='complete', updated_at=timezone.now())
+    if not claimed:
+        raise UploadError("This upload is no longer open.", status=409)
+
+    instance, field_name = _target_instance(upload)
+    field = instance._meta.get_field(field_name)
+    reader = _ChunkReader(upload)
+    try:
+        name = field.storage.save(
+            field.generate_filename(instance, upload.filename),
+            File(reader, name=upload.filename))
+    except Exception:
+        _fail(upload)
+        raise
+    finally:
+        reader.close()
+
+    digest = reader.sha256.hexdigest()
+    if upload.checksum and digest != upload.checksum:
+        field.storage.delete(name)
+        _fail(upload)
+        raise UploadError("The assembled file does not match its checksum.")
+
+    previous = getattr(instance, field_name).name
+    setattr(instance, field_name, name)
+    instance.original_name = upload.filename
+    with transaction.atomic():
+        instance.save()
+        if name == previous:
+            # Identical content: the row already held a reference to this blob.
+            field.storage.delete(name)
+        UploadSession.objects.filter(pk=upload.pk).update(checksum=digest)
+    upload.status, upload.checksum = 'complete', digest
+    discard_chunks(upload)
+    return instance
@@ -23,6 +23,8 @@ urlpatterns = [
     path('teacher/qr/', views.teacher_qr_generate_view, name='teacher_qr'),
     path('teacher/qr/stop/<int:session_id>/',
          views.stop_qr_session_view, name='stop_qr_session'),
+    path('teacher/qr/live/<int:session_id>/',
+         views.teacher_qr_live_view, name='teacher_qr_live'),
     path('messages/', views.messages_view, name='messages'),
 
     path('teacher/class/<int:class_pk>/',
@@ -35,6 +37,10 @@ urlpatterns = [
          views.delete_assignment_view, name='delete_assignment'),
     path('teacher/assignment/<int:assignment_pk>/submissions/',
          views.teacher_assignment_submissions_view, name='teacher_assignment_submissions'),
+    path('teacher/assignment/<int:assignment_pk>/grades/',
+         views.teacher_bulk_grade_view, name='teacher_bulk_grade'),
+    path('teacher/assignment/<int:assignment_pk>/submissions.zip',
+         views.teacher_download_submissions_view, name='teacher_download_submissions'),
     path('teacher/class/<int:class_pk>/student/<int:student_pk>/',
          views.teacher_student_detail_view, name='teacher_student_detail'),
 
@@ -46,9 +52,27 @@ urlpatterns = [
          views.student_give_feedback_view, name='student_give_feedback'),
     path('student/assignment/<int:assignment_pk>/submit/',
          views.student_submit_assignment_view, name='student_submit_assignment'),
+
+    # Protected downloads
+    path('materials/<int:pk>/download/',
+         views.download_material_view, name='download_material'),
+    path('submissions/<int:pk>/download/',
+         views.download_submission_view, name='download_submission'),
+
+    # Chunked uploads
+    path('uploads/', views.upload_start_view, name='upload_start'),
+    path('uploads/<uuid:upload_id>/', views.upload_status_view, name='upload_status'),
+    path('uploads/<uuid:upload_id>/chunk/', views.upload_chunk_view, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/',
+         views.upload_complete_view, name='upload_complete'),
+
     path('student/qr/scan/<str:token>/',
          views.student_qr_scan_view, name='student_qr_scan'),
     path('student/schedule/', views.student_schedule_view, name='student_schedule'),
+    path('schedule/occurrences/', views.schedule_occurrences_view,
+         name='schedule_occurrences'),
+    path('schedule/feed/<str:token>.ics', views.schedule_feed_view,
+         name='schedule_feed'),
     path('student/pending/', views.student_pending_requests_view,
          name='student_pending'),
     path('student/achievements/', views.student_achievements_view,
@@ -62,10 +86,18 @@ urlpatterns = [
     path('delete_class/<int:pk>/', views.delete_class_view, name='delete_class'),
     path('class/<int:class_pk>/schedule/',
          views.manage_schedule_view, name='manage_schedule'),
+    path('schedule/conflicts/', views.schedule_conflicts_view,
+         name='schedule_conflicts'),
     path('class/<int:class_pk>/attendance/',
          views.take_attendance_view, name='take_attendance'),
     path('class/<int:class_pk>/grades/',
          views.enter_grades_view, name='enter_grades'),
+    path('class/<int:class_pk>/grades/import/',
+         views.import_grades_view, name='import_grades'),
+    path('class/<int:class_pk>/grades/export/',
+         views.export_grades_view, name='export_grades'),
+    path('class/<int:class_pk>/attendance/export/',
+         views.export_attendance_view, name='export_attendance'),
 
     # Student Management
     path('students/', views.manage_students_view, name='manage_students'),
@@ -93,6 +125,8 @@ urlpatterns = [
     path('enrollments/reject/<int:pk>/',
          views.reject_request_view, name='reject_request'),
     path('enrollments/add/', views.add_enrollment_view, name='add_enrollment'),
+    path('enrollments/export/', views.export_enrollments_view,
+         name='export_enrollments'),
     path('enrollments/delete/<int:pk>/',
          views.delete_enrollment_view, name='delete_enrollment'),
 
@@ -8,13 +8,37 @@ import calendar
 import random
 from django.urls import reverse
 import uuid
+import asyncio
+import json
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.utils.text import slugify
+from django.utils.http import urlencode
 from core.models import (
     Clazz, Admin, Teacher, Student, Enrollment, ClassType, Attendance,
     Material, Announcement, Assignment, AssignmentSubmission, Feedback, Message,
-    AttendanceSession, ContentReadStatus
+    AttendanceSession, ClassFullError, ClassSession, ContentReadStatus, UploadSession
 )
-from .forms import ClassForm, TeacherForm, StudentForm, StaffForm, EnrollmentForm, ClassTypeForm, ScheduleForm, AttendanceForm, MaterialForm, AnnouncementForm, AssignmentForm, AssignmentSubmissionForm, AssignmentGradingForm, AssignmentCreateForm, FeedbackForm, MessageForm
-from django.db.models import Count, Q, Avg
+from .forms import ClassForm, TeacherForm, StudentForm, StaffForm, EnrollmentForm, ClassTypeForm, ScheduleForm, AttendanceForm, MaterialForm, AnnouncementForm, AssignmentForm, AssignmentSubmissionForm, AssignmentGradingForm, AssignmentCreateForm, FeedbackForm, MessageForm, GradebookImportForm
+from django.db.models import Count, Q, Avg, Max, OuterRef, Subquery
+from django.db import transaction
+from django.core.paginator import Paginator
+from django.core import signing
+from django.contrib.auth.models import User
+from django.views.decorators.http import condition
+from core.assignments import assignment_progress, invalidate_assignment_progress
+from core.conflicts import term_conflicts
+from core.ical import build_calendar
+from core.recommendations import recommended_classes
+from core.schedule import (
+    calendar_users, classes_for_user, classes_meeting_on, invalidate_user_schedules, month_occurrences,
+    occurrences_between)
+from . import live_attendance
+from .grades import GRADE_FIELDS, GradeWriter, parse_score
+from .gradebook import GradebookError, import_gradebook, MAX_REPORTED_ERRORS
+from .downloads import can_view_class_files, serve_file
+from .permissions import is_staff_user
+from .uploads import UploadError, complete_upload, open_upload, write_chunk
+from .exports import attendance_rows, available_formats, enrollment_rows, export_response, gradebook_rows, submissions_zip_response
 
 
 @login_required
@@ -394,16 +418,6 @@ def messages_view(request):
     return render(request, 'dashboard/messages.html', context)
 
 
-def is_staff_user(user):
-    # Check if user has admin profile OR is superuser
-    if user.is_superuser:
-        return True
-    try:
-        return hasattr(user, 'admin_profile')
-    except:
-        return False
-
-
 def is_teacher_or_staff(user):
     if user.is_superuser:
         return True
@@ -461,43 +475,14 @@ def teacher_dashboard_view(request):
     today = datetime.date.today()
 
     # 1. Today's Schedule
-    try:
-        today_name_en = today.strftime('%A')
-        day_mapping = {
-            'Monday': 'Thứ 2',
-            'Tuesday': 'Thứ 3',
-            'Wednesday': 'Thứ 4',
-            'Thursday': 'Thứ 5',
-            'Friday': 'Thứ 6',
-            'Saturday': 'Thứ 7',
-            'Sunday': 'Chủ Nhật'
-        }
-        today_name_vn = day_mapping.get(today_name_en, today_name_en)
-
-        today_schedule = Clazz.objects.filter(
-            teacher=teacher,
-            day_of_week__icontains=today_name_vn
-        ).select_related('class_type').order_by('start_time')
-    except Exception as e:
-        today_schedule = []
-        print(f"Error loading schedule: {e}")
+    today_schedule = classes_meeting_on(
+        today, Clazz.objects.filter(teacher=teacher)).select_related('class_type')
 
-    # 2. Working Statistics (Sessions based on Attendance records)
-    try:
-        monthly_sessions = Attendance.objects.filter(
-            enrollment__clazz__teacher=teacher,
-            date__month=today.month,
-            date__year=today.year
-        ).values('enrollment__clazz', 'date').distinct().count()
-
-        yearly_sessions = Attendance.objects.filter(
-            enrollment__clazz__teacher=teacher,
-            date__year=today.year
-        ).values('enrollment__clazz', 'date').distinct().count()
-    except Exception as e:
-        monthly_sessions = 0
-        yearly_sessions = 0
-        print(f"Error loading sessions: {e}")
+    # 2. Working Statistics (class sessions held so far)
+    held_sessions = ClassSession.objects.filter(
+        clazz__teacher=teacher, date__year=today.year, date__lte=today)
+    monthly_sessions = held_sessions.filter(date__month=today.month).count()
+    yearly_sessions = held_sessions.count()
 
     # 3. Class Data & Overall Stats
     classes = []
@@ -596,9 +581,7 @@ def teacher_assignments_view(request):
         messages.error(request, "Access denied. Teachers only.")
         return redirect('home')
 
-    teacher = request.user.teacher_profile
-    assignments = Assignment.objects.filter(
-        clazz__teacher=teacher).select_related('clazz').order_by('-due_date')
+    assignments = assignment_progress(request.user.teacher_profile)
 
     return render(request, 'dashboard/teacher_assignments.html', {
         'assignments': assignments,
@@ -703,11 +686,12 @@ def teacher_statistics_view(request):
                     'reasons': ", ".join(reasons)
                 })
 
-    # Count Working Days (Unique dates with attendance this month)
-    working_days_count = Attendance.objects.filter(
-        enrollment__clazz__teacher=teacher,
+    # Count Working Days (dates with a class session so far this month)
+    working_days_count = ClassSession.objects.filter(
+        clazz__teacher=teacher,
         date__month=today.month,
-        date__year=today.year
+        date__year=today.year,
+        date__lte=today
     ).values('date').distinct().count()
 
     overview = {
@@ -776,12 +760,15 @@ def student_dashboard_view(request):
         messages.error(request, "You are not registered as a student.")
         return redirect('home')
 
-    enrollments = student.enrollments.filter(status='approved').select_related(
-        'clazz', 'clazz__class_type', 'clazz__teacher')
+    enrollments = Enrollment.objects.filter(student=student, status='approved').select_related(
+        'clazz', 'clazz__class_type', 'clazz__teacher').with_overall_score()
 
     # Notifications Logic
     enrolled_classes = [e.clazz for e in enrollments]
 
+    today_classes = classes_meeting_on(datetime.date.today(), Clazz.objects.filter(
+        enrollments__student=student, enrollments__status='approved')).select_related('teacher')
+
     # Fetch recent announcements and assignments for enrolled classes
     recent_announcements_qs = Announcement.objects.filter(
         clazz__in=enrolled_classes).order_by('-posted_at')
@@ -838,6 +825,7 @@ def student_dashboard_view(request):
     return render(request, 'dashboard/student_dashboard.html', {
         'student': student,
         'enrollments': enrollments,
+        'today_classes': today_classes,
         'notifications': notifications,
         'unread_count': unread_count  # Now reflects actual unread notifications
     })
@@ -875,6 +863,9 @@ def mark_notification_as_read(request):
     return redirect('dashboard:student_dashboard')
 
 
+CATALOG_PAGE_SIZE = 12
+
+
 @login_required
 def student_courses_view(request):
     try:
@@ -883,12 +874,34 @@ def student_courses_view(request):
         messages.error(request, "You are not registered as a student.")
         return redirect('home')
 
-    # Fetch all classes (can be optimized to exclude enrolled ones)
-    classes = Clazz.objects.all().order_by(
-        'class_name').select_related('teacher', 'class_type')
+    # The student's own enrollment status rides along on each class row.
+    own_status = Enrollment.objects.filter(
+        student=student, clazz=OuterRef('pk')).values('status')[:1]
+    classes = Clazz.objects.select_related('teacher', 'class_type').annotate(
+        enrollment_status=Subquery(own_status)).order_by('class_name', 'pk')
 
+    query = request.GET.get('q', '').strip()
+    if query:
+        classes = classes.filter(Q(class_name__icontains=query) | Q(
+            teacher__full_name__icontains=query))
+    class_type = request.GET.get('type', '')
+    if class_type.isdigit():
+        classes = classes.filter(class_type_id=class_type)
+    hide_mine = request.GET.get('hide_mine') == '1'
+    if hide_mine:
+        classes = classes.filter(enrollment_status__isnull=True)
+
+    page = Paginator(classes, CATALOG_PAGE_SIZE).get_page(request.GET.get('page'))
+    filters = urlencode({'q': query, 'type': class_type, 'hide_mine': '1' if hide_mine else ''})
     return render(request, 'dashboard/student_courses.html', {
-        'classes': classes,
+        'classes': page,
+        'page': page,
+        'recommended': recommended_classes(student) if page.number == 1 else [],
+        'class_types': ClassType.objects.order_by('code'),
+        'query': query,
+        'class_type': class_type,
+        'hide_mine': hide_mine,
+        'filters': filters,
         'student': student
     })
 
@@ -901,7 +914,7 @@ def student_pending_requests_view(request):
         messages.error(request, "You are not registered as a student.")
         return redirect('home')
 
-    pending_enrollments = student.enrollments.filter(status='pending')
+    pending_enrollments = student.enrollments.filter(status__in=['pending', 'waitlisted'])
     return render(request, 'dashboard/student_pending.html', {'student': student, 'enrollments': pending_enrollments})
 
 
@@ -913,26 +926,9 @@ def student_achievements_view(request):
         messages.error(request, "You are not registered as a student.")
         return redirect('home')
 
-    enrollments = student.enrollments.all().select_related(
-        'clazz', 'clazz__class_type', 'clazz__teacher')
-
-    for enrollment in enrollments:
-        # Calculate scores
-        # Minitests (Average) - Treat None as 0
-        m1 = enrollment.minitest1 or 0
-        m2 = enrollment.minitest2 or 0
-        m3 = enrollment.minitest3 or 0
-        m4 = enrollment.minitest4 or 0
-        mini_avg = (m1 + m2 + m3 + m4) / 4.0
-
-        midterm = enrollment.midterm or 0
-        final = enrollment.final_test or 0
-
-        # Weighted Average: 20% Mini, 30% Mid, 50% Final
-        overall = (mini_avg * 0.2) + (midterm * 0.3) + (final * 0.5)
-
-        enrollment.overall_score_calculated = round(overall, 2)
-        enrollment.is_passed = overall >= 4.0
+    # Weighted overall score and pass flag are computed by the database
+    enrollments = Enrollment.objects.filter(student=student).select_related(
+        'clazz', 'clazz__class_type', 'clazz__teacher').with_overall_score()
 
     return render(request, 'dashboard/student_achievements.html', {'student': student, 'enrollments': enrollments})
 
@@ -1091,6 +1087,9 @@ def assign_classes_to_teacher_view(request, pk):
     teacher = get_object_or_404(Teacher, pk=pk)
     if request.method == 'POST':
         selected_class_ids = request.POST.getlist('classes')
+        # Calendars of this teacher and of whoever taught the selected classes.
+        affected_users = calendar_users(teachers={teacher.pk, *Clazz.objects.filter(
+            pk__in=selected_class_ids).values_list('teacher_id', flat=True)})
 
         # 1. Unassign classes that were previously assigned but not selected anymore
         # We filter classes belonging to this teacher, EXCLUDING the ones currently selected.
@@ -1100,6 +1099,8 @@ def assign_classes_to_teacher_view(request, pk):
 
         # 2. Assign selected classes (this will overwrite any previous teacher)
         Clazz.objects.filter(pk__in=selected_class_ids).update(teacher=teacher)
+        # .update() skips the post_save handlers.
+        invalidate_user_schedules(*affected_users)
 
         messages.success(
             request, f"Classes assigned to {teacher.full_name} successfully!")
@@ -1124,27 +1125,81 @@ def manage_enrollments_view(request):
         status='approved').select_related('student', 'clazz')
     pending_requests = Enrollment.objects.filter(
         status='pending').select_related('student', 'clazz')
+    waitlisted = Enrollment.objects.filter(
+        status='waitlisted').with_waitlist_position().select_related(
+        'student', 'clazz').order_by('clazz__class_name', 'enrollment_date', 'pk')
 
     if query:
-        # Apply search to both
+        # Apply search to all of them
         search_filter = Q(student__full_name__icontains=query) | Q(
             clazz__class_name__icontains=query)
         active_enrollments = active_enrollments.filter(search_filter)
         pending_requests = pending_requests.filter(search_filter)
+        waitlisted = waitlisted.filter(search_filter)
 
     return render(request, 'dashboard/manage_enrollments.html', {
         'active_enrollments': active_enrollments,
         'pending_requests': pending_requests,
-        'query': query
+        'waitlisted': waitlisted,
+        'query': query,
+        'export_formats': available_formats(),
     })
 
 
+# action -> (EnrollmentQuerySet method, its arguments, success message)
+BULK_REQUEST_ACTIONS = {
+    'approve_paid': ('approve', {'paid': True}, "{count} request(s) approved as paid."),
+    'approve_unpaid': ('approve', {'paid': False}, "{count} request(s) approved as unpaid."),
+    'mark_paid': ('mark_paid', {}, "{count} request(s) marked as paid."),
+    'reject': ('reject', {}, "{count} request(s) rejected."),
+}
+
+
 @login_required
 @user_passes_test(is_staff_user, login_url="accounts:login")
 def manage_requests_view(request):
-    requests = Enrollment.objects.filter(status='pending').select_related(
-        'student', 'clazz').order_by('-enrollment_date')
-    return render(request, 'dashboard/manage_requests.html', {'requests': requests})
+    params = request.POST if request.method == 'POST' else request.GET
+    requests = Enrollment.objects.filter(status='pending')
+    query = params.get('q', '').strip()
+    if query:
+        requests = requests.filter(Q(student__full_name__icontains=query) | Q(
+            clazz__class_name__icontains=query))
+    class_id = params.get('class', '')
+    if class_id.isdigit():
+        requests = requests.filter(clazz_id=class_id)
+
+    if request.method == 'POST':
+        # Either the ticked rows, in batches of ids, or every request
+        # matching the filter, sent as one query.
+        if params.get('scope') == 'all':
+            batches = [requests]
+        else:
+            batches = requests.in_batches(
+                [pk for pk in params.getlist('selected') if pk.isdigit()])
+        action = params.get('action')
+        if action not in BULK_REQUEST_ACTIONS:
+            messages.error(request, "Unknown action.")
+        else:
+            method, kwargs, message = BULK_REQUEST_ACTIONS[action]
+            with transaction.atomic():
+                results = [getattr(batch, method)(**kwargs) for batch in batches]
+            if method == 'approve':
+                count = sum(approved for approved, _ in results)
+                waitlisted = sum(waitlisted for _, waitlisted in results)
+            else:
+                count, waitlisted = sum(results), 0
+            messages.success(request, message.format(count=count))
+            if waitlisted:
+                messages.warning(
+                    request, f"{waitlisted} request(s) put on the waitlist because their class is full.")
+        return redirect(f"{reverse('dashboard:manage_requests')}?{urlencode({'q': query, 'class': class_id})}")
+
+    return render(request, 'dashboard/manage_requests.html', {
+        'requests': requests.select_related('student', 'clazz').order_by('-enrollment_date'),
+        'classes': Clazz.objects.filter(enrollments__status='pending').distinct().order_by('class_name'),
+        'query': query,
+        'class_id': class_id,
+    })
 
 
 @login_required
@@ -1163,7 +1218,14 @@ def verify_payment_view(request, pk):
 def approve_request_view(request, pk):
     enrollment = get_object_or_404(Enrollment, pk=pk)
     enrollment.status = 'approved'
-    enrollment.save()
+    try:
+        enrollment.save()
+    except ClassFullError as e:
+        enrollment.status = 'waitlisted'
+        enrollment.save()
+        messages.warning(
+            request, f"{e} {enrollment.student.full_name} was put on the waitlist.")
+        return redirect('dashboard:manage_enrollments')
 
     messages.success(
         request, f"Enrollment for {enrollment.student.full_name} approved.")
@@ -1187,9 +1249,14 @@ def add_enrollment_view(request):
     if request.method == 'POST':
         form = EnrollmentForm(request.POST)
         if form.is_valid():
-            form.save()
-            messages.success(request, "Student enrolled successfully!")
-            return redirect('dashboard:manage_enrollments')
+            try:
+                form.save()
+            except ClassFullError as e:
+                # Another approval took the last seat after validation.
+                form.add_error('clazz', str(e))
+            else:
+                messages.success(request, "Student enrolled successfully!")
+                return redirect('dashboard:manage_enrollments')
     else:
         form = EnrollmentForm()
     return render(request, 'dashboard/add_enrollment.html', {'form': form})
@@ -1313,34 +1380,46 @@ def delete_class_type_view(request, pk):
 @user_passes_test(is_staff_user, login_url="accounts:login")
 def manage_schedule_view(request, class_pk):
     clazz = get_object_or_404(Clazz, pk=class_pk)
-    try:
-        schedule = clazz.schedule
-    except Schedule.DoesNotExist:
-        schedule = None
 
     if request.method == 'POST':
-        if schedule:
-            form = ScheduleForm(request.POST, instance=schedule)
-        else:
-            form = ScheduleForm(request.POST)
-
+        form = ScheduleForm(request.POST, instance=clazz)
         if form.is_valid():
-            schedule = form.save(commit=False)
-            schedule.clazz = clazz
-            schedule.save()
+            form.save()
             messages.success(request, "Schedule updated successfully!")
             # Redirect to dashboard or class list
             return redirect('dashboard:dashboard')
     else:
-        if schedule:
-            form = ScheduleForm(instance=schedule)
-        else:
-            form = ScheduleForm(initial={'clazz': clazz})
-            # Hide clazz field since we are setting it automatically, or make it read-only
-            form.fields['clazz'].widget = forms.HiddenInput()
+        form = ScheduleForm(instance=clazz)
 
     return render(request, 'dashboard/manage_schedule.html', {'form': form, 'clazz': clazz})
 
+
+@login_required
+@user_passes_test(is_staff_user, login_url="accounts:login")
+def schedule_conflicts_view(request):
+    """Room and teacher double-bookings among the classes of a term
+    (?start=&end=, defaults to the next six months)."""
+    today = datetime.date.today()
+    try:
+        start = datetime.date.fromisoformat(request.GET.get('start') or today.isoformat())
+        end = datetime.date.fromisoformat(
+            request.GET.get('end') or (today + datetime.timedelta(days=182)).isoformat())
+    except ValueError:
+        messages.error(request, "Dates must be in YYYY-MM-DD format.")
+        start, end = today, today + datetime.timedelta(days=182)
+
+    conflicts = term_conflicts(start, end) if start <= end else []
+    teacher_names = dict(Teacher.objects.filter(
+        pk__in={c.slot.teacher_id for c in conflicts if c.kind == 'teacher'}
+    ).values_list('pk', 'full_name'))
+    conflict_rows = [(conflict, teacher_names.get(conflict.slot.teacher_id))
+                     for conflict in conflicts]
+    return render(request, 'dashboard/schedule_conflicts.html', {
+        'conflict_rows': conflict_rows,
+        'start': start,
+        'end': end,
+    })
+
 # Attendance Management
 
 
@@ -1365,13 +1444,14 @@ def take_attendance_view(request, class_pk):
         if date_str_post:
             date = datetime.datetime.strptime(date_str_post, '%Y-%m-%d').date()
 
+        session = ClassSession.for_date(clazz, date)
         for enrollment in enrollments:
             status = request.POST.get(f'status_{enrollment.pk}')
             if status:
                 Attendance.objects.update_or_create(
                     enrollment=enrollment,
                     date=date,
-                    defaults={'status': status}
+                    defaults={'status': status, 'session': session}
                 )
         messages.success(request, f"Attendance recorded for {date}")
         return redirect(f"{request.path}?date={date}")
@@ -1395,6 +1475,7 @@ def take_attendance_view(request, class_pk):
         'clazz': clazz,
         'date': date,
         'attendance_data': attendance_data,
+        'export_formats': available_formats(),
         'base_template': base_template,
         'dashboard_url': dashboard_url
     })
@@ -1408,22 +1489,28 @@ def enter_grades_view(request, class_pk):
         status='approved').select_related('student')
 
     if request.method == 'POST':
+        writer = GradeWriter()
         for enrollment in enrollments:
-            # Helper function to get float or None
-            def get_score(field_name):
-                val = request.POST.get(f'{field_name}_{enrollment.pk}')
-                return float(val) if val else None
-
-            enrollment.minitest1 = get_score('minitest1')
-            enrollment.minitest2 = get_score('minitest2')
-            enrollment.minitest3 = get_score('minitest3')
-            enrollment.minitest4 = get_score('minitest4')
-            enrollment.midterm = get_score('midterm')
-            enrollment.final_test = get_score('final_test')
-            enrollment.save()
-
-        messages.success(request, f"Grades updated for {clazz.class_name}")
-        return redirect('dashboard:enter_grades', class_pk=class_pk)
+            submitted = {}
+            for field in GRADE_FIELDS:
+                key = f'{field}_{enrollment.pk}'
+                if key in request.POST:
+                    submitted[field] = request.POST[key]
+            writer.stage(enrollment, submitted)
+
+        if writer.errors:
+            # Nothing is saved; show the errors with the submitted table.
+            for error in writer.errors:
+                messages.error(request, error)
+        else:
+            updated = writer.save()
+            if updated:
+                messages.success(
+                    request, f"Grades updated for {clazz.class_name}: {updated} student(s), "
+                    f"{writer.changed_scores_count} score(s) changed. {writer.summary()}")
+            else:
+                messages.info(request, "No grade changes to save.")
+            return redirect('dashboard:enter_grades', class_pk=class_pk)
 
     is_teacher = hasattr(
         request.user, 'person') and request.user.person.role == 'teacher'
@@ -1433,11 +1520,85 @@ def enter_grades_view(request, class_pk):
     return render(request, 'dashboard/enter_grades.html', {
         'clazz': clazz,
         'enrollments': enrollments,
+        'import_form': GradebookImportForm(),
+        'export_formats': available_formats(),
         'base_template': base_template,
         'dashboard_url': dashboard_url
     })
 
 
+def _export(request, rows, filename, sheet_title):
+    try:
+        return export_response(rows, filename, request.GET.get('format', 'csv'), sheet_title)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+
+@login_required
+@user_passes_test(is_teacher_or_staff, login_url="accounts:login")
+def export_grades_view(request, class_pk):
+    clazz = get_object_or_404(Clazz, pk=class_pk)
+    return _export(request, gradebook_rows(clazz), f"{slugify(clazz.class_name)}_grades", 'Grades')
+
+
+@login_required
+@user_passes_test(is_teacher_or_staff, login_url="accounts:login")
+def export_attendance_view(request, class_pk):
+    clazz = get_object_or_404(Clazz, pk=class_pk)
+    return _export(request, attendance_rows(clazz), f"{slugify(clazz.class_name)}_attendance", 'Attendance')
+
+
+@login_required
+@user_passes_test(is_staff_user, login_url="accounts:login")
+def export_enrollments_view(request):
+    enrollments = Enrollment.objects.all()
+    query = request.GET.get('q')
+    if query:
+        enrollments = enrollments.filter(
+            Q(student__full_name__icontains=query) | Q(clazz__class_name__icontains=query))
+    status = request.GET.get('status')
+    if status:
+        enrollments = enrollments.filter(status=status)
+    return _export(request, enrollment_rows(enrollments), 'enrollments', 'Enrollments')
+
+
+@login_required
+@user_passes_test(is_teacher_or_staff, login_url="accounts:login")
+def import_grades_view(request, class_pk):
+    clazz = get_object_or_404(Clazz, pk=class_pk)
+    if request.method != 'POST':
+        return redirect('dashboard:enter_grades', class_pk=class_pk)
+
+    form = GradebookImportForm(request.POST, request.FILES)
+    if not form.is_valid():
+        messages.error(request, "Please choose a gradebook file to import.")
+        return redirect('dashboard:enter_grades', class_pk=class_pk)
+
+    try:
+        writer = import_gradebook(clazz, form.cleaned_data['file'])
+    except GradebookError as e:
+        messages.error(request, str(e))
+        return redirect('dashboard:enter_grades', class_pk=class_pk)
+
+    if writer.errors:
+        for error in writer.errors[:MAX_REPORTED_ERRORS]:
+            messages.error(request, error)
+        if len(writer.errors) > MAX_REPORTED_ERRORS:
+            messages.error(
+                request, f"... and {len(writer.errors) - MAX_REPORTED_ERRORS} more errors.")
+        messages.warning(
+            request, "No grades were imported. Fix the errors above and upload the file again.")
+    else:
+        updated = writer.save()
+        if updated:
+            messages.success(
+                request, f"Imported grades for {clazz.class_name}: {updated} student(s), "
+                f"{writer.changed_scores_count} score(s) changed.")
+        else:
+            messages.info(request, "The file matches the current grades; nothing to import.")
+    return redirect('dashboard:enter_grades', class_pk=class_pk)
+
+
 @login_required
 def teacher_class_detail_view(request, class_pk):
     try:
@@ -1595,48 +1756,98 @@ def teacher_assignment_submissions_view(request, assignment_pk):
         messages.error(request, "Access denied. Teachers only.")
         return redirect('home')
 
-    assignment = get_object_or_404(
-        Assignment, pk=assignment_pk, clazz__teacher=teacher)
+    assignment = get_object_or_404(Assignment.objects.select_related(
+        'clazz'), pk=assignment_pk, clazz__teacher=teacher)
 
-    # Get all students enrolled in the class
-    enrollments = Enrollment.objects.filter(
-        clazz=assignment.clazz, status='approved').select_related('student')
+    # Only the row being graded gets a form; the rest render plain values.
+    editing = {}
+    submission_pk = request.POST.get('submission_pk', '')
+    if request.method == 'POST' and submission_pk.isdigit():
+        submission = get_object_or_404(AssignmentSubmission.objects.select_related(
+            'student'), pk=submission_pk, assignment=assignment)
+        form = AssignmentGradingForm(request.POST, instance=submission)
+        if form.is_valid():
+            form.save()
+            messages.success(
+                request, f"Graded {submission.student.full_name}'s submission.")
+            return redirect('dashboard:teacher_assignment_submissions', assignment_pk=assignment_pk)
+        editing[submission.pk] = form
 
+    enrollments = Enrollment.objects.filter(
+        clazz=assignment.clazz, status='approved').select_related('student').order_by('student__full_name')
+    submissions = {submission.student_id: submission
+                   for submission in assignment.submissions.all()}
     submission_data = []
     for enrollment in enrollments:
-        submission = AssignmentSubmission.objects.filter(
-            assignment=assignment, student=enrollment.student).first()
-        form = None
-        if submission:
-            form = AssignmentGradingForm(instance=submission)
-        else:
-            form = AssignmentGradingForm()
-
+        submission = submissions.get(enrollment.student_id)
         submission_data.append({
             'student': enrollment.student,
             'submission': submission,
-            'form': form
+            'form': editing.get(submission.pk) if submission else None,
         })
 
-    if request.method == 'POST':
-        submission_pk = request.POST.get('submission_pk')
-        if submission_pk:
-            submission = get_object_or_404(
-                AssignmentSubmission, pk=submission_pk, assignment=assignment)
-            form = AssignmentGradingForm(request.POST, instance=submission)
-            if form.is_valid():
-                form.save()
-                messages.success(
-                    request, f"Graded {submission.student.full_name}'s submission.")
-                return redirect('dashboard:teacher_assignment_submissions', assignment_pk=assignment_pk)
-
     return render(request, 'dashboard/teacher_assignment_submissions.html', {
         'assignment': assignment,
         'submission_data': submission_data,
+        'submitted_count': len(submissions),
         'clazz': assignment.clazz
     })
 
 
+@login_required
+def teacher_bulk_grade_view(request, assignment_pk):
+    """Saves the grade_<submission pk> fields of the grading table with one
+    bulk_update; nothing is saved if any grade is invalid."""
+    try:
+        teacher = request.user.teacher_profile
+    except (AttributeError, Teacher.DoesNotExist):
+        messages.error(request, "Access denied. Teachers only.")
+        return redirect('home')
+
+    assignment = get_object_or_404(
+        Assignment, pk=assignment_pk, clazz__teacher=teacher)
+    if request.method != 'POST':
+        return redirect('dashboard:teacher_assignment_submissions', assignment_pk=assignment_pk)
+
+    changed, errors = [], []
+    for submission in assignment.submissions.select_related('student'):
+        raw = request.POST.get(f'grade_{submission.pk}')
+        if raw is None:
+            continue
+        try:
+            grade = parse_score(raw)
+        except ValueError as e:
+            errors.append(f"{submission.student.full_name}: {e}.")
+            continue
+        if grade != submission.grade:
+            submission.grade = grade
+            changed.append(submission)
+
+    if errors:
+        for error in errors[:MAX_REPORTED_ERRORS]:
+            messages.error(request, error)
+        messages.error(request, "No grades were saved.")
+    else:
+        AssignmentSubmission.objects.bulk_update(changed, ['grade'], batch_size=500)
+        if changed:
+            invalidate_assignment_progress(teacher.pk)
+        messages.success(request, f"Saved {len(changed)} grade(s).")
+    return redirect('dashboard:teacher_assignment_submissions', assignment_pk=assignment_pk)
+
+
+@login_required
+def teacher_download_submissions_view(request, assignment_pk):
+    """All submission files of an assignment as one streamed ZIP."""
+    try:
+        teacher = request.user.teacher_profile
+    except (AttributeError, Teacher.DoesNotExist):
+        messages.error(request, "Access denied. Teachers only.")
+        return redirect('home')
+
+    assignment = get_object_or_404(Assignment, pk=assignment_pk, clazz__teacher=teacher)
+    return submissions_zip_response(assignment)
+
+
 @login_required
 def student_submit_assignment_view(request, assignment_pk):
     try:
@@ -1678,6 +1889,103 @@ def student_submit_assignment_view(request, assignment_pk):
     })
 
 
+@login_required
+def download_material_view(request, pk):
+    material = get_object_or_404(Material.objects.select_related('clazz__teacher'), pk=pk)
+    if not material.file or not can_view_class_files(request.user, material.clazz):
+        raise Http404("Material not found.")
+    return serve_file(request, material.file, material.file_name)
+
+
+@login_required
+def download_submission_view(request, pk):
+    """The submitting student, the class's teacher and staff may download."""
+    submission = get_object_or_404(
+        AssignmentSubmission.objects.select_related('assignment__clazz__teacher', 'student'), pk=pk)
+    clazz = submission.assignment.clazz
+    allowed = (submission.student.user_id == request.user.pk
+               or is_staff_user(request.user)
+               or (clazz.teacher_id is not None and clazz.teacher.user_id == request.user.pk))
+    if not submission.submission_file or not allowed:
+        raise Http404("Submission not found.")
+    return serve_file(request, submission.submission_file, submission.file_name)
+
+
+def _upload_state(upload):
+    return {
+        'upload_id': str(upload.pk), 'offset': upload.received, 'size': upload.size,
+        'chunk_size': upload.chunk_size, 'status': upload.status,
+        'status_url': reverse('dashboard:upload_status', args=[upload.pk]),
+        'chunk_url': reverse('dashboard:upload_chunk', args=[upload.pk]),
+        'complete_url': reverse('dashboard:upload_complete', args=[upload.pk]),
+    }
+
+
+@login_required
+def upload_start_view(request):
+    """Opens a chunked upload. POST purpose, target, filename, size and
+    optionally checksum (SHA-256 of the whole file) and title."""
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required."}, status=405)
+    try:
+        target_id = int(request.POST.get('target', ''))
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': "target and size must be integers."}, status=400)
+    try:
+        upload = open_upload(
+            request.user, request.POST.get('purpose'), target_id,
+            request.POST.get('filename'), size,
+            checksum=request.POST.get('checksum', ''), title=request.POST.get('title', ''))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(_upload_state(upload), status=201)
+
+
+@login_required
+def upload_status_view(request, upload_id):
+    """Where an upload stands, so a client can resume from `offset`."""
+    upload = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    return JsonResponse(_upload_state(upload))
+
+
+@login_required
+def upload_chunk_view(request, upload_id):
+    """Receives the raw bytes of the chunk at ?offset=, with an optional
+    X-Chunk-SHA256 header."""
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required."}, status=405)
+    upload = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    try:
+        offset = int(request.GET.get('offset', ''))
+    except ValueError:
+        return JsonResponse({'error': "offset must be an integer."}, status=400)
+    try:
+        write_chunk(upload, offset, request.body, request.headers.get('X-Chunk-SHA256'))
+    except UploadError as e:
+        return JsonResponse({'error': str(e), **_upload_state(upload)}, status=e.status)
+    return JsonResponse(_upload_state(upload))
+
+
+@login_required
+def upload_complete_view(request, upload_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required."}, status=405)
+    upload = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    try:
+        instance = complete_upload(upload)
+    except UploadError as e:
+        return JsonResponse({'error': str(e), **_upload_state(upload)}, status=e.status)
+
+    if upload.purpose == 'material':
+        messages.success(request, "Material uploaded successfully!")
+        url = reverse('dashboard:teacher_class_detail', args=[instance.clazz_id])
+    else:
+        messages.success(request, "Assignment submitted successfully!")
+        url = reverse('dashboard:student_submit_assignment', args=[instance.assignment_id])
+    return JsonResponse({**_upload_state(upload), 'redirect': url})
+
+
 @login_required
 def student_class_detail_view(request, class_pk):
     try:
@@ -1748,8 +2056,13 @@ def teacher_qr_generate_view(request):
                     pk=class_id, teacher=teacher)
 
                 # Deactivate old sessions for this class/day to prevent clutter
-                AttendanceSession.objects.filter(
-                    clazz=selected_class, date=today).update(is_active=False)
+                old_sessions = AttendanceSession.objects.filter(
+                    clazz=selected_class, date=today, is_active=True)
+                old_session_ids = list(
+                    old_sessions.values_list('pk', flat=True))
+                old_sessions.update(is_active=False)
+                for old_session_id in old_session_ids:
+                    live_attendance.close_session(old_session_id)
 
                 # Create New Session
                 token = uuid.uuid4().hex
@@ -1760,6 +2073,7 @@ def teacher_qr_generate_view(request):
                 session = AttendanceSession.objects.create(
                     clazz=selected_class,
                     date=today,
+                    class_session=ClassSession.for_date(selected_class, today),
                     token=token,
                     passcode=passcode,
                     is_active=True
@@ -1799,6 +2113,7 @@ def stop_qr_session_view(request, session_id):
 
     session.is_active = False
     session.save()
+    live_attendance.close_session(session.pk)
 
     # Auto-Absent Logic: Mark all students without an attendance record as 'Absent'
     # 1. Get all approved enrollments for this class
@@ -1818,6 +2133,7 @@ def stop_qr_session_view(request, session_id):
             absent_records.append(Attendance(
                 enrollment=enrollment,
                 date=session.date,
+                session_id=session.class_session_id,
                 status='Absent'
             ))
 
@@ -1832,6 +2148,62 @@ def stop_qr_session_view(request, session_id):
     return redirect('dashboard:teacher_qr')
 
 
+LIVE_STREAM_HEARTBEAT_SECONDS = 15
+# Streams end after this long; EventSource reconnects on its own.
+LIVE_STREAM_MAX_SECONDS = 600
+
+
+async def teacher_qr_live_view(request, session_id):
+    """Streams present/total counts of a QR session as Server-Sent Events."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden("Login required.")
+
+    session = await AttendanceSession.objects.filter(
+        pk=session_id, clazz__teacher__user=user).afirst()
+    if session is None:
+        raise Http404("Attendance session not found.")
+
+    counter = live_attendance.get_counter(session.pk)
+    if counter is None:
+        # Seed from the database once, e.g. after a restart.
+        total = await Enrollment.objects.filter(
+            clazz_id=session.clazz_id, status='approved').acount()
+        present_ids = [pk async for pk in Attendance.objects.filter(
+            enrollment__clazz_id=session.clazz_id, date=session.date,
+            status='Present').values_list('enrollment_id', flat=True)]
+        counter = live_attendance.open_session(session.pk, total, present_ids)
+        if not session.is_active:
+            live_attendance.close_session(session.pk)
+
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LIVE_STREAM_MAX_SECONDS
+        seen_version = None
+        yield "retry: 3000\n\n"
+        while True:
+            snapshot = counter.snapshot()
+            if snapshot['version'] != seen_version:
+                seen_version = snapshot['version']
+                yield f"data: {json.dumps(snapshot)}\n\n"
+                if snapshot['closed']:
+                    return
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            changed = await live_attendance.wait_for_change(
+                counter, seen_version,
+                min(LIVE_STREAM_HEARTBEAT_SECONDS, remaining))
+            if not changed:
+                yield ": keep-alive\n\n"
+
+    response = StreamingHttpResponse(
+        event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def student_qr_scan_view(request, token):
     if not hasattr(request.user, 'student_profile'):
@@ -1875,8 +2247,10 @@ def student_qr_scan_view(request, token):
             Attendance.objects.update_or_create(
                 enrollment=enrollment,
                 date=session.date,
-                defaults={'status': 'Present'}
+                defaults={'status': 'Present',
+                          'session_id': session.class_session_id}
             )
+            live_attendance.mark_present(session.pk, enrollment.pk)
             return render(request, 'dashboard/student_qr_success.html', {
                 'success': True,
                 'clazz': session.clazz,
@@ -1894,148 +2268,153 @@ def student_qr_scan_view(request, token):
     })
 
 
-@login_required
-def teacher_schedule_view(request):
-    if not hasattr(request.user, 'teacher_profile'):
-        return redirect('home')
+# Longest range served by schedule_occurrences_view (about one school year).
+MAX_SCHEDULE_RANGE_DAYS = 400
 
-    teacher = request.user.teacher_profile
 
-    # Get params
+def _month_calendar_context(request):
+    """Month grid for the current user's calendar, built from the cached
+    occurrences of ?month=&year= (defaults to this month)."""
     today = datetime.date.today()
     try:
         month = int(request.GET.get('month', today.month))
         year = int(request.GET.get('year', today.year))
+        first_date = datetime.date(year, month, 1)
     except ValueError:
-        month = today.month
-        year = today.year
-
-    # Calculate prev/next
-    first_date = datetime.date(year, month, 1)
+        month, year = today.month, today.year
+        first_date = datetime.date(year, month, 1)
     _, num_days = calendar.monthrange(year, month)
     last_date = datetime.date(year, month, num_days)
+    previous = first_date - datetime.timedelta(days=1)
+    following = last_date + datetime.timedelta(days=1)
+
+    events_by_day = {}
+    for occurrence in month_occurrences(request.user, year, month):
+        events_by_day.setdefault(occurrence['date'], []).append({
+            'time': f"{occurrence['start_time'] or 'TBA'} - {occurrence['end_time'] or 'TBA'}",
+            'class_name': occurrence['class_name'],
+            'room': occurrence['room'],
+        })
 
-    prev_month = (first_date - datetime.timedelta(days=1)).month
-    prev_year = (first_date - datetime.timedelta(days=1)).year
-    next_month = (last_date + datetime.timedelta(days=1)).month
-    next_year = (last_date + datetime.timedelta(days=1)).year
-
-    current_month_name = calendar.month_name[month]
-
-    # Get Classes
-    classes = Clazz.objects.filter(teacher=teacher)
-
-    # Build Calendar
-    cal = calendar.Calendar(firstweekday=0)  # 0 = Monday
     calendar_data = []
-
-    for week in cal.monthdayscalendar(year, month):
+    for week in calendar.Calendar(firstweekday=0).monthdayscalendar(year, month):
         week_data = []
         for day in week:
-            day_data = {
+            week_data.append({
                 'day': day,
                 'is_today': (day == today.day and month == today.month and year == today.year),
-                'events': []
-            }
-
-            if day != 0:
-                current_date = datetime.date(year, month, day)
-                day_name = current_date.strftime("%A")  # e.g. "Monday"
-
-                for clazz in classes:
-                    # Check date range
-                    if clazz.start_date <= current_date <= clazz.end_date:
-                        # Schedule is now embedded in Clazz
-                        if clazz.day_of_week and day_name in clazz.day_of_week:
-                            day_data['events'].append({
-                                'time': f"{clazz.start_time.strftime('%H:%M') if clazz.start_time else 'TBA'} - {clazz.end_time.strftime('%H:%M') if clazz.end_time else 'TBA'}",
-                                'class_name': clazz.class_name,
-                                'room': clazz.room
-                            })
-
-            week_data.append(day_data)
+                'events': events_by_day.get(datetime.date(year, month, day).isoformat(), []) if day else [],
+            })
         calendar_data.append(week_data)
 
-    return render(request, 'dashboard/teacher_schedule.html', {
+    return {
         'calendar_data': calendar_data,
-        'current_month_name': current_month_name,
+        'feed_url': request.build_absolute_uri(reverse(
+            'dashboard:schedule_feed', args=[schedule_feed_token(request.user)])),
+        'current_month_name': calendar.month_name[month],
         'current_year': year,
-        'prev_month': prev_month,
-        'prev_year': prev_year,
-        'next_month': next_month,
-        'next_year': next_year,
-    })
+        'prev_month': previous.month,
+        'prev_year': previous.year,
+        'next_month': following.month,
+        'next_year': following.year,
+    }
+
+
+@login_required
+def teacher_schedule_view(request):
+    if not hasattr(request.user, 'teacher_profile'):
+        return redirect('home')
+    return render(request, 'dashboard/teacher_schedule.html',
+                  _month_calendar_context(request))
 
 
 @login_required
 def student_schedule_view(request):
     if not hasattr(request.user, 'student_profile'):
         return redirect('home')
+    return render(request, 'dashboard/student_schedule.html',
+                  _month_calendar_context(request))
 
-    student = request.user.student_profile
 
-    # Get params
-    today = datetime.date.today()
-    try:
-        month = int(request.GET.get('month', today.month))
-        year = int(request.GET.get('year', today.year))
-    except ValueError:
-        month = today.month
-        year = today.year
-
-    # Calculate prev/next
-    first_date = datetime.date(year, month, 1)
-    _, num_days = calendar.monthrange(year, month)
-    last_date = datetime.date(year, month, num_days)
+SCHEDULE_FEED_SALT = 'dashboard.schedule_feed'
 
-    prev_month = (first_date - datetime.timedelta(days=1)).month
-    prev_year = (first_date - datetime.timedelta(days=1)).year
-    next_month = (last_date + datetime.timedelta(days=1)).month
-    next_year = (last_date + datetime.timedelta(days=1)).year
 
-    current_month_name = calendar.month_name[month]
+def schedule_feed_token(user):
+    """Token for the user's iCal feed URL. Calendar apps fetch the feed
+    without a session, so the signed token is the credential."""
+    return signing.dumps(user.pk, salt=SCHEDULE_FEED_SALT)
 
-    # Get Enrolled Classes
-    enrollments = Enrollment.objects.filter(
-        student=student, status='approved').select_related('clazz')
-    classes = [e.clazz for e in enrollments]
 
-    # Build Calendar
-    cal = calendar.Calendar(firstweekday=0)
-    calendar_data = []
+def _schedule_feed_state(request, token):
+    """(user, last_modified, etag) for a feed token, or None if the token
+    is invalid. Computed once per request."""
+    if not hasattr(request, '_schedule_feed_state'):
+        state = None
+        try:
+            user_id = signing.loads(token, salt=SCHEDULE_FEED_SALT)
+        except signing.BadSignature:
+            user_id = None
+        user = User.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+        if user is not None:
+            classes = classes_for_user(user).aggregate(
+                count=Count('pk', distinct=True), last=Max('updated_at'))
+            enrollments = Enrollment.objects.filter(
+                student__user=user).aggregate(last=Max('updated_at'))
+            stamps = [s for s in (classes['last'], enrollments['last']) if s]
+            last_modified = max(stamps) if stamps else None
+            # The count catches removed classes, which move no timestamp.
+            etag = f"{user.pk}-{classes['count']}-{last_modified.timestamp() if last_modified else 0}"
+            state = (user, last_modified, etag)
+        request._schedule_feed_state = state
+    return request._schedule_feed_state
+
+
+def _schedule_feed_etag(request, token):
+    state = _schedule_feed_state(request, token)
+    return state and state[2]
+
+
+def _schedule_feed_last_modified(request, token):
+    state = _schedule_feed_state(request, token)
+    return state and state[1]
+
+
+@condition(etag_func=_schedule_feed_etag, last_modified_func=_schedule_feed_last_modified)
+def schedule_feed_view(request, token):
+    """iCal feed of the user's classes, one weekly recurring event each.
+    Unchanged feeds are answered with 304 Not Modified."""
+    state = _schedule_feed_state(request, token)
+    if state is None:
+        raise Http404("Unknown calendar feed.")
+    user = state[0]
+
+    profile = getattr(user, 'teacher_profile', None) or getattr(user, 'student_profile', None)
+    name = profile.full_name if profile else user.get_username()
+    classes = classes_for_user(user).select_related('teacher').order_by('start_date', 'class_id')
+    response = HttpResponse(
+        build_calendar(classes, f"{name} - Class Schedule", request.get_host()),
+        content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="schedule.ics"'
+    # Let clients keep a copy but revalidate it with the ETag each time.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
-    for week in cal.monthdayscalendar(year, month):
-        week_data = []
-        for day in week:
-            day_data = {
-                'day': day,
-                'is_today': (day == today.day and month == today.month and year == today.year),
-                'events': []
-            }
-
-            if day != 0:
-                current_date = datetime.date(year, month, day)
-                day_name = current_date.strftime("%A")
-
-                for clazz in classes:
-                    if clazz.start_date <= current_date <= clazz.end_date:
-                        # Schedule is now embedded in Clazz
-                        if clazz.day_of_week and day_name in clazz.day_of_week:
-                            day_data['events'].append({
-                                'time': f"{clazz.start_time.strftime('%H:%M') if clazz.start_time else 'TBA'} - {clazz.end_time.strftime('%H:%M') if clazz.end_time else 'TBA'}",
-                                'class_name': clazz.class_name,
-                                'room': clazz.room
-                            })
-
-            week_data.append(day_data)
-        calendar_data.append(week_data)
 
-    return render(request, 'dashboard/student_schedule.html', {
-        'calendar_data': calendar_data,
-        'current_month_name': current_month_name,
-        'current_year': year,
-        'prev_month': prev_month,
-        'prev_year': prev_year,
-        'next_month': next_month,
-        'next_year': next_year,
+@login_required
+def schedule_occurrences_view(request):
+    """JSON occurrences of the user's classes for ?start=&end= (ISO dates)."""
+    try:
+        start = datetime.date.fromisoformat(request.GET.get('start', ''))
+        end = datetime.date.fromisoformat(request.GET.get('end', ''))
+    except ValueError:
+        return JsonResponse({'error': "start and end must be dates in YYYY-MM-DD format."}, status=400)
+    if end < start:
+        return JsonResponse({'error': "end must not be before start."}, status=400)
+    if (end - start).days >= MAX_SCHEDULE_RANGE_DAYS:
+        return JsonResponse({'error': f"The range can span at most {MAX_SCHEDULE_RANGE_DAYS} days."}, status=400)
+
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'occurrences': occurrences_between(request.user, start, end),
     })
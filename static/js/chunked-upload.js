@@ -0,0 +1,116 @@
+// Sends the file of a form marked with data-chunked-upload through the
+// resumable upload API instead of one multipart POST. The upload id is kept
+// in localStorage, so choosing the same file again after a dropped
+// connection or a reload resumes from the offset the server already has.
+(function () {
+    const MAX_RETRIES = 5;
+
+    function csrfToken(form) {
+        const input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+        return input ? input.value : '';
+    }
+
+    async function sha256(blob) {
+        if (!window.crypto || !crypto.subtle) return null;  // Needs HTTPS.
+        const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+        return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    async function request(form, url, options) {
+        const response = await fetch(url, {
+            credentials: 'same-origin',
+            ...options,
+            headers: {'X-CSRFToken': csrfToken(form), ...(options && options.headers)},
+        });
+        const data = await response.json().catch(() => ({}));
+        return {ok: response.ok, status: response.status, data};
+    }
+
+    async function resume(form, key) {
+        const saved = JSON.parse(localStorage.getItem(key) || 'null');
+        if (!saved) return null;
+        const {ok, data} = await request(form, saved.status_url);
+        return ok && data.status === 'open' ? data : null;
+    }
+
+    async function start(form, file) {
+        const body = new FormData();
+        body.append('purpose', form.dataset.purpose);
+        body.append('target', form.dataset.target);
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        const title = form.querySelector('[name="title"]');
+        if (title) body.append('title', title.value);
+        const {ok, data} = await request(form, form.dataset.chunkedUpload, {method: 'POST', body});
+        if (!ok) throw new Error(data.error || 'The upload could not be started.');
+        return data;
+    }
+
+    async function sendChunks(form, file, upload, report) {
+        let offset = upload.offset;
+        let retries = 0;
+        while (offset < upload.size) {
+            const chunk = file.slice(offset, offset + upload.chunk_size);
+            const headers = {'Content-Type': 'application/octet-stream'};
+            const digest = await sha256(chunk);
+            if (digest) headers['X-Chunk-SHA256'] = digest;
+            let result;
+            try {
+                result = await request(form, `${upload.chunk_url}?offset=${offset}`,
+                                       {method: 'POST', body: chunk, headers});
+            } catch (networkError) {
+                result = {ok: false, status: 0, data: {}};
+            }
+            if (result.ok || result.status === 409) {
+                // On a conflict the server tells us where it actually is.
+                if (result.data.status && result.data.status !== 'open') {
+                    throw new Error(result.data.error || 'The upload is no longer open.');
+                }
+                offset = result.data.offset;
+                retries = 0;
+                report(offset / upload.size);
+            } else if (result.status >= 400 && result.status < 500 && result.status !== 408) {
+                throw new Error(result.data.error || 'A chunk was rejected.');
+            } else if (++retries > MAX_RETRIES) {
+                throw new Error('The connection keeps failing; choose the file again to resume.');
+            } else {
+                await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** retries));
+            }
+        }
+    }
+
+    async function upload(form, file, report) {
+        const key = `chunked-upload:${form.dataset.purpose}:${form.dataset.target}:` +
+                    `${file.name}:${file.size}:${file.lastModified}`;
+        const session = (await resume(form, key)) || (await start(form, file));
+        localStorage.setItem(key, JSON.stringify({status_url: session.status_url}));
+        await sendChunks(form, file, session, report);
+        const {ok, data} = await request(form, session.complete_url, {method: 'POST'});
+        localStorage.removeItem(key);
+        if (!ok) throw new Error(data.error || 'The upload could not be completed.');
+        return data.redirect;
+    }
+
+    document.querySelectorAll('form[data-chunked-upload]').forEach(form => {
+        if (!window.fetch || !window.Blob || !Blob.prototype.slice) return;
+        form.addEventListener('submit', async event => {
+            const input = form.querySelector('input[type="file"]');
+            const file = input && input.files[0];
+            if (!file) return;
+            event.preventDefault();
+            const status = form.querySelector('[data-upload-status]');
+            const buttons = form.querySelectorAll('button[type="submit"]');
+            const report = fraction => {
+                if (status) status.textContent = `Uploading... ${Math.floor(fraction * 100)}%`;
+            };
+            buttons.forEach(button => button.disabled = true);
+            report(0);
+            try {
+                window.location.href = await upload(form, file, report);
+            } catch (error) {
+                if (status) status.textContent = error.message;
+                buttons.forEach(button => button.disabled = false);
+            }
+        });
+    });
+})();